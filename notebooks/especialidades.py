@@ -0,0 +1,149 @@
+# especialidades.py
+"""
+Vocabulário de especialidades e tabela médico -> especialidade.
+
+O campo de especialidades dos cards junta várias especialidades num único
+texto ("PEDIATRIA - RQE Nº: 111, NEONATOLOGIA - RQE Nº: 222"). Aqui ele é
+separado uma única vez, no merge, em duas tabelas:
+
+- vocabulário: `especialidade_id` (int32), `especialidade` (nome interno
+  normalizado) e `medicos` (nº de médicos com a especialidade);
+- ligação: `crm`, `uf`, `especialidade_id` e `rqe` (uma linha por par
+  médico/especialidade).
+
+Contagens e filtros por especialidade viram operações sobre inteiros:
+    vocab, lig = ler_tabelas(Path("dados_medicos_por_uf.csv"))
+    lig["especialidade_id"].value_counts()
+    lig[lig["especialidade_id"] == codigo(vocab, "PEDIATRIA")]
+"""
+
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SEM_ESPECIALIDADE = "MEDICO SEM ESPECIALIDADE REGISTRADA"
+# colunas onde o merge/tratamento deixa o campo, em ordem de preferência
+COLUNAS_ESPECIALIDADE = ["especialidade", "especialidades/areas de atuacao", "especialidades_areas_de_atuacao"]
+
+_RQE = re.compile(r"\s*-?\s*RQE\s*N\S*\s*:?\s*(\d+)\s*$", re.IGNORECASE)
+_ESPACOS = re.compile(r"\s+")
+
+
+def normaliza_nome(nome: str) -> str:
+    """Chave do vocabulário: sem acento, maiúsculas, espaços simples, sem pontuação nas pontas."""
+    nome = "".join(c for c in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(c))
+    return _ESPACOS.sub(" ", nome).strip(" .;,-").upper()
+
+
+def separa_especialidades(texto: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """'PEDIATRIA - RQE Nº: 111, NEONATOLOGIA' -> [('PEDIATRIA', '111'), ('NEONATOLOGIA', None)]."""
+    if not isinstance(texto, str):
+        return []
+    itens = []
+    for parte in texto.split(","):
+        rqe = _RQE.search(parte)
+        nome = normaliza_nome(parte[:rqe.start()] if rqe else parte)
+        if nome and nome != SEM_ESPECIALIDADE:
+            itens.append((nome, rqe.group(1) if rqe else None))
+    return itens
+
+
+class TabelaEspecialidades:
+    """
+    Acumula a ligação médico -> especialidade de um ou mais DataFrames (ex.:
+    as partições do merge em blocos) com um vocabulário único. Cada texto
+    distinto é separado uma vez só; os códigos finais seguem a ordem
+    alfabética do vocabulário (determinísticos).
+    """
+
+    def __init__(self):
+        self._codigos: Dict[str, int] = {}
+        self._ligacoes: List[pd.DataFrame] = []
+
+    def _codigo(self, nome: str) -> int:
+        return self._codigos.setdefault(nome, len(self._codigos))
+
+    def adiciona(self, df: pd.DataFrame, coluna: str, chave: Sequence[str] = ("crm", "uf")):
+        codes, uniques = pd.factorize(df[coluna], use_na_sentinel=True)
+        itens = [separa_especialidades(u) for u in uniques]
+
+        # arrays "achatados" com os itens de todos os textos distintos
+        por_texto = np.array([len(i) for i in itens] + [0], dtype=np.int64)  # último: nulos (código -1)
+        inicio_texto = np.concatenate([[0], np.cumsum(por_texto)[:-1]])
+        esp = np.array([self._codigo(nome) for i in itens for nome, _ in i], dtype=np.int32)
+        rqe = np.array([r for i in itens for _, r in i], dtype=object)
+
+        # expande para as linhas: cada linha recebe os itens do seu texto
+        codes = np.where(codes < 0, len(itens), codes)
+        por_linha = por_texto[codes]
+        linhas = np.repeat(np.arange(len(df)), por_linha)
+        deslocamento = np.arange(len(linhas)) - np.repeat(np.cumsum(por_linha) - por_linha, por_linha)
+        posicao = inicio_texto[codes][linhas] + deslocamento
+
+        ligacao = df[list(chave)].iloc[linhas].reset_index(drop=True)
+        ligacao["especialidade_id"] = esp[posicao]
+        ligacao["rqe"] = rqe[posicao]
+        self._ligacoes.append(ligacao)
+
+    def tabelas(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(vocabulário, ligação) com códigos reatribuídos em ordem alfabética."""
+        nomes = sorted(self._codigos)
+        novo = np.empty(len(nomes), dtype=np.int32)
+        for i, nome in enumerate(nomes):
+            novo[self._codigos[nome]] = i
+
+        colunas = ["especialidade_id", "rqe"]
+        ligacao = pd.concat(self._ligacoes, ignore_index=True) if self._ligacoes else pd.DataFrame(columns=colunas)
+        ligacao["especialidade_id"] = novo[ligacao["especialidade_id"].to_numpy(dtype=np.int32)]
+        ligacao = ligacao.drop_duplicates().reset_index(drop=True)
+
+        vocab = pd.DataFrame({"especialidade_id": np.arange(len(nomes), dtype=np.int32), "especialidade": nomes})
+        medicos = ligacao.drop_duplicates([c for c in ligacao.columns if c not in colunas] + ["especialidade_id"])
+        vocab["medicos"] = np.bincount(medicos["especialidade_id"], minlength=len(nomes))
+        return vocab, ligacao
+
+    def salva(self, saida: Path) -> Tuple[Path, Path]:
+        """Grava ao lado de `saida`: <nome>_especialidades e <nome>_medico_especialidade (.csv ou .parquet)."""
+        vocab, ligacao = self.tabelas()
+        caminhos = caminhos_tabelas(saida)
+        for df, caminho in zip((vocab, ligacao), caminhos):
+            if caminho.suffix == ".parquet":
+                df.to_parquet(caminho, index=False)
+            else:
+                df.to_csv(caminho, index=False, encoding="utf-8-sig")
+        return caminhos
+
+
+def coluna_especialidade(colunas: Sequence[str]) -> Optional[str]:
+    return next((c for c in COLUNAS_ESPECIALIDADE if c in colunas), None)
+
+
+def caminhos_tabelas(saida: Path) -> Tuple[Path, Path]:
+    return (saida.with_name(f"{saida.stem}_especialidades{saida.suffix}"),
+            saida.with_name(f"{saida.stem}_medico_especialidade{saida.suffix}"))
+
+
+def ler_tabelas(saida: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Lê (vocabulário, ligação) gravados pelo merge para o arquivo `saida`."""
+    tipos = {"especialidade_id": "int32", "crm": "string", "uf": "category", "rqe": "string"}
+    tabelas = []
+    for caminho in caminhos_tabelas(saida):
+        if caminho.suffix == ".parquet":
+            tabelas.append(pd.read_parquet(caminho))
+        else:
+            cab = pd.read_csv(caminho, nrows=0, encoding="utf-8-sig").columns
+            tabelas.append(pd.read_csv(caminho, encoding="utf-8-sig",
+                                       dtype={c: t for c, t in tipos.items() if c in cab}))
+    return tabelas[0], tabelas[1]
+
+
+def codigo(vocab: pd.DataFrame, nome: str) -> int:
+    """Código de uma especialidade pelo nome (com ou sem acento/maiúsculas)."""
+    achados = vocab.loc[vocab["especialidade"] == normaliza_nome(nome), "especialidade_id"]
+    if achados.empty:
+        raise KeyError(nome)
+    return int(achados.iloc[0])
@@ -0,0 +1,263 @@
+# indice_crm.py
+"""
+Arquivo binário ordenado por (uf, nº do CRM) para consultas exatas e por faixa
+sem carregar a saída do merge.
+
+Formato (little-endian):
+    cabeçalho   8s  "CRMIDX01" | Q nº de registros | Q início do heap | I tamanho da lista de colunas
+    colunas     lista JSON (UTF-8) com os nomes das colunas da saída
+    registros   2s uf | 2x | I nº do CRM | Q deslocamento no heap | I tamanho  (20 bytes, ordenados)
+    heap        um array JSON (UTF-8) por médico, com os valores na ordem das colunas
+
+O arquivo é aberto com mmap: a busca é binária sobre os registros de tamanho
+fixo (O(log n)) e só a linha encontrada é decodificada.
+
+    with IndiceCrm(Path("dados_medicos_por_uf_crm.idx")) as indice:
+        indice.busca("SP", 123456)
+        list(indice.faixa("AC", 1000, 2000))
+
+Linha de comando:
+    python notebooks/indice_crm.py construir [--origem dados_medicos_por_uf.csv]
+    python notebooks/indice_crm.py buscar SP 123456 [--ate 123999]
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MAGICO = b"CRMIDX01"
+CABECALHO = struct.Struct("<8sQQI")
+REGISTRO = struct.Struct("<2s2xIQI")
+# mesmo layout do REGISTRO; o preenchimento é um campo explícito (np.concatenate descarta "buracos")
+_DTYPE_REGISTRO = np.dtype([("uf", "S2"), ("_", "V2"), ("crm", "<u4"), ("deslocamento", "<u8"), ("tamanho", "<u4")])
+
+# "2702/AC", "CRM-SP 2702", "2702": o primeiro grupo de dígitos é o número; a UF vem da coluna uf ou do sufixo
+_NUMERO = re.compile(r"(\d+)")
+_UF_SUFIXO = re.compile(r"([A-Za-z]{2})\s*$")
+_UF_VALIDA = r"[A-Z]{2}"  # a chave guarda a UF em 2 bytes ASCII
+
+logger = logging.getLogger("indice_crm")
+
+
+def caminho_indice(saida: Path) -> Path:
+    """Arquivo gravado ao lado da saída do merge: <nome>_crm.idx."""
+    return saida.with_name(f"{saida.stem}_crm.idx")
+
+
+class ConstrutorIndiceCrm:
+    """
+    Acumula os médicos de um ou mais DataFrames (ex.: as partições do merge em
+    blocos). As linhas vão direto para um heap temporário em disco; em memória
+    ficam só as chaves (20 bytes por médico), ordenadas em `salva`.
+    """
+
+    def __init__(self, saida: Path):
+        self.caminho = caminho_indice(saida)
+        self._heap_path = self.caminho.with_name(self.caminho.name + ".heap")
+        self._heap = open(self._heap_path, "wb")
+        self._tamanho_heap = 0
+        self._chaves: List[np.ndarray] = []
+        self.colunas: Optional[List[str]] = None
+        self.ignoradas = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.descarta()
+
+    def descarta(self):
+        """Fecha e remove os temporários (heap e índice parcial); não afeta um índice já salvo."""
+        self._heap.close()
+        self.caminho.with_name(self.caminho.name + ".tmp").unlink(missing_ok=True)
+        self._heap_path.unlink(missing_ok=True)
+
+    def adiciona(self, df: pd.DataFrame):
+        if "crm" not in df.columns or df.empty:
+            self.ignoradas += len(df)
+            return
+        crm = df["crm"].astype("string")
+        numero = pd.to_numeric(crm.str.extract(_NUMERO, expand=False), errors="coerce")
+        uf = df["uf"].astype("string") if "uf" in df.columns else pd.Series(pd.NA, index=df.index, dtype="string")
+        uf = uf.fillna(crm.str.extract(_UF_SUFIXO, expand=False)).str.strip().str.upper()
+        uf_valida = uf.str.fullmatch(_UF_VALIDA).fillna(False).astype(bool)
+        invalidas = uf[uf.notna() & ~uf_valida].unique()
+        if len(invalidas):
+            logger.warning("Índice CRM: UF(s) inválida(s) (esperado duas letras A-Z) ignoradas: %s",
+                           ", ".join(map(repr, invalidas[:10])))
+        validas = numero.notna() & (numero <= np.iinfo(np.uint32).max) & uf_valida
+        validas = validas.fillna(False).to_numpy(dtype=bool)
+        self.ignoradas += int((~validas).sum())
+        if not validas.any():
+            return
+
+        if self.colunas is None:
+            self.colunas = [str(c) for c in df.columns]
+        linhas = df.loc[validas, self.colunas].astype(object)
+        linhas = linhas.where(linhas.notna(), None)
+        # default=str: datas do Parquet (date32 -> datetime.date) vão como texto ISO
+        dados = [json.dumps(v, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+                 for v in linhas.itertuples(index=False, name=None)]
+        tamanhos = np.fromiter((len(d) for d in dados), dtype=np.uint64, count=len(dados))
+        deslocamentos = self._tamanho_heap + np.concatenate([[0], np.cumsum(tamanhos)[:-1]]).astype(np.uint64)
+        self._heap.write(b"".join(dados))
+        self._tamanho_heap += int(tamanhos.sum())
+
+        chaves = np.zeros(len(dados), dtype=_DTYPE_REGISTRO)
+        chaves["uf"] = [u.encode("ascii") for u in uf[validas]]
+        chaves["crm"] = numero[validas].to_numpy(dtype=np.uint32)
+        chaves["deslocamento"] = deslocamentos
+        chaves["tamanho"] = tamanhos
+        self._chaves.append(chaves)
+
+    def salva(self) -> Path:
+        """Ordena as chaves e grava cabeçalho + registros + heap (temporário + troca atômica)."""
+        tmp = self.caminho.with_name(self.caminho.name + ".tmp")
+        try:
+            self._heap.close()
+            chaves = np.concatenate(self._chaves) if self._chaves else np.zeros(0, dtype=_DTYPE_REGISTRO)
+            chaves = chaves[np.lexsort((chaves["crm"], chaves["uf"]))]  # estável: duplicatas na ordem de chegada
+
+            colunas = json.dumps(self.colunas or [], ensure_ascii=False).encode("utf-8")
+            inicio_heap = CABECALHO.size + len(colunas) + len(chaves) * REGISTRO.size
+            with open(tmp, "wb") as f, open(self._heap_path, "rb") as heap:
+                f.write(CABECALHO.pack(MAGICO, len(chaves), inicio_heap, len(colunas)))
+                f.write(colunas)
+                f.write(chaves.tobytes())
+                while bloco := heap.read(1 << 20):
+                    f.write(bloco)
+            os.replace(tmp, self.caminho)
+        finally:
+            self.descarta()
+        if self.ignoradas:
+            logger.warning("Índice CRM: %d linha(s) sem CRM/UF reconhecível ficaram de fora", self.ignoradas)
+        logger.info("Índice CRM: %d médicos -> %s", len(chaves), self.caminho)
+        return self.caminho
+
+
+class _Chaves:
+    """Sequência (uf, crm) sobre os registros no mmap, para o `bisect`."""
+
+    def __init__(self, mm: mmap.mmap, inicio: int, n: int):
+        self._mm, self._inicio, self._n = mm, inicio, n
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i: int):
+        uf, crm, _, _ = REGISTRO.unpack_from(self._mm, self._inicio + i * REGISTRO.size)
+        return uf, crm
+
+
+class IndiceCrm:
+    def __init__(self, caminho: Path):
+        self.caminho = Path(caminho)
+        self._arquivo = open(self.caminho, "rb")
+        self._mm = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, self._n, self._inicio_heap, tamanho_colunas = CABECALHO.unpack_from(self._mm, 0)
+        if magico != MAGICO:
+            self.fechar()
+            raise ValueError(f"{self.caminho} não é um índice CRM ({magico!r})")
+        self.colunas: List[str] = json.loads(self._mm[CABECALHO.size:CABECALHO.size + tamanho_colunas])
+        self._inicio_registros = CABECALHO.size + tamanho_colunas
+        self._chaves = _Chaves(self._mm, self._inicio_registros, self._n)
+
+    def __len__(self):
+        return self._n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        self._mm.close()
+        self._arquivo.close()
+
+    def _linha(self, i: int) -> Dict:
+        _, _, deslocamento, tamanho = REGISTRO.unpack_from(self._mm, self._inicio_registros + i * REGISTRO.size)
+        inicio = self._inicio_heap + deslocamento
+        return dict(zip(self.colunas, json.loads(self._mm[inicio:inicio + tamanho])))
+
+    @staticmethod
+    def _uf(uf: str) -> bytes:
+        uf = uf.strip().upper()
+        if not re.fullmatch(_UF_VALIDA, uf):
+            raise ValueError(f"UF inválida: {uf!r} (esperado duas letras A-Z, ex.: 'SP')")
+        return uf.encode("ascii")
+
+    def busca(self, uf: str, crm: int) -> List[Dict]:
+        """Médico(s) com o CRM exato na UF (lista vazia se não houver)."""
+        chave = (self._uf(uf), int(crm))
+        inicio = bisect.bisect_left(self._chaves, chave)
+        fim = bisect.bisect_right(self._chaves, chave, lo=inicio)
+        return [self._linha(i) for i in range(inicio, fim)]
+
+    def faixa(self, uf: str, crm_inicio: int = 0, crm_fim: Optional[int] = None) -> Iterator[Dict]:
+        """Médicos da UF com CRM em [crm_inicio, crm_fim] (sem fim: até o último da UF), em ordem."""
+        uf_b = self._uf(uf)
+        inicio = bisect.bisect_left(self._chaves, (uf_b, int(crm_inicio)))
+        limite = (uf_b, int(crm_fim)) if crm_fim is not None else (uf_b, np.iinfo(np.uint32).max)
+        fim = bisect.bisect_right(self._chaves, limite, lo=inicio)
+        for i in range(inicio, fim):
+            yield self._linha(i)
+
+
+def construir(origem: Path, chunk_rows: int = 100_000) -> Path:
+    """Gera o índice de uma saída de merge já gravada (CSV ou Parquet), lendo em blocos."""
+    with ConstrutorIndiceCrm(origem) as construtor:  # remove heap/temporário se a leitura falhar
+        if origem.suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            for lote in pq.ParquetFile(origem).iter_batches(batch_size=chunk_rows):
+                construtor.adiciona(lote.to_pandas())
+        else:
+            for bloco in pd.read_csv(origem, dtype=str, encoding="utf-8-sig", chunksize=chunk_rows):
+                construtor.adiciona(bloco)
+        return construtor.salva()
+
+
+def main(argv=None):
+    if __package__:
+        from .juntar_dados_coletados import build_default_config
+    else:
+        from juntar_dados_coletados import build_default_config
+
+    padrao = build_default_config().output_path
+    parser = argparse.ArgumentParser(description="Índice binário por (UF, CRM) da saída do merge.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_construir = sub.add_parser("construir", help="Gera o índice a partir da saída do merge")
+    p_construir.add_argument("--origem", type=Path, default=padrao)
+    p_buscar = sub.add_parser("buscar", help="Busca exata (ou faixa, com --ate)")
+    p_buscar.add_argument("uf")
+    p_buscar.add_argument("crm", type=int)
+    p_buscar.add_argument("--ate", type=int, default=None, help="Último CRM da faixa")
+    p_buscar.add_argument("--indice", type=Path, default=caminho_indice(padrao))
+    args = parser.parse_args(argv)
+
+    if args.comando == "construir":
+        print(f"Índice salvo em: {construir(args.origem)}")
+        return
+    with IndiceCrm(args.indice) as indice:
+        achados = indice.busca(args.uf, args.crm) if args.ate is None else indice.faixa(args.uf, args.crm, args.ate)
+        for medico in achados:
+            print(json.dumps(medico, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    )
+    main()
@@ -0,0 +1,214 @@
+# indice_nomes.py
+"""
+Índice persistente de trigramas (SQLite) para busca aproximada de médicos por nome
+na saída do merge (`dados_medicos_por_uf.csv` ou `.parquet`).
+
+Os nomes são normalizados como no merge (`CsvMerger._strip_accents`, maiúsculas,
+só letras/dígitos) e quebrados em trigramas. A busca usa só os trigramas mais
+raros da consulta para achar candidatos e ordena esses candidatos pela
+similaridade de Jaccard dos trigramas, sem carregar a tabela de médicos.
+
+Uso:
+    python notebooks/indice_nomes.py construir [--origem dados_medicos_por_uf.csv]
+    python notebooks/indice_nomes.py buscar "maria aparecida santos" -n 10
+
+    from indice_nomes import IndiceNomes          # notebook aberto em notebooks/
+    from notebooks.indice_nomes import IndiceNomes  # a partir da raiz do repositório
+    IndiceNomes().buscar("joao da silva")
+
+O `juntar_dados_coletados` é importado do mesmo jeito que este módulo (como
+pacote ou solto), então nenhuma das formas depende do diretório atual.
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Set
+
+import pandas as pd
+
+if __package__:  # importado como notebooks.indice_nomes
+    from .juntar_dados_coletados import CsvMerger, build_default_config
+else:  # script ou notebook: notebooks/ é o diretório do módulo no sys.path
+    from juntar_dados_coletados import CsvMerger, build_default_config
+
+_NAO_ALFANUMERICO = re.compile(r"[^A-Z0-9]+")
+
+logger = logging.getLogger("indice_nomes")
+
+
+def normaliza(nome: str) -> str:
+    """'José da  Silva-Júnior' -> 'JOSE DA SILVA JUNIOR'."""
+    return _NAO_ALFANUMERICO.sub(" ", CsvMerger._strip_accents(nome).upper()).strip()
+
+
+def trigramas(texto_normalizado: str) -> Set[str]:
+    """Trigramas de cada palavra, com bordas (como no pg_trgm): 'ANA' -> {'  A', ' AN', 'ANA', 'NA '}."""
+    tris: Set[str] = set()
+    for palavra in texto_normalizado.split():
+        p = f"  {palavra} "
+        tris.update(p[i:i + 3] for i in range(len(p) - 2))
+    return tris
+
+
+class IndiceNomes:
+    def __init__(self, caminho: Optional[Path] = None):
+        base = build_default_config()
+        self.caminho = Path(caminho) if caminho else base.csv_dir.parent / "indice_nomes.sqlite"
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # ---------- construção ----------
+    @staticmethod
+    def _le_nomes(origem: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """Só as colunas nome/crm/uf da saída do merge, em blocos."""
+        if origem.suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            arquivo = pq.ParquetFile(origem)
+            colunas = [c for c in ("nome", "crm", "uf") if c in arquivo.schema_arrow.names]
+            for lote in arquivo.iter_batches(batch_size=chunk_rows, columns=colunas):
+                yield lote.to_pandas()
+            return
+        cab = pd.read_csv(origem, nrows=0, encoding="utf-8-sig").columns
+        colunas = [c for c in ("nome", "crm", "uf") if c in cab]
+        yield from pd.read_csv(origem, usecols=colunas, dtype=str, encoding="utf-8-sig", chunksize=chunk_rows)
+
+    def construir(self, origem: Optional[Path] = None, chunk_rows: int = 100_000) -> Path:
+        """(Re)constrói o índice a partir da saída do merge; grava num temporário e troca atomicamente."""
+        origem = Path(origem) if origem else build_default_config().output_path
+        inicio = perf_counter()
+        tmp = self.caminho.with_suffix(".tmp")
+        tmp.unlink(missing_ok=True)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(tmp)
+        conn.executescript("""
+            PRAGMA journal_mode=OFF;
+            PRAGMA synchronous=OFF;
+            CREATE TABLE medicos (id INTEGER PRIMARY KEY, nome TEXT, crm TEXT, uf TEXT, nome_norm TEXT);
+            CREATE TABLE postings (tri TEXT, medico_id INTEGER);
+            CREATE TABLE meta (chave TEXT PRIMARY KEY, valor TEXT);
+        """)
+        medico_id = 0
+        for bloco in self._le_nomes(origem, chunk_rows):
+            medicos, postings = [], []
+            for nome, crm, uf in zip(bloco["nome"],
+                                     bloco.get("crm", pd.Series(index=bloco.index, dtype=object)),
+                                     bloco.get("uf", pd.Series(index=bloco.index, dtype=object))):
+                if not isinstance(nome, str):
+                    continue
+                norm = normaliza(nome)
+                if not norm:
+                    continue
+                medicos.append((medico_id, nome, crm, uf, norm))
+                postings.extend((t, medico_id) for t in trigramas(norm))
+                medico_id += 1
+            conn.executemany("INSERT INTO medicos VALUES (?, ?, ?, ?, ?)", medicos)
+            conn.executemany("INSERT INTO postings VALUES (?, ?)", postings)
+
+        # índice e frequências só no fim (bem mais rápido que manter a chave durante a carga);
+        # a busca começa pelos trigramas mais raros
+        conn.executescript("""
+            CREATE INDEX idx_postings ON postings (tri, medico_id);
+            CREATE TABLE trigramas (tri TEXT PRIMARY KEY, freq INTEGER) WITHOUT ROWID;
+            INSERT INTO trigramas SELECT tri, COUNT(*) FROM postings GROUP BY tri;
+        """)
+        st = origem.stat()
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("origem", str(origem.resolve())), ("tamanho", str(st.st_size)), ("mtime_ns", str(st.st_mtime_ns)),
+            ("medicos", str(medico_id)),
+        ])
+        conn.commit()
+        conn.close()
+
+        self.fechar()
+        os.replace(tmp, self.caminho)
+        logger.info("Índice de nomes: %d médicos em %.1fs -> %s", medico_id, perf_counter() - inicio, self.caminho)
+        return self.caminho
+
+    # ---------- consulta ----------
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if not self.caminho.exists():
+                raise FileNotFoundError(f"Índice não encontrado: {self.caminho} (rode 'construir' antes)")
+            self._conn = sqlite3.connect(f"file:{self.caminho}?mode=ro", uri=True)
+            meta = dict(self._conn.execute("SELECT chave, valor FROM meta"))
+            origem = Path(meta["origem"])
+            if origem.exists() and str(origem.stat().st_mtime_ns) != meta["mtime_ns"]:
+                logger.warning("%s mudou depois da construção do índice; reconstrua para resultados atuais.", origem)
+        return self._conn
+
+    def buscar(self, consulta: str, limite: int = 10, min_score: float = 0.2,
+               max_trigramas: int = 8, max_candidatos: int = 2000) -> List[Dict]:
+        """
+        Médicos mais parecidos com `consulta`, do maior para o menor score
+        (Jaccard dos trigramas, 0..1). Candidatos: quem compartilha algum dos
+        `max_trigramas` trigramas mais raros da consulta.
+        """
+        alvo = trigramas(normaliza(consulta))
+        if not alvo:
+            return []
+        conn = self._conexao()
+
+        marcas = ",".join("?" * len(alvo))
+        freq = conn.execute(f"SELECT tri, freq FROM trigramas WHERE tri IN ({marcas})", list(alvo)).fetchall()
+        raros = [t for t, _ in sorted(freq, key=lambda x: x[1])[:max_trigramas]]
+        if not raros:
+            return []
+
+        marcas = ",".join("?" * len(raros))
+        candidatos = conn.execute(f"""
+            SELECT m.id, m.nome, m.crm, m.uf, m.nome_norm
+            FROM (SELECT medico_id, COUNT(*) AS n FROM postings WHERE tri IN ({marcas})
+                  GROUP BY medico_id ORDER BY n DESC LIMIT ?) AS c
+            JOIN medicos m ON m.id = c.medico_id
+        """, [*raros, max_candidatos]).fetchall()
+
+        resultados = []
+        for medico_id, nome, crm, uf, norm in candidatos:
+            tris = trigramas(norm)
+            score = len(alvo & tris) / len(alvo | tris)
+            if score >= min_score:
+                resultados.append({"nome": nome, "crm": crm, "uf": uf, "score": round(score, 3), "id": medico_id})
+        resultados.sort(key=lambda r: (-r["score"], r["id"]))
+        return resultados[:limite]
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Índice de trigramas para busca de médicos por nome.")
+    parser.add_argument("--indice", type=Path, default=None, help="Arquivo SQLite do índice")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_construir = sub.add_parser("construir", help="(Re)constrói o índice a partir da saída do merge")
+    p_construir.add_argument("--origem", type=Path, default=None)
+    p_buscar = sub.add_parser("buscar", help="Busca aproximada por nome")
+    p_buscar.add_argument("nome")
+    p_buscar.add_argument("-n", "--limite", type=int, default=10)
+    p_buscar.add_argument("--min-score", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    indice = IndiceNomes(args.indice)
+    if args.comando == "construir":
+        print(f"Índice salvo em: {indice.construir(args.origem)}")
+        return
+    inicio = perf_counter()
+    resultados = indice.buscar(args.nome, limite=args.limite, min_score=args.min_score)
+    for r in resultados:
+        print(f"{r['score']:.3f}  {r['nome']}  {r['crm'] or ''}  {r['uf'] or ''}")
+    print(f"{len(resultados)} resultado(s) em {(perf_counter() - inicio) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    )
+    main()
@@ -1,16 +1,46 @@
 # merge_cfm_csvs.py
 # from _future_ import annotations
+"""
+Merge dos CSVs coletados em `data/dados_csv` numa única saída (CSV ou Parquet).
 
+    python notebooks/juntar_dados_coletados.py [--parquet] [--em-blocos] [--indice-crm] [--incremental]
+
+`--incremental` liga o cache do merge (`data/cache_merge`): só arquivos novos
+ou alterados são relidos. Sem ele nada é gravado além da saída.
+
+Os módulos irmãos (`especialidades`, `indice_crm`) são importados de forma
+independente do diretório atual: como pacote (`notebooks.juntar_dados_coletados`,
+a partir da raiz do repositório) ou como módulo solto (`python
+notebooks/juntar_dados_coletados.py`, ou um notebook aberto em notebooks/).
+"""
+
+import csv
+import hashlib
+import json
 import logging
+import math
+import os
+import pickle
 import re
+import tempfile
 import unicodedata
-from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
+if __package__:  # importado como notebooks.juntar_dados_coletados
+    from .especialidades import TabelaEspecialidades, coluna_especialidade
+    from .indice_crm import ConstrutorIndiceCrm
+else:  # script ou notebook: notebooks/ é o diretório do módulo no sys.path
+    from especialidades import TabelaEspecialidades, coluna_especialidade
+    from indice_crm import ConstrutorIndiceCrm
+
+_ESPACOS = re.compile(r"\s+")
+
 
 @dataclass
 class CsvMergeConfig:
@@ -41,14 +71,61 @@ class CsvMergeConfig:
         r"^inscricao$": "inscricao",
         r"^cpf$": "cpf",
     })
-    # heurística: se passar deste nº de colunas, tentar separador ';'
-    too_many_cols_threshold: int = 60
+    # detecção de encoding/separador: só os primeiros `sniff_bytes` de cada arquivo são lidos
+    sniff_bytes: int = 64 * 1024
+    delimiter_candidates: List[str] = field(default_factory=lambda: [",", ";", "\t", "|"])
+    # engine do pd.read_csv: None/"c" (padrão) ou "pyarrow" (mais rápido; requer pyarrow)
+    csv_engine: Optional[str] = None
+    # processos na leitura dos arquivos (None = nº de CPUs; 1 = sequencial, no próprio processo)
+    max_workers: Optional[int] = None
+    # merge incremental: manifesto dos arquivos processados + frames já canonizados (None desliga)
+    cache_dir: Optional[Path] = None
+    # merge em blocos (fora da memória): lê `chunk_rows` linhas por vez, particiona por hash da
+    # chave de dedup em arquivos temporários (em `spill_dir`) e deduplica partição a partição;
+    # o nº de partições é escolhido para cada uma caber em `memory_limit_mb`
+    chunked: bool = False
+    chunk_rows: int = 100_000
+    memory_limit_mb: int = 1024
+    spill_dir: Optional[Path] = None
+    # grava, ao lado da saída, o vocabulário de especialidades e a tabela médico -> especialidade
+    build_specialties: bool = True
+    # grava, ao lado da saída, o índice binário por (uf, crm) para consultas via mmap (indice_crm.py)
+    build_crm_index: bool = False
+    # "csv" ou "parquet" (requer pyarrow); no Parquet o sufixo de output_path vira .parquet
+    output_format: str = "csv"
+    # esquema do Parquet: colunas de baixa cardinalidade (dicionário), datas dd/mm/aaaa e anos
+    categorical_cols: List[str] = field(default_factory=lambda: [
+        "uf", "situacao", "especialidade", "instituicao_graduacao", "inscricao", "tipo_inscricao"
+    ])
+    date_cols: List[str] = field(default_factory=lambda: ["data_inscricao", "primeira_inscricao_uf"])
+    year_cols: List[str] = field(default_factory=lambda: ["ano_formatura"])
+
+
+@dataclass
+class CsvSniff:
+    """Resultado da detecção para um arquivo (o encoding final pode mudar se a amostra enganar)."""
+    encoding: str
+    sep: str
+    engine: str
+    colunas: int
+
+
+def _ingere_arquivo(args: Tuple[CsvMergeConfig, Path]) -> Tuple[Optional[pd.DataFrame], Optional[CsvSniff], Optional[str]]:
+    """Worker do pool: lê, canoniza e limpa um arquivo. Erros voltam como texto para o processo principal."""
+    cfg, path = args
+    merger = CsvMerger(cfg)
+    try:
+        df = merger.ingere_arquivo(path)
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+    return df, merger.sniffs.get(path), None
 
 
 class CsvMerger:
     def __init__(self, config: CsvMergeConfig):
         self.cfg = config
         self.log = logging.getLogger(self.__class__.__name__)
+        self.sniffs: Dict[Path, CsvSniff] = {}
 
     # ---------- utils de normalização ----------
     @staticmethod
@@ -78,41 +155,476 @@ class CsvMerger:
     def limpa_linha(self, v: Optional[str]) -> Optional[str]:
         if isinstance(v, str):
             v = v.strip()
-            v = re.sub(r"\s+", " ", v)
+            v = _ESPACOS.sub(" ", v)
             return v
         return v
 
+    @staticmethod
+    def limpa_serie(s: pd.Series) -> pd.Series:
+        """
+        Mesma limpeza de `limpa_linha`, em lote: cada valor distinto é limpo uma
+        vez (`" ".join(v.split())` equivale a strip + colapso de `\\s+`) e o
+        resultado é espalhado de volta pelos códigos do `factorize`. Nulos
+        continuam nulos (não passam por str).
+        """
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        if len(uniques) == 0:
+            return s
+        limpos = np.array([" ".join(v.split()) for v in uniques], dtype=object)
+        valores = limpos[codes]
+        valores[codes == -1] = np.nan
+        return pd.Series(valores, index=s.index, name=s.name)
+
+    def limpa_colunas(self, df: pd.DataFrame) -> pd.DataFrame:
+        for c in df.columns:
+            if pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c]):
+                df[c] = self.limpa_serie(df[c])
+        return df
+
     # ---------- leitura robusta ----------
+    def detecta_encoding(self, amostra: bytes, truncada: bool) -> Optional[str]:
+        for enc in self.cfg.encoding_priority:
+            try:
+                amostra.decode(enc)
+                return enc
+            except UnicodeDecodeError as e:
+                # a amostra pode terminar no meio de um caractere multibyte
+                if truncada and e.start >= len(amostra) - 3:
+                    try:
+                        amostra[:e.start].decode(enc)
+                        return enc
+                    except UnicodeDecodeError:
+                        pass
+        return None
+
+    def detecta_separador(self, texto: str, truncada: bool) -> str:
+        linhas = texto.splitlines()
+        if truncada and len(linhas) > 1:
+            linhas = linhas[:-1]  # última linha possivelmente cortada
+        linhas = linhas[:200]
+        melhor, melhor_score = ",", (0.0, 1)
+        for sep in self.cfg.delimiter_candidates:
+            larguras = [len(r) for r in csv.reader(linhas, delimiter=sep) if r]
+            if not larguras or larguras[0] < 2:
+                continue
+            # fração de linhas com a largura do cabeçalho, depois nº de colunas
+            score = (sum(w == larguras[0] for w in larguras) / len(larguras), larguras[0])
+            if score > melhor_score:
+                melhor, melhor_score = sep, score
+        return melhor
+
+    def sniff(self, path: Path) -> CsvSniff:
+        """Lê só o início do arquivo para decidir encoding e separador."""
+        with open(path, "rb") as fh:
+            amostra = fh.read(self.cfg.sniff_bytes + 1)
+        truncada = len(amostra) > self.cfg.sniff_bytes
+        amostra = amostra[:self.cfg.sniff_bytes]
+
+        enc = self.detecta_encoding(amostra, truncada) or self.cfg.encoding_priority[-1]
+        texto = amostra.decode(enc, errors="ignore")
+        sep = self.detecta_separador(texto, truncada)
+        return CsvSniff(encoding=enc, sep=sep, engine=self.engine(), colunas=0)
+
+    def engine(self) -> str:
+        if self.cfg.csv_engine == "pyarrow":
+            try:
+                import pyarrow  # noqa: F401
+                return "pyarrow"
+            except ImportError:
+                self.log.warning("csv_engine='pyarrow' indisponível (pyarrow não instalado); usando 'c'.")
+                self.cfg.csv_engine = "c"
+        return "c"
+
     def le_csv_robusto(self, path: Path) -> pd.DataFrame:
+        sniff = self.sniff(path)
+        kwargs = dict(sep=sniff.sep, dtype=str, on_bad_lines="skip", engine=sniff.engine)
+        if sniff.engine == "c":
+            kwargs["low_memory"] = False
+
+        # uma leitura; só troca de encoding se a amostra não representou o arquivo inteiro
+        encodings = [sniff.encoding] + [e for e in self.cfg.encoding_priority if e != sniff.encoding]
         last_err = None
-        df: Optional[pd.DataFrame] = None
+        for enc in encodings:
+            try:
+                df = pd.read_csv(path, encoding=enc, **kwargs)
+            except pd.errors.EmptyDataError:
+                raise
+            except (UnicodeDecodeError, ValueError) as e:
+                last_err = e
+                self.log.debug("Releitura de %s: encoding %s falhou (%s)", path, enc, e)
+                continue
+            sniff.encoding, sniff.colunas = enc, df.shape[1]
+            self.sniffs[path] = sniff
+            self.log.info("Lido %s | encoding=%s | sep=%r | engine=%s | colunas=%d",
+                          path.name, sniff.encoding, sniff.sep, sniff.engine, sniff.colunas)
+            return df
 
-        # tenta encodings com sep=","
-        for enc in self.cfg.encoding_priority:
+        raise RuntimeError(f"Falha lendo {path} com encodings {encodings}: {last_err}")
+
+    # ---------- saída ----------
+    def esquema_parquet(self, df: pd.DataFrame):
+        pa, _ = self._pyarrow()
+
+        campos = []
+        for c in df.columns:
+            if c in self.cfg.categorical_cols:
+                tipo = pa.dictionary(pa.int32(), pa.string())
+            elif c in self.cfg.date_cols:
+                tipo = pa.date32()
+            elif c in self.cfg.year_cols:
+                tipo = pa.int16()
+            else:
+                tipo = pa.string()
+            campos.append(pa.field(c, tipo))
+        return pa.schema(campos)
+
+    @staticmethod
+    def _pyarrow():
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise SystemExit("output_format='parquet' requer o pacote pyarrow (pip install pyarrow).") from e
+        return pa, pq
+
+    def tabela_parquet(self, df: pd.DataFrame):
+        pa, _ = self._pyarrow()
+        df = df.copy()
+        for c in df.columns:
+            if c in self.cfg.date_cols:
+                df[c] = pd.to_datetime(df[c], format="%d/%m/%Y", errors="coerce")
+            elif c in self.cfg.year_cols:
+                df[c] = pd.to_numeric(df[c].str[:4], errors="coerce").astype("Int16")
+            elif c in self.cfg.categorical_cols:
+                df[c] = df[c].astype("category")
+
+        return pa.Table.from_pandas(df, schema=self.esquema_parquet(df), preserve_index=False, safe=False)
+
+    def salva_parquet(self, df: pd.DataFrame, path: Path) -> Path:
+        _, pq = self._pyarrow()
+        path = path.with_suffix(".parquet")
+        pq.write_table(self.tabela_parquet(df), path, compression="zstd")
+        return path
+
+    # ---------- ingestão ----------
+    def ingere_arquivo(self, path: Path) -> pd.DataFrame:
+        df = self.le_csv_robusto(path)
+        df = self.canoniza_headers(df)
+        return df.dropna(axis=1, how="all")
+
+    def ingere_arquivos(self, files: List[Path]) -> Dict[Path, pd.DataFrame]:
+        """Lê os arquivos em paralelo; a ordem do resultado segue `files` (concatenação determinística)."""
+        workers = self.cfg.max_workers or os.cpu_count() or 1
+        workers = min(workers, len(files))
+        tarefas = [(self.cfg, f) for f in files]
+        if workers <= 1:
+            resultados = map(_ingere_arquivo, tarefas)
+            return self._coleta_resultados(files, resultados)
+
+        self.log.info("Lendo %d arquivo(s) com %d processo(s)", len(files), workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = pool.map(_ingere_arquivo, tarefas, chunksize=max(1, len(files) // (workers * 4)))
+            return self._coleta_resultados(files, resultados)
+
+    def _coleta_resultados(self, files: List[Path], resultados) -> Dict[Path, pd.DataFrame]:
+        dfs: Dict[Path, pd.DataFrame] = {}
+        for f, (df, sniff, erro) in zip(files, resultados):
+            if erro is not None:
+                self.log.warning("Falha lendo %s: %s", f, erro)
+                continue
+            if sniff is not None:
+                self.sniffs[f] = sniff
+            dfs[f] = df
+        return dfs
+
+    # ---------- merge incremental (manifesto + cache) ----------
+    @staticmethod
+    def sha256_arquivo(path: Path) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for bloco in iter(lambda: fh.read(1 << 20), b""):
+                h.update(bloco)
+        return h.hexdigest()
+
+    def assinatura_config(self) -> str:
+        """Muda quando muda algo que afeta os frames canonizados (invalida todo o cache)."""
+        relevante = {k: self.cfg.__dict__[k] for k in (
+            "encoding_priority", "canonical_map", "sniff_bytes", "delimiter_candidates")}
+        return hashlib.sha256(json.dumps(relevante, sort_keys=True).encode()).hexdigest()[:16]
+
+    def carrega_manifesto(self) -> Dict:
+        path = self.cfg.cache_dir / "manifest.json"
+        try:
+            manifesto = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {"config": self.assinatura_config(), "arquivos": {}, "saida": None}
+        if manifesto.get("config") != self.assinatura_config():
+            self.log.info("Configuração de leitura mudou; cache do merge será refeito.")
+            return {"config": self.assinatura_config(), "arquivos": {}, "saida": None}
+        return manifesto
+
+    def salva_manifesto(self, manifesto: Dict):
+        path = self.cfg.cache_dir / "manifest.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifesto, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def ingere_com_cache(self, files: List[Path]) -> Tuple[Dict[Path, pd.DataFrame], bool]:
+        """
+        Devolve os frames canonizados de `files` (na ordem de `files`) e se algo
+        mudou desde o último merge. Só arquivos novos ou alterados (tamanho/mtime
+        e, se estes mudarem, sha256) são lidos; os demais vêm do cache.
+        """
+        cache = self.cfg.cache_dir
+        cache.mkdir(parents=True, exist_ok=True)
+        manifesto = self.carrega_manifesto()
+        anteriores: Dict[str, Dict] = manifesto["arquivos"]
+        atuais: Dict[str, Dict] = {}
+        pendentes: List[Path] = []
+
+        for f in files:
+            chave = str(f.relative_to(self.cfg.csv_dir))
+            st = f.stat()
+            entrada = anteriores.get(chave)
+            if entrada and (cache / entrada["cache"]).exists():
+                if entrada["size"] == st.st_size and entrada["mtime_ns"] == st.st_mtime_ns:
+                    atuais[chave] = entrada
+                    continue
+                sha = self.sha256_arquivo(f)
+                if sha == entrada["sha256"]:  # só o mtime mudou
+                    atuais[chave] = {**entrada, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                    continue
+            pendentes.append(f)
+
+        removidos = set(anteriores) - {str(f.relative_to(self.cfg.csv_dir)) for f in files}
+        self.log.info("Merge incremental: %d em cache, %d novo(s)/alterado(s), %d removido(s)",
+                      len(atuais), len(pendentes), len(removidos))
+
+        novos = self.ingere_arquivos(pendentes) if pendentes else {}
+        for f, df in novos.items():
+            st = f.stat()
+            sha = self.sha256_arquivo(f)
+            nome_cache = f"{sha[:24]}.pkl"
+            df.to_pickle(cache / nome_cache)
+            sniff = self.sniffs.get(f)
+            atuais[str(f.relative_to(self.cfg.csv_dir))] = {
+                "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha, "cache": nome_cache,
+                "sniff": asdict(sniff) if sniff else None,
+            }
+
+        # frames de arquivos removidos/alterados que nenhum arquivo atual referencia
+        em_uso = {e["cache"] for e in atuais.values()}
+        for entrada in anteriores.values():
+            if entrada["cache"] not in em_uso:
+                (cache / entrada["cache"]).unlink(missing_ok=True)
+
+        dfs: Dict[Path, pd.DataFrame] = {}
+        for f in files:
+            entrada = atuais.get(str(f.relative_to(self.cfg.csv_dir)))
+            if entrada is None:
+                continue  # falhou na leitura (já registrado)
+            dfs[f] = novos[f] if f in novos else pd.read_pickle(cache / entrada["cache"])
+
+        saida_anterior = {k: v for k, v in (manifesto.get("saida") or {}).items() if k not in ("arquivo", "artefatos")}
+        mudou = saida_anterior != self.assinatura_saida(atuais)
+        manifesto["arquivos"] = atuais
+        self.salva_manifesto(manifesto)
+        return dfs, mudou
+
+    def assinatura_saida(self, arquivos: Dict[str, Dict]) -> Dict:
+        """
+        Identifica a saída pelo conjunto de entradas (caminho + sha256), pelo
+        destino e pelos artefatos pedidos (especialidades, índice CRM).
+        """
+        conteudo = json.dumps(sorted((k, v["sha256"]) for k, v in arquivos.items()))
+        return {
+            "entradas": hashlib.sha256(conteudo.encode()).hexdigest()[:16],
+            "formato": self.cfg.output_format,
+            "path": str(self.cfg.output_path),
+            "especialidades": self.cfg.build_specialties,
+            "indice_crm": self.cfg.build_crm_index,
+            "chunked": self.cfg.chunked,
+        }
+
+    # ---------- especialidades ----------
+    def tabela_especialidades(self, colunas: Sequence[str]) -> Optional[Tuple[TabelaEspecialidades, str, List[str]]]:
+        """(construtor, coluna de especialidade, chave do médico), ou None se não se aplica."""
+        coluna = coluna_especialidade(colunas)
+        if not self.cfg.build_specialties or coluna is None:
+            return None
+        chave = [c for c in ("crm", "uf") if c in colunas] or ["nome"]
+        return TabelaEspecialidades(), coluna, chave
+
+    def salva_especialidades(self, tabela: TabelaEspecialidades, output: Path) -> Tuple[Path, Path]:
+        vocab_path, ligacao_path = tabela.salva(output)
+        self.log.info("Especialidades: %s | ligação médico->especialidade: %s", vocab_path, ligacao_path)
+        return vocab_path, ligacao_path
+
+    # ---------- merge em blocos (fora da memória) ----------
+    # bytes em memória (pandas, object) por byte de CSV: usado para dimensionar as partições
+    _EXPANSAO_MEMORIA = 5
+
+    def le_em_blocos(self, path: Path) -> Iterator[pd.DataFrame]:
+        """Como `le_csv_robusto`, mas em blocos de `chunk_rows` linhas (com cabeçalhos canonizados)."""
+        sniff = self.sniff(path)
+        # o engine pyarrow não lê em blocos
+        kwargs = dict(sep=sniff.sep, dtype=str, on_bad_lines="skip", chunksize=self.cfg.chunk_rows)
+        encodings = [sniff.encoding] + [e for e in self.cfg.encoding_priority if e != sniff.encoding]
+        lidas, last_err = 0, None
+        for enc in encodings:
+            pular = lidas  # se o encoding falhar no meio do arquivo, retoma de onde parou
             try:
-                df = pd.read_csv(path, sep=",", dtype=str, low_memory=False,
-                                 on_bad_lines="skip", encoding=enc)
-                break
-            except Exception as e:
+                with pd.read_csv(path, encoding=enc, **kwargs) as leitor:
+                    for bloco in leitor:
+                        if pular:
+                            if len(bloco) <= pular:
+                                pular -= len(bloco)
+                                continue
+                            bloco, pular = bloco.iloc[pular:], 0
+                        lidas += len(bloco)
+                        yield self.canoniza_headers(bloco)
+            except pd.errors.EmptyDataError:
+                raise
+            except (UnicodeDecodeError, ValueError) as e:
                 last_err = e
+                self.log.debug("Releitura de %s: encoding %s falhou (%s)", path, enc, e)
+                continue
+            sniff.encoding, sniff.engine = enc, "c"
+            self.sniffs[path] = sniff
+            self.log.info("Lido em blocos %s | encoding=%s | sep=%r | linhas=%d", path.name, enc, sniff.sep, lidas)
+            return
+        raise RuntimeError(f"Falha lendo {path} com encodings {encodings}: {last_err}")
 
-        if df is None:
-            raise RuntimeError(f"Falha lendo {path} com encodings {self.cfg.encoding_priority}: {last_err}")
+    def colunas_dos_arquivos(self, files: List[Path]) -> List[str]:
+        """União (em ordem de aparição) dos cabeçalhos canonizados, lendo só o início de cada arquivo."""
+        colunas: Dict[str, None] = {}
+        for f in files:
+            try:
+                sniff = self.sniff(f)
+                cab = pd.read_csv(f, sep=sniff.sep, encoding=sniff.encoding, nrows=0, dtype=str)
+            except Exception as e:
+                self.log.warning("Falha lendo cabeçalho de %s: %s", f, e)
+                continue
+            colunas.update(dict.fromkeys(self.canoniza_headers(cab).columns))
+        return list(colunas)
 
-        # heurística: se muitas colunas, experimente ';'
-        if df.shape[1] > self.cfg.too_many_cols_threshold:
-            for enc in self.cfg.encoding_priority:
+    @staticmethod
+    def _le_particao(path: Path) -> Iterator[pd.DataFrame]:
+        with open(path, "rb") as fh:
+            while True:
                 try:
-                    df2 = pd.read_csv(path, sep=";", dtype=str, low_memory=False,
-                                      on_bad_lines="skip", encoding=enc)
-                    # escolha a variante com menos colunas (provável parse correto)
-                    if df2.shape[1] < df.shape[1]:
-                        df = df2
-                    break
-                except Exception:
-                    continue
+                    yield pickle.load(fh)
+                except EOFError:
+                    return
 
-        return df
+    def merge_em_blocos(self, files: List[Path]) -> Path:
+        """
+        Merge com memória limitada. 1ª passada: cada arquivo é lido em blocos e
+        cada linha vai para a partição `hash(chave) % n` num arquivo temporário,
+        com seu número de ordem global. 2ª passada: cada partição é carregada
+        sozinha, ordenada, deduplicada (keep="first", como no merge em memória),
+        limpa e acrescentada à saída. Linhas iguais na chave caem sempre na mesma
+        partição, então o resultado tem as mesmas linhas do merge em memória; a
+        ordem da saída é por partição e, dentro dela, a de entrada.
+        """
+        colunas = self.colunas_dos_arquivos(files)
+        if {"crm", "uf"}.issubset(colunas):
+            chave_particao = ["crm", "uf"]
+        elif {"nome", "uf"}.issubset(colunas):
+            chave_particao = ["nome", "uf"]
+        else:
+            chave_particao = colunas
+
+        limite = self.cfg.memory_limit_mb * 2**20
+        total = sum(f.stat().st_size for f in files)
+        n = max(1, math.ceil(total * self._EXPANSAO_MEMORIA / limite))
+        self.log.info("Merge em blocos: %d arquivo(s), %.1f MB, %d partição(ões), teto %d MB",
+                      len(files), total / 2**20, n, self.cfg.memory_limit_mb)
+
+        with tempfile.TemporaryDirectory(prefix="merge_", dir=self.cfg.spill_dir) as tmp:
+            caminhos = [Path(tmp) / f"particao_{i:04d}.pkl" for i in range(n)]
+            nao_nulos = pd.Series(0, index=colunas, dtype="int64")
+            ordem = 0
+
+            # 1ª passada: particiona
+            handles = [open(p, "wb") for p in caminhos]
+            try:
+                for f in files:
+                    try:
+                        for bloco in self.le_em_blocos(f):
+                            bloco = bloco.loc[:, ~bloco.columns.duplicated()].reindex(columns=colunas)
+                            bloco.index = pd.RangeIndex(ordem, ordem + len(bloco))
+                            ordem += len(bloco)
+                            nao_nulos += bloco.notna().sum()
+                            destino = pd.util.hash_pandas_object(bloco[chave_particao], index=False).to_numpy() % n
+                            for i in np.unique(destino):
+                                pickle.dump(bloco[destino == i], handles[i], protocol=pickle.HIGHEST_PROTOCOL)
+                    except Exception as e:
+                        self.log.warning("Falha lendo %s: %s", f, e)
+            finally:
+                for h in handles:
+                    h.close()
+
+            if ordem == 0:
+                raise SystemExit("Nenhum CSV legível após tentativas.")
+
+            # colunas inteiramente vazias somem, como no dropna por arquivo do merge em memória
+            presentes = [c for c in colunas if nao_nulos[c] > 0]
+            ordered = [c for c in self.cfg.priority_cols if c in presentes] + \
+                      [c for c in presentes if c not in self.cfg.priority_cols]
+            if {"crm", "uf"}.issubset(presentes):
+                subset = ["crm", "uf"]
+            elif {"nome", "uf"}.issubset(presentes):
+                subset = ["nome", "uf"]
+            else:
+                subset = ordered
+
+            # 2ª passada: deduplica e grava partição a partição
+            self.cfg.output_path.parent.mkdir(parents=True, exist_ok=True)
+            parquet = self.cfg.output_format == "parquet"
+            output = self.cfg.output_path.with_suffix(".parquet") if parquet else self.cfg.output_path
+            writer, linhas = None, 0
+            especialidades = self.tabela_especialidades(ordered)
+            indice_crm = ConstrutorIndiceCrm(output) if self.cfg.build_crm_index else None
+            try:
+                for i, caminho in enumerate(caminhos):
+                    blocos = list(self._le_particao(caminho))
+                    if not blocos:
+                        continue
+                    part = pd.concat(blocos).sort_index(kind="stable")[ordered]
+                    part = part.drop_duplicates(subset=subset, keep="first")
+                    part = self.limpa_colunas(part)
+                    if especialidades:
+                        especialidades[0].adiciona(part, especialidades[1], especialidades[2])
+                    if indice_crm:
+                        indice_crm.adiciona(part)
+                    linhas += len(part)
+                    self.log.debug("Partição %d: %d linhas após dedup", i, len(part))
+                    if parquet:
+                        tabela = self.tabela_parquet(part)
+                        if writer is None:
+                            writer = self._pyarrow()[1].ParquetWriter(output, tabela.schema, compression="zstd")
+                        writer.write_table(tabela)
+                    else:
+                        primeira = writer is None
+                        part.to_csv(output, index=False, header=primeira, mode="w" if primeira else "a",
+                                    encoding="utf-8-sig" if primeira else "utf-8")
+                        writer = True
+                    caminho.unlink()
+            except BaseException:
+                if indice_crm:
+                    indice_crm.descarta()  # não deixa o heap temporário para trás
+                raise
+            finally:
+                if parquet and writer is not None:
+                    writer.close()
+            if especialidades:
+                self.salva_especialidades(especialidades[0], output)
+            if indice_crm:
+                indice_crm.salva()
+
+        self.log.info("Merge concluído: %s | linhas=%d | colunas=%d", output, linhas, len(ordered))
+        return output
 
     # ---------- descoberta de arquivos ----------
     def descobre_csvs(self) -> List[Path]:
@@ -132,24 +644,24 @@ class CsvMerger:
         if not files:
             raise SystemExit(f"Nenhum CSV encontrado em: {self.cfg.csv_dir}")
 
-        dfs: List[pd.DataFrame] = []
-        for f in files:
-            try:
-                df = self.le_csv_robusto(f)
-                df = self.canoniza_headers(df)
-                df = df.dropna(axis=1, how="all")
-                dfs.append(df)
-            except Exception as e:
-                self.log.warning("Falha lendo %s: %s", f, e)
+        if self.cfg.chunked:  # não usa o cache do merge incremental (que guarda frames inteiros)
+            return self.merge_em_blocos(files)
 
+        if self.cfg.cache_dir is not None:
+            dfs, mudou = self.ingere_com_cache(files)
+            manifesto = self.carrega_manifesto()
+            saida = manifesto.get("saida") or {}
+            anterior = saida.get("arquivo")
+            gerados = [anterior, *saida.get("artefatos", [])] if anterior else []
+            if not mudou and gerados and all(Path(p).exists() for p in gerados):
+                self.log.info("Nenhum CSV novo ou alterado; saída mantida: %s", anterior)
+                return Path(anterior)
+        else:
+            dfs = self.ingere_arquivos(files)
         if not dfs:
             raise SystemExit("Nenhum CSV legível após tentativas.")
 
-        full = pd.concat(dfs, ignore_index=True, sort=False)
-
-        # normaliza tipos/strings
-        for c in full.columns:
-            full[c] = full[c].astype(str).replace({"nan": np.nan, "None": np.nan})
+        full = pd.concat(list(dfs.values()), ignore_index=True, sort=False)
 
         # reordena: prioritárias primeiro
         ordered = [c for c in self.cfg.priority_cols if c in full.columns] + \
@@ -164,30 +676,54 @@ class CsvMerger:
         else:
             full = full.drop_duplicates(keep="first")
 
-        # limpeza de espaços múltiplos
-        full = full.applymap(self.limpa_linha)
+        # limpeza de espaços múltiplos (as colunas já são texto: lidas com dtype=str)
+        full = self.limpa_colunas(full)
 
         # salva
         self.cfg.output_path.parent.mkdir(parents=True, exist_ok=True)
-        full.to_csv(self.cfg.output_path, index=False, encoding="utf-8-sig")
+        if self.cfg.output_format == "parquet":
+            output = self.salva_parquet(full, self.cfg.output_path)
+        else:
+            output = self.cfg.output_path
+            full.to_csv(output, index=False, encoding="utf-8-sig")
+
+        artefatos: List[Path] = []
+        especialidades = self.tabela_especialidades(full.columns)
+        if especialidades:
+            tabela, coluna, chave = especialidades
+            tabela.adiciona(full, coluna, chave)
+            artefatos.extend(self.salva_especialidades(tabela, output))
+
+        if self.cfg.build_crm_index:
+            with ConstrutorIndiceCrm(output) as indice_crm:
+                indice_crm.adiciona(full)
+                artefatos.append(indice_crm.salva())
+
+        if self.cfg.cache_dir is not None:
+            manifesto["saida"] = {**self.assinatura_saida(manifesto["arquivos"]), "arquivo": str(output),
+                                  "artefatos": [str(p) for p in artefatos]}
+            self.salva_manifesto(manifesto)
 
         self.log.info("Merge concluído: %s | linhas=%d | colunas=%d",
-                      self.cfg.output_path, full.shape[0], full.shape[1])
-        return self.cfg.output_path
+                      output, full.shape[0], full.shape[1])
+        return output
 
 
-def build_default_config(base_dir: Optional[Path] = None) -> CsvMergeConfig:
+def build_default_config(base_dir: Optional[Path] = None, output_format: str = "csv",
+                         incremental: bool = False) -> CsvMergeConfig:
     """
     Considera a estrutura:
     <SCRIPT_AQUI>/
       data/
         dados_csv/   <-- CSVs
+        cache_merge/ <-- manifesto + frames canonizados (só com incremental=True)
     """
     base = base_dir or (Path(__file__).resolve().parent / "..").resolve()
     data_dir = base / "data"
     csv_dir = data_dir / "dados_csv"
     out = base / "dados_medicos_por_uf.csv"
-    return CsvMergeConfig(csv_dir=csv_dir, output_path=out)
+    return CsvMergeConfig(csv_dir=csv_dir, output_path=out, output_format=output_format,
+                          cache_dir=data_dir / "cache_merge" if incremental else None)
 
 
 if __name__ == "__main__":
@@ -195,7 +731,12 @@ if __name__ == "__main__":
         level=logging.INFO,
         format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
     )
-    cfg = build_default_config()
+    import sys
+
+    cfg = build_default_config(output_format="parquet" if "--parquet" in sys.argv[1:] else "csv",
+                               incremental="--incremental" in sys.argv[1:])
+    cfg.chunked = "--em-blocos" in sys.argv[1:]
+    cfg.build_crm_index = "--indice-crm" in sys.argv[1:]
     merger = CsvMerger(cfg)
     output = merger.merge()
     print(f"Arquivo final salvo em: {output.resolve()}")
\ No newline at end of file
@@ -0,0 +1,159 @@
+# tratar_dados.py
+"""
+Tratamento de `dados_medicos_por_uf_nao_tratados.csv` (saída do merge) em
+`todos_medicos_por_uf.csv`, com esquema explícito.
+
+As colunas do ESQUEMA são localizadas pelo nome normalizado (não pela posição)
+e lidas já com o tipo final: texto de baixa cardinalidade como `category`,
+texto quase único por linha (nome, CRM, endereço, telefone) como `string`,
+datas dd/mm/aaaa convertidas a partir das categorias (cada data distinta é
+interpretada uma única vez) e o ano como `Int16`. As demais colunas da
+entrada são mantidas como `string` (`manter_extras=False` lê só o ESQUEMA).
+Cada etapa registra tempo e memória do DataFrame.
+
+Uso no notebook:
+    from tratar_dados import tratar
+    df = tratar()
+
+Ou pela linha de comando:
+    python notebooks/tratar_dados.py
+"""
+
+import logging
+import re
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+BASE_DIR = (Path(__file__).resolve().parent / ".." / "data" / "dados_completos_e_tratados").resolve()
+ENTRADA = BASE_DIR / "dados_medicos_por_uf_nao_tratados.csv"
+SAIDA = BASE_DIR / "todos_medicos_por_uf.csv"
+
+# coluna (nome normalizado) -> tipo final: "string", "category", "date" ou "year"
+ESQUEMA: Dict[str, str] = {
+    "nome": "string",
+    "crm": "string",
+    "situacao": "category",
+    "endereco": "string",
+    "telefone": "string",
+    "inscricao": "category",
+    "data_de_inscricao": "date",
+    "primeira_inscricao_na_uf": "date",
+    "especialidades_areas_de_atuacao": "category",
+    "instituicao_de_graduacao": "category",
+    "ano_de_formatura": "year",
+    "instituicao_de_revalidacao": "category",
+}
+
+# marcadores de ausência usados nos CSVs coletados (além dos padrões do pandas, que incluem "N/A" e "")
+NULOS = ["Missing value", "missing value", "N/A", ""]
+
+logger = logging.getLogger("tratar_dados")
+
+
+def normalizar_coluna(col: str) -> str:
+    """'Especialidades/Áreas de Atuação ' -> 'especialidades_areas_de_atuacao'."""
+    col = "".join(c for c in unicodedata.normalize("NFKD", str(col)) if not unicodedata.combining(c))
+    col = col.strip().lower().replace("/", " ")
+    return re.sub(r"\s+", "_", col)
+
+
+@contextmanager
+def _etapa(nome: str, etapas: List[Dict], estado: Dict):
+    inicio = perf_counter()
+    yield
+    segundos = perf_counter() - inicio
+    df = estado.get("df")
+    memoria = df.memory_usage(deep=True).sum() / 2**20 if df is not None else 0.0
+    etapas.append({"etapa": nome, "segundos": round(segundos, 3), "memoria_mb": round(memoria, 1)})
+    logger.info("%-22s %7.3fs  %8.1f MB", nome, segundos, memoria)
+
+
+def _datas_por_categoria(s: pd.Series) -> pd.Series:
+    """Converte uma coluna `category` de datas interpretando só os valores distintos."""
+    categorias = s.cat.categories
+    datas = pd.to_datetime(categorias, format="%d/%m/%Y", errors="coerce")
+    faltando = datas.isna() & categorias.notna()
+    if faltando.any():  # formatos inesperados: cai no parser genérico com dia primeiro
+        datas = datas.where(~faltando, pd.to_datetime(categorias.where(faltando), dayfirst=True, errors="coerce"))
+    valores = datas.take(s.cat.codes.to_numpy(), allow_fill=True, fill_value=None)  # código -1 -> NaT
+    return pd.Series(valores, index=s.index, name=s.name)
+
+
+def ler(entrada: Path = ENTRADA, manter_extras: bool = True) -> pd.DataFrame:
+    """
+    Lê as colunas do ESQUEMA já tipadas (datas ainda como categorias de texto)
+    e, com `manter_extras`, as demais colunas da entrada como `string`.
+    """
+    cabecalho = pd.read_csv(entrada, nrows=0).columns
+    originais = {normalizar_coluna(c): c for c in reversed(cabecalho)}  # primeira ocorrência vence
+    ausentes = [c for c in ESQUEMA if c not in originais]
+    if ausentes:
+        logger.warning("Colunas do esquema ausentes em %s: %s", entrada.name, ausentes)
+
+    usar = {originais[c]: c for c in ESQUEMA if c in originais}
+    extras = {originais[c]: c for c in dict.fromkeys(map(normalizar_coluna, cabecalho))
+              if c not in ESQUEMA and c not in usar.values()}
+    if extras and manter_extras:
+        logger.info("Colunas fora do esquema mantidas como texto: %s", list(extras.values()))
+        usar.update(extras)
+    elif extras:
+        logger.warning("Colunas fora do esquema descartadas: %s", list(extras.values()))
+    dtypes = {orig: ("category" if ESQUEMA.get(c, "string") != "string" else "string") for orig, c in usar.items()}
+    df = pd.read_csv(entrada, usecols=list(usar), dtype=dtypes, na_values=NULOS)
+    return df.rename(columns=usar)[list(usar.values())]
+
+
+def tratar(entrada: Path = ENTRADA, saida: Optional[Path] = SAIDA, manter_extras: bool = True) -> pd.DataFrame:
+    """
+    Pipeline completo. Grava em `saida` (CSV, ou Parquet se o sufixo for .parquet)
+    quando informado. O relatório por etapa fica em `df.attrs["etapas"]`.
+    """
+    etapas: List[Dict] = []
+    estado: Dict = {}
+
+    with _etapa("leitura", etapas, estado):
+        df = estado["df"] = ler(entrada, manter_extras)
+
+    with _etapa("linhas vazias", etapas, estado):
+        df = estado["df"] = df.dropna(how="all").reset_index(drop=True)
+
+    with _etapa("uf", etapas, estado):
+        # crm vem como "2702/AC": a UF são os dois últimos caracteres
+        df["uf"] = df["crm"].str[-2:].str.strip().str.upper().astype("category")
+
+    with _etapa("datas", etapas, estado):
+        for c, tipo in ESQUEMA.items():
+            if tipo == "date" and c in df.columns:
+                df[c] = _datas_por_categoria(df[c])
+
+    with _etapa("ano", etapas, estado):
+        for c, tipo in ESQUEMA.items():
+            if tipo == "year" and c in df.columns:
+                df[c] = pd.to_numeric(df[c].astype("string").str[:4], errors="coerce").astype("Int16")
+
+    if saida is not None:
+        with _etapa("gravação", etapas, estado):
+            saida.parent.mkdir(parents=True, exist_ok=True)
+            if saida.suffix == ".parquet":
+                df.to_parquet(saida, index=False)
+            else:
+                df.to_csv(saida, sep=",", index=False)
+
+    total = sum(e["segundos"] for e in etapas)
+    logger.info("Tratamento concluído: %d linhas | %.2fs", len(df), total)
+    df.attrs["etapas"] = etapas
+    return df
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    )
+    resultado = tratar()
+    print(pd.DataFrame(resultado.attrs["etapas"]).to_string(index=False))
@@ -0,0 +1,180 @@
+"""
+Motor assíncrono de paginação para a API `buscar_medicos`.
+
+Mantém várias requisições de página em voo ao mesmo tempo sobre um único
+`httpx.AsyncClient` (conexões keep-alive reaproveitadas durante toda a UF)
+e entrega as páginas ao consumidor estritamente em ordem.
+"""
+
+import asyncio
+import logging
+import random
+from time import perf_counter
+from typing import AsyncIterator, Callable, Dict, List, Mapping, Optional, Tuple
+
+import httpx
+
+from src.controle_taxa import ERRO, OK, ControladorAIMD, ControladorTaxa, sinal_http
+
+logger = logging.getLogger(__name__)
+
+# Headers que não devem ser repassados ao httpx (ele mesmo os calcula).
+HEADERS_DESCARTADOS = {"content-length", "host", "accept-encoding"}
+
+Pagina = Tuple[int, List[Dict]]
+
+
+class PaginadorAssincrono:
+    """
+    Busca páginas da API com até `concorrencia` requisições simultâneas.
+
+    O payload base (capturado do navegador, já com o `securityhash`) é
+    reutilizado para todas as páginas; apenas o campo `pagina` muda. O
+    intervalo entre disparos vem de `controle`, alimentado com a latência e o
+    status de cada resposta, e vale para o paginador inteiro: as requisições
+    em voo se sobrepõem, mas nunca saem juntas.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        payload_base: Mapping[str, str],
+        headers: Optional[Mapping[str, str]] = None,
+        cookies: Optional[Mapping[str, str]] = None,
+        concorrencia: int = 4,
+        controle: Optional[ControladorTaxa] = None,
+        max_tentativas: int = 3,
+        timeout: float = 30.0,
+    ):
+        if concorrencia < 1:
+            raise ValueError("concorrencia deve ser >= 1")
+        self.api_url = api_url
+        self.payload_base = dict(payload_base)
+        self.headers = {
+            k: v for k, v in (headers or {}).items() if k.lower() not in HEADERS_DESCARTADOS
+        }
+        self.cookies = dict(cookies or {})
+        self.concorrencia = concorrencia
+        self.controle = controle or ControladorAIMD(atraso_inicial=1.0)
+        self.max_tentativas = max_tentativas
+        self.timeout = timeout
+        self._proximo_disparo = 0.0  # instante (perf_counter) liberado para a próxima requisição
+        self._espacamento: Optional[asyncio.Lock] = None  # criado no loop de eventos, em `paginas`
+
+    def _payload(self, pagina: int) -> Dict[str, str]:
+        payload = dict(self.payload_base)
+        payload["pagina"] = str(pagina)
+        return payload
+
+    async def _aguardar_vez(self, pagina: int):
+        """Espaça os disparos entre todas as tarefas (um por vez, `controle.atraso()` entre eles)."""
+        async with self._espacamento:
+            espera = self._proximo_disparo - perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            if self.controle.limitador is not None:  # limite agregado entre processos
+                await asyncio.to_thread(self.controle.limitador.adquirir, pagina)
+            self._proximo_disparo = perf_counter() + self.controle.atraso()
+
+    async def _buscar_pagina(
+        self, client: httpx.AsyncClient, limite: asyncio.Semaphore, pagina: int
+    ) -> List[Dict]:
+        """Busca uma página, com novas tentativas. Lista vazia indica fim dos resultados."""
+        ultimo_erro: Optional[Exception] = None
+        for tentativa in range(1, self.max_tentativas + 1):
+            async with limite:
+                await self._aguardar_vez(pagina)
+                try:
+                    inicio = perf_counter()
+                    resp = await client.post(self.api_url, data=self._payload(pagina))
+                    latencia = perf_counter() - inicio
+                    resp.raise_for_status()
+                    data = resp.json()
+                    medicos = data.get("dados") or []
+                    if medicos:
+                        self.controle.registrar(OK, latencia, pagina)
+                    return medicos
+                except httpx.HTTPStatusError as e:
+                    ultimo_erro = e
+                    self.controle.registrar(sinal_http(e.response.status_code), pagina=pagina)
+                    logger.warning(f"Página {pagina}: falha na tentativa {tentativa}: {e}")
+                except (httpx.HTTPError, ValueError) as e:
+                    ultimo_erro = e
+                    self.controle.registrar(ERRO, pagina=pagina)
+                    logger.warning(f"Página {pagina}: falha na tentativa {tentativa}: {e}")
+            if tentativa < self.max_tentativas:
+                await asyncio.sleep(random.uniform(5, 10))
+        raise RuntimeError(f"Página {pagina} falhou após {self.max_tentativas} tentativas: {ultimo_erro}")
+
+    async def paginas(
+        self, pagina_inicial: int = 1, max_paginas: Optional[int] = None
+    ) -> AsyncIterator[Pagina]:
+        """
+        Gera `(pagina, medicos)` em ordem crescente de página.
+
+        Mantém uma janela deslizante de `concorrencia` tarefas adiantadas;
+        ao encontrar a primeira página vazia (ou uma falha definitiva), as
+        tarefas posteriores são canceladas e a iteração termina.
+        """
+        limite = asyncio.Semaphore(self.concorrencia)
+        self._espacamento = asyncio.Lock()
+        limits = httpx.Limits(
+            max_connections=self.concorrencia,
+            max_keepalive_connections=self.concorrencia,
+        )
+        ultima = max_paginas if max_paginas else None
+
+        async with httpx.AsyncClient(
+            headers=self.headers,
+            cookies=self.cookies,
+            limits=limits,
+            timeout=self.timeout,
+        ) as client:
+            pendentes: Dict[int, asyncio.Task] = {}
+            proxima_agendar = pagina_inicial
+            proxima_emitir = pagina_inicial
+
+            def agendar():
+                nonlocal proxima_agendar
+                while len(pendentes) < self.concorrencia and (ultima is None or proxima_agendar <= ultima):
+                    pendentes[proxima_agendar] = asyncio.create_task(
+                        self._buscar_pagina(client, limite, proxima_agendar)
+                    )
+                    proxima_agendar += 1
+
+            try:
+                agendar()
+                while proxima_emitir in pendentes:
+                    tarefa = pendentes.pop(proxima_emitir)
+                    try:
+                        medicos = await tarefa
+                    except RuntimeError as e:
+                        logger.error(str(e))
+                        break
+                    if not medicos:
+                        logger.info(f"Nenhum médico encontrado na página {proxima_emitir}. Encerrando.")
+                        break
+                    yield proxima_emitir, medicos
+                    proxima_emitir += 1
+                    agendar()
+            finally:
+                for tarefa in pendentes.values():
+                    tarefa.cancel()
+                await asyncio.gather(*pendentes.values(), return_exceptions=True)
+
+    def executar(
+        self,
+        ao_receber_pagina: Callable[[int, List[Dict]], None],
+        pagina_inicial: int = 1,
+        max_paginas: Optional[int] = None,
+    ) -> int:
+        """Versão síncrona: roda o loop de eventos e repassa cada página, em ordem, ao callback."""
+
+        async def _consumir() -> int:
+            total = 0
+            async for pagina, medicos in self.paginas(pagina_inicial, max_paginas):
+                ao_receber_pagina(pagina, medicos)
+                total += 1
+            return total
+
+        return asyncio.run(_consumir())
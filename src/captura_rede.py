@@ -0,0 +1,138 @@
+"""
+Modo de captura de rede: registros vindos direto das respostas JSON de `buscar_medicos`.
+
+A cada clique de paginação o portal faz um POST para `buscar_medicos` e recebe
+os médicos em JSON antes de montar os cards. Interceptando essa resposta
+(`page.on("response")`) os scrapers obtêm os registros já estruturados, sem ler
+o texto dos cards nem aplicar regex. O fim dos resultados é detectado pelo
+próprio payload (`dados` vazio).
+
+Os registros do JSON são convertidos para as colunas dos cards (`CAMPOS`, com
+o CRM no formato "12345-SP"), de modo que uma UF em que parte das páginas cai
+no fallback pelo DOM grava um único esquema.
+"""
+
+import logging
+import re
+import urllib.parse
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+from src.parser_cards import CAMPOS, extrair_medicos
+
+logger = logging.getLogger(__name__)
+
+# Coluna dos cards -> chaves possíveis no JSON de buscar_medicos (comparadas sem diferenciar maiúsculas)
+CAMPOS_JSON: Dict[str, Tuple[str, ...]] = {
+    "nome": ("NM_MEDICO", "NOME"),
+    "crm": ("NU_CRM", "CRM"),
+    "data_inscricao": ("DT_INSCRICAO", "DATA_INSCRICAO"),
+    "situacao": ("SITUACAO", "DS_SITUACAO", "IN_SITUACAO"),
+    "especialidade": ("ESPECIALIDADE", "ESPECIALIDADES", "DS_ESPECIALIDADE"),
+    "instituicao_graduacao": ("NM_INSTITUICAO_GRADUACAO", "INSTITUICAO_GRADUACAO", "NM_FACULDADE"),
+    "ano_formatura": ("ANO_FORMATURA", "NU_ANO_FORMATURA", "DT_GRADUACAO"),
+}
+CAMPOS_UF_JSON = ("SG_UF", "UF")
+
+_DATA_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+_ANO = re.compile(r"\d{4}")
+
+
+def _texto(valor) -> Optional[str]:
+    if valor is None:
+        return None
+    if isinstance(valor, (list, tuple)):
+        valor = ", ".join(str(v) for v in valor if v)
+    texto = str(valor).strip()
+    return texto or None
+
+
+def registro_do_json(registro: Dict) -> Dict[str, Optional[str]]:
+    """Registro de `buscar_medicos` nas colunas dos cards (mesmo formato de `parse_cards`)."""
+    por_chave = {str(k).upper(): v for k, v in registro.items()}
+    saida = {
+        campo: next((t for chave in chaves if (t := _texto(por_chave.get(chave))) is not None), None)
+        for campo, chaves in CAMPOS_JSON.items()
+    }
+    uf = next((t for chave in CAMPOS_UF_JSON if (t := _texto(por_chave.get(chave))) is not None), None)
+    if saida["crm"] and uf and not re.search(r"[A-Za-z]{2}\s*$", saida["crm"]):
+        saida["crm"] = f"{saida['crm']}-{uf.upper()}"
+    if saida["data_inscricao"] and (iso := _DATA_ISO.match(saida["data_inscricao"])):
+        saida["data_inscricao"] = f"{iso.group(3)}/{iso.group(2)}/{iso.group(1)}"
+    if saida["ano_formatura"] and (ano := _ANO.search(saida["ano_formatura"])):
+        saida["ano_formatura"] = ano.group(0)
+    return {campo: saida[campo] for campo in CAMPOS}
+
+
+class CapturaBuscarMedicos:
+    """Guarda, por número de página, os registros das respostas `buscar_medicos` interceptadas."""
+
+    def __init__(self, page):
+        self.page = page
+        self._paginas: Dict[int, List[Dict]] = {}
+        self.ultima_pagina: Optional[int] = None
+        self.respostas = 0
+        self.erros = 0
+        page.on("response", self._ao_responder)
+
+    @staticmethod
+    def _numero_pagina(response) -> Optional[int]:
+        try:
+            dados = urllib.parse.parse_qs(response.request.post_data or "")
+            return int(dados["pagina"][0])
+        except (KeyError, ValueError, IndexError, TypeError):
+            return None
+
+    def _ao_responder(self, response):
+        if "buscar_medicos" not in response.url:
+            return
+        try:
+            data = response.json()
+        except Exception as e:
+            self.erros += 1
+            logger.warning(f"Resposta de buscar_medicos não é JSON válido: {e}")
+            return
+        pagina = self._numero_pagina(response)
+        if pagina is None:
+            pagina = (self.ultima_pagina or 0) + 1
+        registros = (data.get("dados") or []) if isinstance(data, dict) else []
+        self._paginas[pagina] = registros
+        self.ultima_pagina = pagina
+        self.respostas += 1
+        logger.debug(f"buscar_medicos página {pagina}: {len(registros)} registros capturados")
+
+    def consumir(self, pagina: int, timeout: float = 30.0) -> Optional[List[Dict]]:
+        """
+        Retorna (e descarta da memória) os registros da página `pagina`.
+        Lista vazia significa fim dos resultados; None, que nenhuma resposta chegou a tempo.
+        """
+        limite = monotonic() + timeout
+        while pagina not in self._paginas:
+            if monotonic() >= limite:
+                return None
+            # Na API síncrona os eventos só são entregues enquanto o Playwright processa mensagens.
+            self.page.wait_for_timeout(100)
+        # Páginas anteriores que não foram consumidas não serão mais pedidas.
+        for antiga in [p for p in self._paginas if p < pagina]:
+            del self._paginas[antiga]
+        return self._paginas.pop(pagina)
+
+
+def registros_da_pagina(
+    page, pagina: int, captura: Optional[CapturaBuscarMedicos] = None, timeout: float = 30.0
+) -> Tuple[List[Dict], bool]:
+    """
+    Devolve `(registros, fim)` da página atual. Com captura de rede, usa o JSON
+    interceptado; sem captura (ou se a resposta não chegou), extrai dos cards.
+    Nos dois casos os registros têm as colunas dos cards (`CAMPOS`).
+    """
+    if captura is None:
+        return extrair_medicos(page), False
+    registros = captura.consumir(pagina, timeout)
+    if registros is None:
+        logger.warning(f"Resposta de buscar_medicos da página {pagina} não capturada; extraindo do DOM.")
+        return extrair_medicos(page), False
+    medicos = [r for r in map(registro_do_json, registros) if r["nome"] or r["crm"]]
+    if len(medicos) < len(registros):
+        logger.warning(f"Página {pagina}: {len(registros) - len(medicos)} registro(s) do JSON sem nome nem CRM ignorados")
+    return medicos, not registros
@@ -0,0 +1,135 @@
+"""
+Controle adaptativo do intervalo entre páginas.
+
+Substitui os multiplicadores fixos por número de página (>50, >70, >90,
+páginas 95-100...) por um controlador que reage ao que o servidor de fato
+devolve: latência da resposta, HTTP 429/403/503, páginas vazias e bloqueios
+detectados. Os scrapers chamam `aguardar()` (ou `atraso()`, no motor
+assíncrono) antes de cada página e `registrar()` com o sinal observado.
+
+O `ControladorAIMD` reduz o intervalo aos poucos enquanto as páginas chegam
+bem (aumento aditivo da taxa) e o multiplica quando há sinal de pressão
+(redução multiplicativa). Cada decisão vai para o log numa linha
+`taxa | ...` com chave=valor, para ajustar os parâmetros a partir dos dados:
+
+    grep "taxa |" data/logs/scraping_pw_SP.log
+
+Com um limite global configurado (`limitador.py`), `aguardar()` também tira
+uma ficha do balde compartilhado entre processos antes de liberar a página.
+"""
+
+import logging
+import random
+from abc import ABC, abstractmethod
+from time import sleep
+from typing import Optional
+
+from src.deteccao import STATUS_BLOQUEIO
+from src.limitador import LimitadorGlobal, limitador_padrao
+
+logger = logging.getLogger(__name__)
+
+# Sinais observados a cada página
+OK = "ok"              # página com registros
+VAZIA = "vazia"        # página sem registros, sem fim natural nem bloqueio confirmado
+BLOQUEIO = "bloqueio"  # captcha, indicador de bloqueio no texto, redirecionamento
+LIMITE = "limite"      # HTTP 429/403/503
+ERRO = "erro"          # timeout, erro de rede ou resposta inválida
+
+SINAIS = (OK, VAZIA, BLOQUEIO, LIMITE, ERRO)
+
+# 503 (servidor sobrecarregado) também pede para desacelerar, como 429/403
+STATUS_LIMITE = frozenset(STATUS_BLOQUEIO | {503})
+
+
+def sinal_http(status: Optional[int]) -> str:
+    """Sinal correspondente a um status HTTP de falha (429/403/503 -> LIMITE; o resto -> ERRO)."""
+    return LIMITE if status in STATUS_LIMITE else ERRO
+
+
+class ControladorTaxa(ABC):
+    """
+    Base dos controladores: guarda o intervalo atual e registra as decisões.
+    Subclasses só precisam implementar `_ajustar`.
+    """
+
+    def __init__(self, atraso_inicial: float = 2.0, minimo: float = 0.5, maximo: float = 120.0,
+                 jitter: float = 0.25, nome: str = "-", limitador: Optional[LimitadorGlobal] = None):
+        self.atraso_atual = atraso_inicial
+        self.minimo = minimo
+        self.maximo = maximo
+        self.jitter = jitter  # variação relativa em torno do intervalo (0.25 -> ±25%)
+        self.nome = nome      # identifica o scraper/UF nas linhas de log
+        self.pagina: Optional[int] = None
+        # limite agregado entre processos (None: o configurado em CFM_TAXA_GLOBAL, se houver)
+        self.limitador = limitador if limitador is not None else limitador_padrao()
+
+    @abstractmethod
+    def _ajustar(self, sinal: str, latencia: Optional[float]) -> float:
+        """Novo intervalo (antes dos limites mínimo/máximo) a partir do sinal observado."""
+
+    def registrar(self, sinal: str, latencia: Optional[float] = None, pagina: Optional[int] = None):
+        """Atualiza o intervalo a partir do sinal observado (e da latência da resposta, se medida)."""
+        if sinal not in SINAIS:
+            raise ValueError(f"Sinal desconhecido: {sinal}")
+        anterior = self.atraso_atual
+        self.atraso_atual = min(self.maximo, max(self.minimo, self._ajustar(sinal, latencia)))
+        self.pagina = pagina if pagina is not None else self.pagina
+        logger.info(
+            "taxa | %s | pagina=%s sinal=%s latencia=%s atraso=%.2f->%.2f",
+            self.nome, self.pagina, sinal, f"{latencia:.2f}" if latencia is not None else "-",
+            anterior, self.atraso_atual,
+        )
+
+    def atraso(self) -> float:
+        """Próximo intervalo (com jitter), sem dormir."""
+        return self.atraso_atual * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def aguardar(self, pagina: Optional[int] = None) -> float:
+        """Dorme o próximo intervalo antes da página `pagina` (e a vez no limite global); devolve o total."""
+        atraso = self.atraso()
+        logger.info("taxa | %s | pagina=%s aguardando=%.2f", self.nome, pagina, atraso)
+        sleep(atraso)
+        if self.limitador is not None:
+            atraso += self.limitador.adquirir(pagina)
+        return atraso
+
+
+class ControladorFixo(ControladorTaxa):
+    """Intervalo constante (com jitter): referência para comparar com o adaptativo."""
+
+    def _ajustar(self, sinal: str, latencia: Optional[float]) -> float:
+        return self.atraso_atual
+
+
+class ControladorAIMD(ControladorTaxa):
+    """
+    AIMD sobre o intervalo: cada página OK subtrai `decremento` segundos; cada
+    sinal de pressão multiplica o intervalo pelo fator do sinal. Uma resposta
+    OK mas lenta (latência acima de `limiar_latencia` x a média móvel) conta
+    como pressão leve.
+    """
+
+    def __init__(self, atraso_inicial: float = 2.0, minimo: float = 0.5, maximo: float = 120.0,
+                 jitter: float = 0.25, nome: str = "-", decremento: float = 0.1,
+                 fator_bloqueio: float = 2.0, fator_vazia: float = 1.5, fator_lenta: float = 1.25,
+                 limiar_latencia: float = 2.0, suavizacao: float = 0.2,
+                 limitador: Optional[LimitadorGlobal] = None):
+        super().__init__(atraso_inicial, minimo, maximo, jitter, nome, limitador)
+        self.decremento = decremento
+        self.fatores = {BLOQUEIO: fator_bloqueio, LIMITE: fator_bloqueio, ERRO: fator_vazia, VAZIA: fator_vazia}
+        self.fator_lenta = fator_lenta
+        self.limiar_latencia = limiar_latencia
+        self.suavizacao = suavizacao
+        self.latencia_media: Optional[float] = None
+
+    def _ajustar(self, sinal: str, latencia: Optional[float]) -> float:
+        if sinal != OK:
+            return self.atraso_atual * self.fatores[sinal]
+        if latencia is None:
+            return self.atraso_atual - self.decremento
+        media = self.latencia_media
+        self.latencia_media = latencia if media is None else media + self.suavizacao * (latencia - media)
+        if media is not None and latencia > self.limiar_latencia * media:
+            return self.atraso_atual * self.fator_lenta
+        return self.atraso_atual - self.decremento
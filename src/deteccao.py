@@ -0,0 +1,142 @@
+"""
+Classificador único de bloqueio / fim de resultados.
+
+Substitui a serialização do DOM inteiro (`page.content().lower()`) seguida de
+várias buscas por substring: uma só chamada `page.evaluate` coleta sondas
+direcionadas (cards, captcha, formulário, mensagem de fim e, só quando não há
+cards, um trecho do texto visível), que é examinado por uma única regex com
+todos os indicadores. O status HTTP vem das respostas observadas na página.
+
+O resultado fica em cache até a próxima navegação (ou nova resposta de
+`buscar_medicos`, já que a paginação é via AJAX), então cada página paga pela
+detecção uma vez, não importa quantas vezes ela seja consultada.
+"""
+
+import logging
+import re
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+
+from src.parser_cards import MENSAGEM_FIM, SELETOR_CARDS
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://portal.cfm.org.br/busca-medicos"
+
+INDICADORES_BLOQUEIO = [
+    'blocked', 'captcha', 'verificação', 'suspeita', 'bot', 'bot detected',
+    'rate limit', 'too many requests', 'acesso negado',
+    'access denied', 'forbidden', 'erro 403', 'erro 429',
+]
+# Uma única regex (alternância) para todos os indicadores; \b evita falsos positivos como "botão".
+PADRAO_BLOQUEIO = re.compile(
+    r"\b(" + "|".join(re.escape(i) for i in sorted(INDICADORES_BLOQUEIO, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+STATUS_BLOQUEIO = {403, 429}
+LIMITE_TEXTO = 20_000  # caracteres de texto visível examinados quando não há cards
+
+JS_SONDAS = f"""
+    () => {{
+        const cards = document.querySelectorAll('{SELETOR_CARDS}').length;
+        const captcha = !!document.querySelector('iframe[src*="recaptcha"], .g-recaptcha, iframe[src*="hcaptcha"]');
+        const corpo = document.body ? document.body.innerText : '';
+        return {{
+            url: location.href,
+            cards: cards,
+            captcha: captcha,
+            fim: corpo.includes('{MENSAGEM_FIM}'),
+            formulario: !!document.querySelector('select[name="uf"]'),
+            resultado: !!document.querySelector('.busca-resultado'),
+            texto: (cards > 0 && !captcha) ? '' : (document.title + ' ' + corpo.slice(0, {LIMITE_TEXTO})),
+        }};
+    }}
+"""
+
+
+@dataclass(frozen=True)
+class ResultadoDeteccao:
+    bloqueado: bool
+    fim: bool
+    motivo: str
+
+
+class ClassificadorPagina:
+    """Classifica o estado da página (normal, fim natural ou bloqueio) com cache por navegação."""
+
+    def __init__(self, page, base_url: str = BASE_URL):
+        self.page = page
+        self.base_url = base_url
+        self.ultimo_status: Optional[int] = None
+        self.avaliacoes = 0  # quantas vezes o DOM foi de fato sondado
+        self._geracao = 0
+        self._cache: Optional[tuple] = None
+        page.on("framenavigated", self._ao_navegar)
+        page.on("response", self._ao_responder)
+
+    def _ao_navegar(self, frame):
+        if frame == self.page.main_frame:
+            self.invalidar()
+
+    def _ao_responder(self, response):
+        try:
+            tipo = response.request.resource_type
+        except Exception:
+            tipo = None
+        if tipo == "document" or "buscar_medicos" in response.url:
+            self.ultimo_status = response.status
+            self.invalidar()
+
+    def invalidar(self):
+        """Descarta o resultado em cache (chamado a cada navegação ou nova página de resultados)."""
+        self._geracao += 1
+
+    def classificar(self) -> ResultadoDeteccao:
+        if self._cache is not None and self._cache[0] == self._geracao:
+            return self._cache[1]
+        geracao = self._geracao
+        resultado = self._avaliar()
+        self._cache = (geracao, resultado)
+        return resultado
+
+    def _avaliar(self) -> ResultadoDeteccao:
+        self.avaliacoes += 1
+        try:
+            sondas = self.page.evaluate(JS_SONDAS)
+        except Exception as e:
+            logger.error(f"Erro ao detectar bloqueio: {e}")
+            return ResultadoDeteccao(True, False, f"Erro na detecção: {e}")
+
+        if self.ultimo_status in STATUS_BLOQUEIO:
+            return ResultadoDeteccao(True, False, f"Bloqueio detectado: HTTP {self.ultimo_status}")
+        if sondas["captcha"]:
+            return ResultadoDeteccao(True, False, "Bloqueio detectado: captcha")
+        if sondas["cards"] == 0 and sondas["fim"]:
+            logger.info(f"Detectada mensagem oficial: '{MENSAGEM_FIM}'")
+            return ResultadoDeteccao(False, True, f"{MENSAGEM_FIM} (fim natural dos resultados)")
+        if sondas["texto"]:
+            achado = PADRAO_BLOQUEIO.search(sondas["texto"])
+            if achado:
+                indicador = achado.group(1).lower()
+                logger.warning(f"Indicador de bloqueio detectado: '{indicador}'")
+                return ResultadoDeteccao(True, False, f"Bloqueio detectado: {indicador}")
+        if self.base_url not in sondas["url"]:
+            logger.warning(f"Redirecionamento detectado: {sondas['url']}")
+            return ResultadoDeteccao(True, False, f"Redirecionado para: {sondas['url']}")
+        if not sondas["resultado"] and not sondas["formulario"]:
+            logger.warning("Página não contém elementos esperados - possível redirecionamento")
+            return ResultadoDeteccao(True, False, "Página sem elementos de busca")
+        return ResultadoDeteccao(False, False, "Página normal")
+
+
+_classificadores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def classificador_para(page) -> ClassificadorPagina:
+    """Devolve o classificador associado à página (criado e registrado na primeira chamada)."""
+    classificador = _classificadores.get(page)
+    if classificador is None:
+        classificador = ClassificadorPagina(page)
+        _classificadores[page] = classificador
+    return classificador
@@ -0,0 +1,362 @@
+"""
+Escrita incremental dos registros coletados.
+
+Cada página extraída é entregue a um `EscritorStreaming`, que a persiste numa
+thread de fundo (append-only) em um ou mais destinos. A fila é limitada, então
+a memória não cresce com o tamanho da UF, e ao sair do bloco `with` — inclusive
+por `KeyboardInterrupt` ou exceção — as páginas pendentes são gravadas antes
+de fechar.
+
+Destinos disponíveis: `DestinoCsv` e `DestinoParquet` (arquivo por execução;
+`destino_arquivo` escolhe pelo formato) e `DestinoSqlite` (banco único, com
+upsert por médico, que pode receber todas as UFs e todos os scrapers ao mesmo
+tempo).
+"""
+
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_FIM = object()  # sentinela que encerra a thread de escrita
+
+
+class DestinoCsv:
+    """CSV append-only: cabeçalho (com BOM, `utf-8-sig`) na primeira página, só linhas depois."""
+
+    def __init__(self, caminho: Path, colunas: Optional[Sequence[str]] = None):
+        self.caminho = Path(caminho)
+        self.colunas: Optional[List[str]] = list(colunas) if colunas else None
+        self._iniciado = False
+
+    def gravar(self, registros: List[Dict]):
+        df = pd.DataFrame(registros)
+        if self.colunas is None:
+            self.colunas = list(df.columns)
+        else:
+            extras = [c for c in df.columns if c not in self.colunas]
+            if extras:
+                logger.warning(f"Colunas fora do cabeçalho de {self.caminho.name} ignoradas: {extras}")
+        df = df.reindex(columns=self.colunas)
+        if not self._iniciado:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            df.to_csv(self.caminho, index=False, encoding="utf-8-sig", mode="w")
+            self._iniciado = True
+        else:
+            df.to_csv(self.caminho, index=False, encoding="utf-8", mode="a", header=False)
+
+    def fechar(self):
+        pass
+
+
+def _pyarrow():
+    """Importa o pyarrow sob demanda (dependência opcional, só para saída Parquet)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Saída Parquet requer o pacote pyarrow (pip install pyarrow).") from e
+    return pa, pq
+
+
+@lru_cache(maxsize=65_536)
+def _para_data(valor: str) -> Optional[date]:
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(valor.strip()[:10], formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _para_ano(valor) -> Optional[int]:
+    texto = str(valor).strip()[:4]
+    return int(texto) if texto.isdigit() else None
+
+
+class DestinoParquet:
+    """
+    Parquet com esquema explícito: campos de baixa cardinalidade
+    (`COLUNAS_DICIONARIO`) como `dictionary<int32, string>`, datas dd/mm/aaaa
+    como `date32`, anos como `int16` e o restante como `string`. Valores que não
+    convertem viram nulos.
+
+    As colunas são fixadas na primeira página (como no `DestinoCsv`); as páginas
+    são acumuladas e gravadas em row groups de `linhas_por_grupo` linhas.
+    Requer pyarrow.
+    """
+
+    COLUNAS_DICIONARIO = ("situacao", "uf", "especialidade", "instituicao_graduacao", "tipo_inscricao")
+    COLUNAS_DATA = ("data_inscricao", "primeira_inscricao_uf")
+    COLUNAS_ANO = ("ano_formatura",)
+
+    def __init__(self, caminho: Path, colunas: Optional[Sequence[str]] = None, linhas_por_grupo: int = 50_000):
+        _pyarrow()  # falha cedo, antes da coleta, se o pyarrow não estiver instalado
+        self.caminho = Path(caminho)
+        self.colunas: Optional[List[str]] = list(colunas) if colunas else None
+        self.linhas_por_grupo = linhas_por_grupo
+        self._pendentes: List[Dict] = []
+        self._writer = None
+
+    def esquema(self):
+        pa, _ = _pyarrow()
+        campos = []
+        for coluna in self.colunas:
+            if coluna in self.COLUNAS_DICIONARIO:
+                tipo = pa.dictionary(pa.int32(), pa.string())
+            elif coluna in self.COLUNAS_DATA:
+                tipo = pa.date32()
+            elif coluna in self.COLUNAS_ANO:
+                tipo = pa.int16()
+            else:
+                tipo = pa.string()
+            campos.append(pa.field(coluna, tipo))
+        return pa.schema(campos)
+
+    def _coluna(self, nome: str, valores: List):
+        pa, _ = _pyarrow()
+        if nome in self.COLUNAS_DATA:
+            return pa.array([_para_data(str(v)) if v else None for v in valores], type=pa.date32())
+        if nome in self.COLUNAS_ANO:
+            return pa.array([_para_ano(v) if v else None for v in valores], type=pa.int16())
+        textos = pa.array([None if v is None else str(v) for v in valores], type=pa.string())
+        return textos.dictionary_encode() if nome in self.COLUNAS_DICIONARIO else textos
+
+    def gravar(self, registros: List[Dict]):
+        if self.colunas is None:
+            self.colunas = list(dict.fromkeys(c for r in registros for c in r))
+        extras = {c for r in registros for c in r} - set(self.colunas)
+        if extras:
+            logger.warning(f"Colunas fora do esquema de {self.caminho.name} ignoradas: {sorted(extras)}")
+        self._pendentes.extend(registros)
+        if len(self._pendentes) >= self.linhas_por_grupo:
+            self._descarregar()
+
+    def _descarregar(self):
+        if not self._pendentes:
+            return
+        pa, pq = _pyarrow()
+        esquema = self.esquema()
+        tabela = pa.Table.from_arrays(
+            [self._coluna(c, [r.get(c) for r in self._pendentes]) for c in self.colunas], schema=esquema
+        )
+        if self._writer is None:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.caminho, esquema, compression="zstd")
+        self._writer.write_table(tabela)
+        self._pendentes = []
+
+    def fechar(self):
+        self._descarregar()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+FORMATOS = ("csv", "parquet")
+
+
+def destino_arquivo(caminho: Path, formato: str = "csv", colunas: Optional[Sequence[str]] = None):
+    """Destino de arquivo no `formato` pedido; o sufixo de `caminho` é ajustado (.csv/.parquet)."""
+    if formato not in FORMATOS:
+        raise ValueError(f"formato deve ser um de {FORMATOS}, não {formato!r}")
+    caminho = Path(caminho).with_suffix(f".{formato}")
+    if formato == "parquet":
+        return DestinoParquet(caminho, colunas=colunas)
+    return DestinoCsv(caminho, colunas=colunas)
+
+
+class DestinoSqlite:
+    """
+    Tabela SQLite em modo WAL com chave primária `(crm, uf)`: cada página é
+    gravada numa única transação e registros repetidos atualizam a linha
+    existente (upsert), então duplicatas nunca chegam ao disco.
+
+    A chave é normalizada antes do upsert: `crm` guarda só o número e `uf` a
+    sigla, venha o registro dos cards ("12345-SP") ou do JSON (`NU_CRM` +
+    UF), para que o mesmo médico coletado nos dois modos ocupe uma única linha.
+    As colunas além de `crm` e `uf` são criadas conforme aparecem nos registros
+    (cards do DOM ou JSON de `buscar_medicos`). A conexão só é aberta na
+    primeira gravação, de modo que o destino pode ser criado num processo e
+    usado em outro; vários processos podem gravar no mesmo arquivo.
+    """
+
+    CAMPOS_CRM = ("crm", "CRM", "nu_crm", "NU_CRM")
+    CAMPOS_UF = ("uf", "UF", "sg_uf", "SG_UF")
+    # "12345-SP", "12345/SP", "CRM-SP 12345", "12345": número e, se houver, a UF
+    _CRM = re.compile(r"^\s*(?:CRM\s*-?\s*(?P<uf_antes>[A-Za-z]{2})?\s*)?0*(?P<numero>\d+)"
+                      r"(?:\s*[-/ ]\s*(?P<uf>[A-Za-z]{2}))?\s*$", re.IGNORECASE)
+
+    def __init__(self, caminho: Path, uf: Optional[str] = None, tabela: str = "medicos"):
+        self.caminho = Path(caminho)
+        self.uf = uf
+        self.tabela = tabela
+        self._conn: Optional[sqlite3.Connection] = None
+        self._colunas: List[str] = []
+
+    @staticmethod
+    def _ident(nome: str) -> str:
+        return '"' + nome.replace('"', '""') + '"'
+
+    def _conectar(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            # A thread de escrita abre a conexão e `fechar()` roda na thread principal
+            # depois do join: os acessos nunca são simultâneos.
+            self._conn = sqlite3.connect(self.caminho, timeout=60, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._ident(self.tabela)} ("
+                "crm TEXT NOT NULL, uf TEXT NOT NULL, PRIMARY KEY (crm, uf))"
+            )
+            self._colunas = self._ler_colunas()
+        return self._conn
+
+    def _ler_colunas(self) -> List[str]:
+        return [linha[1] for linha in self._conn.execute(f"PRAGMA table_info({self._ident(self.tabela)})")]
+
+    def _garantir_colunas(self, colunas: Sequence[str]):
+        for coluna in colunas:
+            if coluna in self._colunas:
+                continue
+            try:
+                self._conn.execute(f"ALTER TABLE {self._ident(self.tabela)} ADD COLUMN {self._ident(coluna)} TEXT")
+            except sqlite3.OperationalError as e:
+                # outro processo gravando no mesmo banco criou a coluna depois da nossa leitura do esquema
+                if "duplicate column name" not in str(e).lower():
+                    raise
+                self._colunas = self._ler_colunas()
+                if coluna not in self._colunas:
+                    raise
+                continue
+            self._colunas.append(coluna)
+
+    @classmethod
+    def chave(cls, crm, uf=None) -> Optional[tuple]:
+        """`(número do CRM, UF)` normalizados, ou None se não houver UF."""
+        texto = str(crm).strip()
+        m = cls._CRM.match(texto)
+        if m:
+            numero = m.group("numero")
+            uf = uf or m.group("uf") or m.group("uf_antes")
+        else:
+            numero = texto
+        if not uf or not str(uf).strip():
+            return None
+        return numero, str(uf).strip().upper()
+
+    def _normalizar(self, registro: Dict) -> Optional[Dict]:
+        """Registro com a chave `crm`/`uf` normalizada e valores escalares (None se não houver CRM/UF)."""
+        campo_crm = next((c for c in self.CAMPOS_CRM if registro.get(c)), None)
+        if campo_crm is None:
+            return None
+        uf_registro = next((registro[c] for c in self.CAMPOS_UF if registro.get(c)), None)
+        chave = self.chave(registro[campo_crm], self.uf or uf_registro)
+        if chave is None:
+            return None
+        linha = {
+            k: (json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v)
+            for k, v in registro.items() if k not in self.CAMPOS_CRM and k not in self.CAMPOS_UF
+        }
+        linha["crm"], linha["uf"] = chave
+        return linha
+
+    def gravar(self, registros: List[Dict]):
+        linhas = [linha for linha in map(self._normalizar, registros) if linha is not None]
+        if len(linhas) < len(registros):
+            logger.warning(f"{len(registros) - len(linhas)} registros sem CRM/UF ignorados em {self.caminho.name}")
+        if not linhas:
+            return
+        conn = self._conectar()
+        colunas = list(dict.fromkeys(c for linha in linhas for c in linha))
+        atualizaveis = [c for c in colunas if c not in ("crm", "uf")]
+        sql = (
+            f"INSERT INTO {self._ident(self.tabela)} ({', '.join(map(self._ident, colunas))}) "
+            f"VALUES ({', '.join('?' * len(colunas))}) ON CONFLICT(crm, uf) DO "
+            + (f"UPDATE SET {', '.join(f'{self._ident(c)} = excluded.{self._ident(c)}' for c in atualizaveis)}"
+               if atualizaveis else "NOTHING")
+        )
+        with conn:  # uma transação por página
+            self._garantir_colunas(colunas)
+            conn.executemany(sql, [tuple(linha.get(c) for c in colunas) for linha in linhas])
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class EscritorStreaming:
+    """Persiste páginas de registros numa thread de fundo, em ordem de chegada."""
+
+    def __init__(self, destinos: Sequence, max_paginas_pendentes: int = 50):
+        self.destinos = list(destinos)
+        self.paginas = 0
+        self.registros = 0
+        self._fila: "queue.Queue" = queue.Queue(maxsize=max_paginas_pendentes)
+        self._erro: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._trabalhar, name="escritor-streaming", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "EscritorStreaming":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.fechar()
+            return
+        logger.warning(f"Encerrando escrita após {exc_type.__name__}; gravando páginas pendentes...")
+        try:
+            self.fechar()
+        except RuntimeError as e:
+            logger.error(str(e))  # não mascara a exceção original
+
+    def _trabalhar(self):
+        while True:
+            item = self._fila.get()
+            try:
+                if item is _FIM:
+                    return
+                if self._erro is None:
+                    for destino in self.destinos:
+                        destino.gravar(item)
+            except BaseException as e:
+                self._erro = e
+                logger.error(f"Erro na escrita incremental: {e}")
+            finally:
+                self._fila.task_done()
+
+    def escrever(self, registros: List[Dict]):
+        """Enfileira uma página (bloqueia se houver páginas demais pendentes)."""
+        if self._erro is not None:
+            raise RuntimeError(f"Escrita incremental falhou: {self._erro}") from self._erro
+        if not registros:
+            return
+        self._fila.put(list(registros))
+        self.paginas += 1
+        self.registros += len(registros)
+
+    def fechar(self):
+        """Grava o que estiver pendente, encerra a thread e fecha os destinos."""
+        if self._thread.is_alive():
+            self._fila.put(_FIM)
+            self._thread.join()
+            for destino in self.destinos:
+                try:
+                    destino.fechar()
+                except Exception as e:
+                    logger.error(f"Erro ao fechar destino {destino}: {e}")
+            logger.info(f"Escrita encerrada: {self.registros} registros em {self.paginas} páginas.")
+        if self._erro is not None:
+            raise RuntimeError(f"Escrita incremental falhou: {self._erro}") from self._erro
@@ -1,4 +1,3 @@
-from playwright.sync_api import sync_playwright
 import requests
 import pandas as pd
 from time import sleep
@@ -9,6 +8,15 @@ import random
 import time
 import urllib.parse
 
+from src.captura_rede import CapturaBuscarMedicos, registros_da_pagina
+from src.controle_taxa import BLOQUEIO, ERRO, OK, VAZIA, ControladorAIMD, sinal_http
+from src.deteccao import classificador_para
+from src.escrita import DestinoSqlite, EscritorStreaming, destino_arquivo
+from src.navegacao import ir_para_pagina, pagina_ativa
+from src.politica_recursos import registrar_pagina
+from src import politica_retry
+from src.pool_navegador import abrir_pool
+
 # Diretório para salvar o arquivo de saída
 DATA_DIR = (Path(__file__).resolve().parent / ".." / "data").resolve()
 CSV_PATH = DATA_DIR / "dados_csv"
@@ -37,6 +45,91 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15"
 ]
 
+# Script de inicialização que remove sinais de automação (captura de sessão)
+INIT_SCRIPT_BUSCA = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined,
+    });
+    
+    window.chrome = {
+        runtime: {}
+    };
+    
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5],
+    });
+    
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['pt-BR', 'pt', 'en-US', 'en'],
+    });
+    
+    const originalQuery = window.navigator.permissions.query;
+    return window.navigator.permissions.query = (parameters) => (
+        parameters.name === 'notifications' ?
+            Promise.resolve({ state: Notification.permission }) :
+            originalQuery(parameters)
+    );
+"""
+
+# Script mais avançado para remover sinais de automação (scraping puro via Playwright)
+INIT_SCRIPT_HUMANIZADO = """
+    // Remove webdriver
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined,
+    });
+    
+    // Adiciona chrome objeto mais realista
+    window.chrome = {
+        runtime: {},
+        loadTimes: function() {},
+        csi: function() {},
+        app: {}
+    };
+    
+    // Plugins mais realistas
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => {
+            const plugins = [];
+            plugins[0] = { name: 'Chrome PDF Plugin', filename: 'internal-pdf-viewer' };
+            plugins[1] = { name: 'Chrome PDF Viewer', filename: 'mhjfbmdgcfjbbpaeojofohoefgiehjai' };
+            plugins[2] = { name: 'Native Client', filename: 'internal-nacl-plugin' };
+            return plugins;
+        },
+    });
+    
+    // Permissões mais realistas
+    const originalQuery = window.navigator.permissions.query;
+    window.navigator.permissions.query = (parameters) => (
+        parameters.name === 'notifications' ?
+            Promise.resolve({ state: Notification.permission }) :
+            originalQuery(parameters)
+    );
+    
+    // Adiciona propriedades de hardware mais realistas
+    Object.defineProperty(navigator, 'hardwareConcurrency', {
+        get: () => 4,
+    });
+    
+    Object.defineProperty(navigator, 'deviceMemory', {
+        get: () => 8,
+    });
+    
+    // Language array mais realista
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['pt-BR', 'pt', 'en-US', 'en'],
+    });
+    
+    // Adiciona getBattery se não existir
+    if (!navigator.getBattery) {
+        navigator.getBattery = () => Promise.resolve({
+            charging: true,
+            chargingTime: 0,
+            dischargingTime: Infinity,
+            level: 0.99
+        });
+    }
+"""
+
 def random_delay(min_seconds=1, max_seconds=3):
     """Gera um delay aleatório entre requisições"""
     delay = random.uniform(min_seconds, max_seconds)
@@ -156,34 +249,7 @@ def add_random_browser_noise(page):
     except Exception as e:
         logger.warning(f"Erro no ruído do navegador: {e}")
 
-def intelligent_delay(page_number, base_delay=2.0, escalation_factor=1.2):
-    """Delay inteligente que aumenta com suspeitas de detecção"""
-    # Base delay aumenta com o número da página
-    if page_number <= 5:
-        multiplier = 1.0
-    elif page_number <= 20:
-        multiplier = 1.3
-    elif page_number <= 50:
-        multiplier = 1.8
-    elif page_number <= 100:
-        multiplier = 2.5
-    else:
-        multiplier = 3.5  # Muito conservador para páginas altas
-    
-    # Adiciona variação aleatória significativa
-    actual_delay = base_delay * multiplier * random.uniform(0.8, 2.2)
-    
-    # Delays especiais em marcos importantes
-    if page_number % 25 == 0:  # A cada 25 páginas
-        actual_delay *= 2  # Pausa dobrada
-        logger.info(f"Pausa especial na página {page_number}")
-    elif page_number % 10 == 0:  # A cada 10 páginas
-        actual_delay *= 1.5
-        
-    return actual_delay
-
-
-def get_cookies_after_busca(uf):
+def get_cookies_after_busca(uf, pool=None):
     captured_request = None
     captured_response = None
     
@@ -227,22 +293,12 @@ def get_cookies_after_busca(uf):
             except Exception as e:
                 print(f"DEBUG - Erro ao capturar resposta: {e}")
     
-    with sync_playwright() as p:
-        # Usa User-Agent aleatório e configurações mais humanas
-        user_agent = get_random_user_agent()
-        browser = p.chromium.launch(
-            headless=False,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-extensions-file-access-check',
-                '--disable-extensions',
-                '--disable-plugins-discovery',
-                '--disable-default-apps'
-            ]
-        )
-        context = browser.new_context(
+    # Usa User-Agent aleatório e configurações mais humanas
+    user_agent = get_random_user_agent()
+    with (
+        abrir_pool(pool, headless=False) as pool_ativo,
+        pool_ativo.contexto(
+            INIT_SCRIPT_BUSCA,  # Remove sinais de automação
             user_agent=user_agent,
             viewport={'width': 1366, 'height': 768},
             locale='pt-BR',
@@ -259,34 +315,8 @@ def get_cookies_after_busca(uf):
                 'Sec-Fetch-Dest': 'document',
                 'Upgrade-Insecure-Requests': '1'
             }
-        )
-        
-        # Remove sinais de automação
-        context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined,
-            });
-            
-            window.chrome = {
-                runtime: {}
-            };
-            
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5],
-            });
-            
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['pt-BR', 'pt', 'en-US', 'en'],
-            });
-            
-            const originalQuery = window.navigator.permissions.query;
-            return window.navigator.permissions.query = (parameters) => (
-                parameters.name === 'notifications' ?
-                    Promise.resolve({ state: Notification.permission }) :
-                    originalQuery(parameters)
-            );
-        """)
-        
+        ) as context,
+    ):
         page = context.new_page()
         logger.info(f"Usando User-Agent: {user_agent}")
         
@@ -401,15 +431,108 @@ def get_cookies_after_busca(uf):
         except Exception as e:
             print(f"DEBUG - Erro na requisição imediata: {e}")
         
-        browser.close()
-        
         # Monta string de cookies para requests
         cookie_str = "; ".join([f"{c['name']}={c['value']}" for c in cookies])
         return cookie_str, captured_request, captured_response, security_hash
 
-def scrap_cfm_api_hibrido(uf, delay=1.5, max_paginas=None):
+KNOWN_SECURITY_HASH = "9e47994169b1ec0a0de80233de70a610"
+
+def montar_payload(uf, pagina, real_payload_data=None):
+    """Monta o payload da API a partir do payload real do navegador (se houver) ou do padrão"""
+    if real_payload_data:
+        payload = {}
+        for key, value_list in real_payload_data.items():
+            payload[key] = value_list[0] if value_list else ""
+        payload["pagina"] = str(pagina)
+    else:
+        payload = {
+            "uf": uf,
+            "pagina": str(pagina),
+            "nome": "",
+            "crm": "",
+            "municipio": "",
+            "especialidade": "",
+            "area_atuacao": "",
+            "tipo_inscricao": "",
+            "situacao": "",
+            "situacao_2": "",
+        }
+    # Adiciona o SECURITYHASH - usa o que sabemos que funciona
+    payload["securityhash"] = KNOWN_SECURITY_HASH
+    return payload
+
+def salvar_medicos_api(todos_medicos, uf, formato="csv"):
+    """Salva os médicos coletados via API em CSV (ou Parquet) e retorna o DataFrame"""
+    if todos_medicos:
+        df = pd.DataFrame(todos_medicos)
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        destino = destino_arquivo(CSV_PATH / f"medicos_{uf}_{ts}_api", formato)
+        destino.gravar(todos_medicos)
+        destino.fechar()
+        print(f"Salvo {len(df)} médicos em {destino.caminho}")
+        logger.info(f"Salvo {len(df)} médicos em {destino.caminho}")
+        return df
+    else:
+        print("Nenhum médico encontrado.")
+        logger.info("Nenhum médico encontrado.")
+        return None
+
+def coletar_api_concorrente(uf, session, real_payload_data, concorrencia, delay=1.5, max_paginas=None, sqlite=None,
+                            formato="csv"):
+    """
+    Coleta as páginas da UF com várias requisições em voo (motor assíncrono httpx).
+    Cada página é gravada assim que chega (arquivo e, com `sqlite`, o banco), sem
+    acumular a UF em memória. Retorna um resumo (páginas, registros e arquivo
+    gerado), como `CFMScraper.run`; os dados não são relidos do disco.
+    """
+    from src.api_assincrona import PaginadorAssincrono
+
+    paginador = PaginadorAssincrono(
+        API_URL,
+        payload_base=montar_payload(uf, 1, real_payload_data),
+        headers=dict(session.headers),
+        cookies=session.cookies.get_dict(),
+        concorrencia=concorrencia,
+        controle=ControladorAIMD(atraso_inicial=delay, nome=uf),
+    )
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    destino = destino_arquivo(CSV_PATH / f"medicos_{uf}_{ts}_api", formato)
+    destinos = [destino] + ([DestinoSqlite(sqlite, uf=uf)] if sqlite else [])
+
+    logger.info(f"Coleta concorrente para UF {uf} com {concorrencia} requisições simultâneas")
+    with EscritorStreaming(destinos) as escritor:
+        def ao_receber_pagina(pagina, medicos):
+            logger.info(f"Página {pagina}: {len(medicos)} médicos encontrados.")
+            escritor.escrever(medicos)
+
+        paginas = paginador.executar(ao_receber_pagina, pagina_inicial=1, max_paginas=max_paginas)
+
+    if escritor.registros:
+        print(f"Salvo {escritor.registros} médicos em {destino.caminho}")
+        logger.info(f"Salvo {escritor.registros} médicos em {destino.caminho}")
+    else:
+        print("Nenhum médico encontrado.")
+        logger.info("Nenhum médico encontrado.")
+    return {
+        "uf": uf,
+        "paginas": paginas,
+        "registros": escritor.registros,
+        "arquivo": str(destino.caminho) if escritor.registros else None,
+    }
+
+def scrap_cfm_api_hibrido(uf, delay=1.5, max_paginas=None, concorrencia=None, pool=None, sqlite=None, formato="csv"):
+    """
+    Scraping híbrido: Playwright captura sessão/payload e a paginação é feita via API.
+    Com `concorrencia` > 1, as páginas são buscadas pelo motor assíncrono (httpx) e
+    gravadas em streaming; nesse caso o retorno é o resumo de `coletar_api_concorrente`
+    (o arquivo gerado pode ser lido com `pd.read_csv`/`pd.read_parquet`), não um DataFrame.
+    Com `sqlite`, cada página também é gravada (upsert por crm/uf) nesse banco.
+    formato="parquet" grava o arquivo final em Parquet em vez de CSV.
+    Falhas no loop sequencial seguem a `PoliticaRetry`; o resumo das novas tentativas
+    (inclusive por página) fica em `df.attrs["retries"]`.
+    """
     logger.info(f"Iniciando scraping híbrido via Playwright+requests para UF {uf}")
-    cookie_str, captured_request, captured_response, security_hash = get_cookies_after_busca(uf)
+    cookie_str, captured_request, captured_response, security_hash = get_cookies_after_busca(uf, pool=pool)
     
     # Debug: mostra o que o navegador realmente retornou
     if captured_response:
@@ -488,9 +611,8 @@ def scrap_cfm_api_hibrido(uf, delay=1.5, max_paginas=None):
             payload[key] = value_list[0] if value_list else ""
         
         # Adiciona o SECURITYHASH conhecido ao payload real
-        known_security_hash = "9e47994169b1ec0a0de80233de70a610"
-        payload["securityhash"] = known_security_hash
-        print(f"DEBUG - Adicionando SECURITYHASH conhecido ao payload real: {known_security_hash}")
+        payload["securityhash"] = KNOWN_SECURITY_HASH
+        print(f"DEBUG - Adicionando SECURITYHASH conhecido ao payload real: {KNOWN_SECURITY_HASH}")
         
         try:
             print(f"DEBUG - Payload real enviado: {payload}")
@@ -519,46 +641,30 @@ def scrap_cfm_api_hibrido(uf, delay=1.5, max_paginas=None):
     else:
         pagina = 1
     
+    if concorrencia and concorrencia > 1:
+        return coletar_api_concorrente(uf, session, real_payload_data, concorrencia, delay, max_paginas, sqlite,
+                                       formato)
+    
+    banco = DestinoSqlite(sqlite, uf=uf) if sqlite else None
     todos_medicos = []
-    consecutive_failures = 0
-    max_consecutive_failures = 3
+    politica = politica_retry.PoliticaRetry()
+    # Intervalo entre requisições ajustado pela latência e pelas falhas observadas
+    controle = ControladorAIMD(atraso_inicial=delay, nome=uf)
     
     while True:
         # Usa o payload real se disponível, senão usa o padrão
-        if real_payload_data and pagina > 1:
-            payload = {}
-            for key, value_list in real_payload_data.items():
-                payload[key] = value_list[0] if value_list else ""
-            # Atualiza a página
-            payload["pagina"] = str(pagina)
-            print(f"DEBUG - Payload baseado no navegador (página {pagina}): {payload}")
-        else:
-            # Payload padrão
-            payload = {
-                "uf": uf,
-                "pagina": str(pagina),
-                "nome": "",
-                "crm": "",
-                "municipio": "",
-                "especialidade": "",
-                "area_atuacao": "",
-                "tipo_inscricao": "",
-                "situacao": "",
-                "situacao_2": "",
-            }
-            
-                    # Adiciona o SECURITYHASH - usa o que sabemos que funciona
-        known_security_hash = "9e47994169b1ec0a0de80233de70a610"
-        payload["securityhash"] = known_security_hash
-        print(f"DEBUG - Adicionando SECURITYHASH conhecido: {known_security_hash}")
+        payload = montar_payload(uf, pagina, real_payload_data if pagina > 1 else None)
+        print(f"DEBUG - Payload da página {pagina} com SECURITYHASH conhecido: {payload['securityhash']}")
         
         try:
             print(f"DEBUG - Payload enviado: {payload}")
             
-            # Adiciona delay aleatório antes da requisição
-            random_delay(1.5, 3.5)
+            # Intervalo antes da requisição definido pelo controlador de taxa
+            controle.aguardar(pagina)
             
+            inicio = time.perf_counter()
             resp = session.post(API_URL, data=payload, timeout=30)
+            latencia = time.perf_counter() - inicio
             resp.raise_for_status()
             
             # Verifica se a resposta é válida
@@ -571,46 +677,33 @@ def scrap_cfm_api_hibrido(uf, delay=1.5, max_paginas=None):
                 raise Exception(f"Resposta não é JSON válido: {e}")
                 
             print(f"DEBUG - Resposta da API: {data}")
-            consecutive_failures = 0  # Reset contador de falhas
-            
-        except requests.exceptions.RequestException as e:
-            consecutive_failures += 1
-            logger.error(f"Erro de requisição na página {pagina}: {e} (tentativa {consecutive_failures})")
-            print(f"DEBUG - Erro na requisição: {e}")
-            
-            if consecutive_failures >= max_consecutive_failures:
-                logger.error(f"Muitas falhas consecutivas ({consecutive_failures}). Encerrando.")
-                break
-            
-            # Pausa mais longa em caso de erro
-            print(f"Aguardando antes de tentar novamente...")
-            random_delay(5, 10)
-            continue
             
         except Exception as e:
-            consecutive_failures += 1
-            logger.error(f"Erro geral na página {pagina}: {e} (tentativa {consecutive_failures})")
-            print(f"DEBUG - Erro geral: {e}")
+            # Backoff exponencial com jitter, Retry-After e orçamento por classe de erro;
+            # falhas demais abrem o circuito e pausam a UF em vez de abandoná-la
+            classe = politica_retry.classificar_erro(e)
+            resposta = getattr(e, "response", None)
+            controle.registrar(sinal_http(resposta.status_code) if resposta is not None
+                               else BLOQUEIO if classe == politica_retry.BLOQUEIO else ERRO, pagina=pagina)
+            logger.error(f"Erro ({classe}) na página {pagina}: {e}")
+            print(f"DEBUG - Erro na requisição: {e}")
             
-            # Se for erro de bloqueio/captcha, pausa mais longa
-            error_msg = str(e).lower()
-            if any(term in error_msg for term in ['blocked', 'captcha', 'rate limit', 'too many requests']):
-                logger.warning("Possível bloqueio detectado. Pausando por mais tempo...")
-                random_delay(30, 60)
-            else:
-                random_delay(5, 10)
-                
-            if consecutive_failures >= max_consecutive_failures:
-                logger.error(f"Muitas falhas consecutivas ({consecutive_failures}). Encerrando.")
+            espera = politica.falha(pagina, classe, politica_retry.retry_after(resposta))
+            if espera is None:
                 break
-            
+            print(f"Aguardando {espera:.1f}s antes de tentar novamente...")
+            sleep(espera)
             continue
         medicos = data.get("dados", [])
         if not medicos or medicos is None:
             logger.info(f"Nenhum médico encontrado na página {pagina}. Encerrando scraping.")
             break
         logger.info(f"Página {pagina}: {len(medicos)} médicos encontrados.")
+        controle.registrar(OK, latencia, pagina)
+        politica.sucesso(pagina)
         todos_medicos.extend(medicos)
+        if banco:
+            banco.gravar(medicos)
         if max_paginas and pagina >= max_paginas:
             logger.info(f"Máximo de páginas {max_paginas} atingido.")
             break
@@ -621,55 +714,22 @@ def scrap_cfm_api_hibrido(uf, delay=1.5, max_paginas=None):
             new_user_agent = get_random_user_agent()
             session.headers.update({'User-Agent': new_user_agent})
             logger.info(f"User-Agent rotacionado para: {new_user_agent}")
-            
-        # Delay variável - páginas posteriores têm delays maiores
-        base_delay = delay
-        if pagina > 10:
-            base_delay = delay * 1.5
-        elif pagina > 20:
-            base_delay = delay * 2
-            
-        # Adiciona variação aleatória ao delay
-        actual_delay = random.uniform(base_delay, base_delay * 1.8)
-        logger.info(f"Pausando {actual_delay:.2f}s antes da próxima página...")
-        sleep(actual_delay)
-    if todos_medicos:
-        df = pd.DataFrame(todos_medicos)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        arquivo_csv = CSV_PATH / f"medicos_{uf}_{ts}_api.csv"
-        df.to_csv(arquivo_csv, index=False, encoding="utf-8-sig")
-        print(f"Salvo {len(df)} médicos em {arquivo_csv}")
-        logger.info(f"Salvo {len(df)} médicos em {arquivo_csv}")
-        return df
-    else:
-        print("Nenhum médico encontrado.")
-        logger.info("Nenhum médico encontrado.")
-        return None
+    if banco:
+        banco.fechar()
+    estatisticas = politica.estatisticas()
+    logger.info(f"Novas tentativas: {estatisticas['tentativas_extras']} em {estatisticas['paginas_com_retry']} página(s) | "
+                f"por classe: {estatisticas['falhas_por_classe']} | circuito aberto {estatisticas['aberturas_circuito']}x")
+    df = salvar_medicos_api(todos_medicos, uf, formato)
+    if df is not None:
+        df.attrs["retries"] = estatisticas  # tentativas por página etc., junto do resultado da execução
+    return df
 
 def detect_blocking_patterns(page):
-    """Detecta padrões de bloqueio na página"""
-    try:
-        content = page.content().lower()
-        blocking_indicators = [
-            'blocked', 'captcha', 'verificação', 'suspeita', 'bot',
-            'rate limit', 'too many requests', 'acesso negado',
-            'access denied', 'forbidden', 'erro 403', 'erro 429'
-        ]
-        
-        for indicator in blocking_indicators:
-            if indicator in content:
-                logger.warning(f"Possível bloqueio detectado: '{indicator}'")
-                return True
-                
-        # Verifica se há elementos de busca na página
-        if page.locator('.busca-resultado').count() == 0 and page.locator('select[name="uf"]').count() == 0:
-            logger.warning("Página não contém elementos esperados - possível redirecionamento")
-            return True
-            
-        return False
-    except Exception as e:
-        logger.error(f"Erro ao detectar bloqueio: {e}")
-        return False
+    """Detecta padrões de bloqueio na página (classificador compartilhado, com cache por navegação)"""
+    resultado = classificador_para(page).classificar()
+    if resultado.bloqueado:
+        logger.warning(f"Possível bloqueio detectado: {resultado.motivo}")
+    return resultado.bloqueado
 
 def save_session_state(todos_medicos, uf, pagina_atual):
     """Salva o estado da sessão para recuperação"""
@@ -685,35 +745,31 @@ def save_session_state(todos_medicos, uf, pagina_atual):
         logger.error(f"Erro ao salvar estado da sessão: {e}")
     return None
 
-def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
-    """Scraping usando apenas Playwright - sem requests"""
+def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1, pool=None, modo="dom", sqlite=None,
+                              formato="csv"):
+    """
+    Scraping usando apenas Playwright - sem requests (reutiliza o Chromium de `pool`, se fornecido).
+    modo="dom" extrai dos cards; modo="rede" usa o JSON interceptado de buscar_medicos.
+    Com `sqlite`, cada página também é gravada (upsert por crm/uf) nesse banco.
+    formato="parquet" grava o arquivo final em Parquet em vez de CSV.
+    """
     logger.info(f"Iniciando scraping puro via Playwright para UF {uf} (página inicial: {start_page})")
     
-    with sync_playwright() as p:
-        # Configurações humanizadas para Playwright
-        user_agent = get_random_user_agent()
-        browser = p.chromium.launch(
-            headless=False,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-extensions-file-access-check',
-                '--disable-extensions',
-                '--disable-plugins-discovery',
-                '--disable-default-apps'
-            ]
-        )
-        # Viewport mais variável e realista
-        viewports = [
-            {'width': 1366, 'height': 768},
-            {'width': 1920, 'height': 1080},
-            {'width': 1440, 'height': 900},
-            {'width': 1536, 'height': 864},
-            {'width': 1280, 'height': 720}
-        ]
-        
-        context = browser.new_context(
+    # Viewport mais variável e realista
+    viewports = [
+        {'width': 1366, 'height': 768},
+        {'width': 1920, 'height': 1080},
+        {'width': 1440, 'height': 900},
+        {'width': 1536, 'height': 864},
+        {'width': 1280, 'height': 720}
+    ]
+    
+    # Configurações humanizadas para Playwright
+    user_agent = get_random_user_agent()
+    with (
+        abrir_pool(pool, headless=False) as pool_ativo,
+        pool_ativo.contexto(
+            INIT_SCRIPT_HUMANIZADO,  # Script mais avançado para remover sinais de automação
             user_agent=user_agent,
             viewport=random.choice(viewports),
             locale='pt-BR',
@@ -727,69 +783,11 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
                 'DNT': '1',  # Do Not Track
                 'Upgrade-Insecure-Requests': '1'
             }
-        )
-        
-        # Script mais avançado para remover sinais de automação
-        context.add_init_script("""
-            // Remove webdriver
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined,
-            });
-            
-            // Adiciona chrome objeto mais realista
-            window.chrome = {
-                runtime: {},
-                loadTimes: function() {},
-                csi: function() {},
-                app: {}
-            };
-            
-            // Plugins mais realistas
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => {
-                    const plugins = [];
-                    plugins[0] = { name: 'Chrome PDF Plugin', filename: 'internal-pdf-viewer' };
-                    plugins[1] = { name: 'Chrome PDF Viewer', filename: 'mhjfbmdgcfjbbpaeojofohoefgiehjai' };
-                    plugins[2] = { name: 'Native Client', filename: 'internal-nacl-plugin' };
-                    return plugins;
-                },
-            });
-            
-            // Permissões mais realistas
-            const originalQuery = window.navigator.permissions.query;
-            window.navigator.permissions.query = (parameters) => (
-                parameters.name === 'notifications' ?
-                    Promise.resolve({ state: Notification.permission }) :
-                    originalQuery(parameters)
-            );
-            
-            // Adiciona propriedades de hardware mais realistas
-            Object.defineProperty(navigator, 'hardwareConcurrency', {
-                get: () => 4,
-            });
-            
-            Object.defineProperty(navigator, 'deviceMemory', {
-                get: () => 8,
-            });
-            
-            // Language array mais realista
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['pt-BR', 'pt', 'en-US', 'en'],
-            });
-            
-            // Adiciona getBattery se não existir
-            if (!navigator.getBattery) {
-                navigator.getBattery = () => Promise.resolve({
-                    charging: true,
-                    chargingTime: 0,
-                    dischargingTime: Infinity,
-                    level: 0.99
-                });
-            }
-        """)
-        
+        ) as context,
+    ):
         page = context.new_page()
         logger.info(f"Usando User-Agent: {user_agent}")
+        captura = CapturaBuscarMedicos(page) if modo == "rede" else None
         
         print(f"Abrindo página de busca para UF {uf}...")
         # Navegação mais robusta
@@ -852,6 +850,10 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
         random_delay(3, 6)
         simulate_mouse_movement(page)
         
+        # Intervalo entre páginas ajustado pelos sinais observados (latência, bloqueios, páginas vazias);
+        # criado antes da busca para que ela e o salto de retomada também passem pelo limite global
+        controle = ControladorAIMD(atraso_inicial=delay, nome=uf)
+        
         # Ação mais deliberada no botão
         search_button = page.locator('button.btn-buscar')
         search_button.hover()
@@ -860,6 +862,8 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
         # Adiciona ruído antes do clique final
         add_random_browser_noise(page)
         
+        if controle.limitador is not None:  # a busca inicial também conta no limite global
+            controle.limitador.adquirir(1)
         search_button.click()
         logger.info("Iniciou busca com comportamento humanizado")
         
@@ -879,8 +883,19 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
         simulate_mouse_movement(page)
         random_delay(2, 3)
         
+        # Retomada: salta direto para a página inicial, sem clicar em 2..N
+        if start_page > 1:
+            if ir_para_pagina(page, start_page, limitador=controle.limitador):
+                logger.info(f"Retomando da página {start_page}")
+            else:
+                logger.error(f"Não foi possível saltar para a página {start_page}")
+                start_page = pagina_ativa(page) or 1
+            random_delay(2, 3)
+        
         todos_medicos = []
+        banco = DestinoSqlite(sqlite, uf=uf) if sqlite else None
         pagina = start_page
+        inicio_navegacao = None  # clique na página seguinte -> resultados carregados
         session_saves = 0
         last_successful_page = 0
         consecutive_empty_pages = 0
@@ -891,6 +906,7 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
             # Detecta bloqueios antes de processar
             if detect_blocking_patterns(page):
                 logger.error(f"Bloqueio detectado na página {pagina}!")
+                controle.registrar(BLOQUEIO, pagina=pagina)
                 
                 # Salva progresso antes de parar
                 if todos_medicos:
@@ -927,69 +943,20 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
                 logger.info(f"Aguardando resultados da página {pagina}...")
                 
                 # Aguarda os resultados carregarem
-                page.wait_for_selector('div.busca-resultado > div[class^="resultado-item"]', timeout=45000)
+                if captura is None:
+                    page.wait_for_selector('div.busca-resultado > div[class^="resultado-item"]', timeout=45000)
                 
-                # Extrai dados dos cards de médicos
-                medicos_pagina = page.evaluate("""
-                    () => {
-                        const cards = document.querySelectorAll('div.busca-resultado > div[class^="resultado-item"]');
-                        const medicos = [];
-                        
-                        cards.forEach(card => {
-                            const medico = {};
-                            const texto = card.textContent;
-                            
-                            // Extrai nome (primeira linha antes do CRM)
-                            const nomeMatch = texto.match(/^([^\\n]+?)\\s+CRM:/);
-                            if (nomeMatch) {
-                                medico.nome = nomeMatch[1].trim();
-                            }
-                            
-                            // Extrai CRM
-                            const crmMatch = texto.match(/CRM:\\s*([^\\s]+)/);
-                            if (crmMatch) {
-                                medico.crm = crmMatch[1].trim();
-                            }
-                            
-                            // Extrai data de inscrição (apenas a data, não o texto extra)
-                            const dataMatch = texto.match(/Data de Inscrição:\\s*([0-9]{2}\\/[0-9]{2}\\/[0-9]{4})/);
-                            if (dataMatch) {
-                                medico.data_inscricao = dataMatch[1].trim();
-                            }
-                            
-                            // Extrai situação (apenas a palavra, não o texto extra)
-                            const situacaoMatch = texto.match(/Situação:\\s*([^\\s]+)/);
-                            if (situacaoMatch) {
-                                medico.situacao = situacaoMatch[1].trim();
-                            }
-                            
-                            // Extrai especialidade (apenas a especialidade, não o texto extra)
-                            const espMatch = texto.match(/Especialidades\\/Áreas de Atuação:\\s*([^\\n]+?)(?=\\s+Endereço|$)/);
-                            if (espMatch) {
-                                medico.especialidade = espMatch[1].trim();
-                            }
-                            
-                            // Extrai instituição de graduação
-                            const instMatch = texto.match(/Instituição de Graduação:\\s*([^\\n]+)/);
-                            if (instMatch) {
-                                medico.instituicao_graduacao = instMatch[1].trim();
-                            }
-                            
-                            // Extrai ano de formatura
-                            const anoMatch = texto.match(/Ano de Formatura:\\s*([0-9]{4})/);
-                            if (anoMatch) {
-                                medico.ano_formatura = anoMatch[1].trim();
-                            }
-                            
-                            medicos.push(medico);
-                        });
-                        
-                        return medicos;
-                    }
-                """)
+                # Extrai dados da resposta JSON interceptada (modo "rede") ou dos cards (modo "dom")
+                medicos_pagina, fim_resultados = registros_da_pagina(page, pagina, captura)
+                latencia = time.perf_counter() - inicio_navegacao if inicio_navegacao else None
+                inicio_navegacao = None
+                if fim_resultados:
+                    print(f"Fim dos resultados na página {pagina} (resposta de buscar_medicos vazia).")
+                    break
                 
                 if not medicos_pagina or len(medicos_pagina) == 0:
                     consecutive_empty_pages += 1
+                    controle.registrar(VAZIA, pagina=pagina)
                     print(f"Nenhum médico encontrado na página {pagina}. (Páginas vazias consecutivas: {consecutive_empty_pages})")
                     
                     # Se muitas páginas vazias consecutivas, pode ser fim ou bloqueio
@@ -998,21 +965,20 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
                         if detect_blocking_patterns(page):
                             logger.error("Bloqueio confirmado após páginas vazias")
                         break
-                    
-                    # Pausa maior para páginas vazias
-                    empty_page_delay = random.uniform(5, 10)
-                    logger.info(f"Pausa especial para página vazia: {empty_page_delay:.1f}s")
-                    sleep(empty_page_delay)
                 else:
                     consecutive_empty_pages = 0  # Reset contador
                     last_successful_page = pagina
+                    controle.registrar(OK, latencia, pagina)
                 
                 print(f"Página {pagina}: {len(medicos_pagina)} médicos encontrados.")
+                registrar_pagina(context, pagina)
                 if medicos_pagina:
                     print("DEBUG - Primeiro médico extraído:")
                     for key, value in medicos_pagina[0].items():
                         print(f"  {key}: {value}")
                 todos_medicos.extend(medicos_pagina)
+                if banco:
+                    banco.gravar(medicos_pagina)
                 
                 # Simula "leitura" dos resultados
                 simulate_human_reading(page, 2, 5)
@@ -1079,13 +1045,10 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
                         
                         next_button.hover()
                         random_delay(1, 2.5)  # Hesitação maior
+                        controle.aguardar(next_page_number)
+                        inicio_navegacao = time.perf_counter()
                         next_button.click()
                         
-                        # Delay inteligente baseado no número da página
-                        smart_delay = intelligent_delay(pagina, delay)
-                        logger.info(f"Pausa inteligente: {smart_delay:.2f}s")
-                        sleep(smart_delay)
-                        
                         pagina += 1
                         continue
                     
@@ -1093,8 +1056,9 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
                     next_button_alt = page.locator('xpath=//*[@id="paginacao"]//a[contains(text(), "Próxima") or contains(text(), ">")]')
                     if next_button_alt.count() > 0:
                         print(f"Estratégia 2: Usando botão 'Próxima' para ir para página {next_page_number}...")
+                        controle.aguardar(next_page_number)
+                        inicio_navegacao = time.perf_counter()
                         next_button_alt.click()
-                        sleep(delay)
                         pagina += 1
                         continue
                     
@@ -1102,8 +1066,9 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
                     next_button_alt2 = page.locator(f'xpath=//*[@id="paginacao"]//a[text()="{next_page_number + 1}" or text()="{next_page_number + 2}" or text()="{next_page_number + 3}"]')
                     if next_button_alt2.count() > 0:
                         print("Estratégia 3: Indo para próxima página disponível...")
+                        controle.aguardar(next_page_number)
+                        inicio_navegacao = time.perf_counter()
                         next_button_alt2.first.click()
-                        sleep(delay)
                         pagina += 1
                         continue
                     
@@ -1111,8 +1076,9 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
                     last_button = page.locator('xpath=//*[@id="paginacao"]//a[contains(text(), "Última") or contains(text(), ">>")]')
                     if last_button.count() > 0:
                         print("Estratégia 4: Usando botão 'Última' para ir para a última página...")
+                        controle.aguardar()
+                        inicio_navegacao = time.perf_counter()
                         last_button.click()
-                        sleep(delay)
                         # Vai para a última página, então precisa descobrir qual é
                         pagina = 999999  # Será ajustado na próxima iteração
                         continue
@@ -1129,15 +1095,15 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
                 print(f"Erro ao processar página {pagina}: {e}")
                 break
         
-        browser.close()
-        
         # Salva os dados
+        if banco:
+            banco.fechar()
         if todos_medicos:
-            df = pd.DataFrame(todos_medicos)
             ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            arquivo_csv = CSV_PATH / f"medicos_{uf}_{ts}_playwright.csv"
-            df.to_csv(arquivo_csv, index=False, encoding="utf-8-sig")
-            logger.info(f"Dados salvos em {arquivo_csv}")
+            destino = destino_arquivo(CSV_PATH / f"medicos_{uf}_{ts}_playwright", formato)
+            destino.gravar(todos_medicos)
+            destino.fechar()
+            logger.info(f"Dados salvos em {destino.caminho}")
             print(f"Total de médicos encontrados: {len(todos_medicos)}")
         else:
             logger.info("Nenhum médico encontrado.")
@@ -1146,7 +1112,7 @@ def scrap_cfm_pure_playwright(uf, delay=1.5, max_paginas=None, start_page=1):
 if __name__ == "__main__":
     print("=== SCRAPER CFM SUPER HUMANIZADO ===")
     print("\n🤖 Técnicas implementadas:")
-    print("  ✅ Delays inteligentes crescentes")
+    print("  ✅ Intervalo entre páginas adaptativo (AIMD)")
     print("  ✅ Simulação de leitura e scroll")
     print("  ✅ Movimentos de mouse realistas")
     print("  ✅ Detecção e recuperação de bloqueios")
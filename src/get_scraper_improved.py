@@ -1,11 +1,16 @@
-from playwright.sync_api import sync_playwright
 import requests
-import pandas as pd
-from time import sleep
+from time import perf_counter, sleep
 from datetime import datetime
 from pathlib import Path
 import logging
-import pickle
+
+from src.captura_rede import CapturaBuscarMedicos, registros_da_pagina
+from src.controle_taxa import OK, ControladorAIMD
+from src.escrita import DestinoSqlite, destino_arquivo
+from src.journal import JournalCheckpoint
+from src.navegacao import ir_para_pagina, pagina_ativa
+from src.politica_recursos import registrar_pagina
+from src.pool_navegador import abrir_pool
 
 # Diretório para salvar o arquivo de saída
 DATA_DIR = (Path(__file__).resolve().parent / ".." / "data").resolve()
@@ -23,61 +28,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def salvar_checkpoint(medicos, pagina, uf):
-    """Salva checkpoint do progresso"""
-    checkpoint_data = {
-        'medicos': medicos,
-        'pagina': pagina,
-        'uf': uf,
-        'timestamp': datetime.now().isoformat()
-    }
-    checkpoint_file = CHECKPOINT_PATH / f"checkpoint_{uf}_{pagina}.pkl"
-    with open(checkpoint_file, 'wb') as f:
-        pickle.dump(checkpoint_data, f)
-    print(f"Checkpoint salvo: {len(medicos)} médicos, página {pagina}")
-
-def carregar_checkpoint(uf):
-    """Carrega o último checkpoint"""
-    checkpoint_files = list(CHECKPOINT_PATH.glob(f"checkpoint_{uf}_*.pkl"))
-    if not checkpoint_files:
-        return [], 1
-    
-    # Pega o checkpoint mais recente
-    latest_checkpoint = max(checkpoint_files, key=lambda x: x.stat().st_mtime)
-    
-    try:
-        with open(latest_checkpoint, 'rb') as f:
-            checkpoint_data = pickle.load(f)
-            print(f"Checkpoint carregado: {len(checkpoint_data['medicos'])} médicos, página {checkpoint_data['pagina']}")
-            return checkpoint_data['medicos'], checkpoint_data['pagina']
-    except Exception as e:
-        print(f"Erro ao carregar checkpoint: {e}")
-        return [], 1
-
-def salvar_csv_periodicamente(medicos, uf, pagina):
-    """Salva CSV a cada 100 páginas"""
-    if len(medicos) > 0 and pagina % 100 == 0:
-        df = pd.DataFrame(medicos)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        arquivo_csv = CSV_PATH / f"medicos_{uf}_pagina_{pagina}_{ts}_checkpoint.csv"
-        df.to_csv(arquivo_csv, index=False, encoding="utf-8-sig")
-        print(f"CSV salvo: {len(medicos)} médicos até página {pagina}")
-
-def scrap_cfm_pure_playwright_improved(uf, delay=2.0, max_paginas=None, usar_checkpoint=True):
-    """Scraping melhorado com checkpoint e salvamento periódico"""
+def scrap_cfm_pure_playwright_improved(uf, delay=2.0, max_paginas=None, usar_checkpoint=True, pool=None, modo="dom",
+                                       sqlite=None, formato="csv"):
+    """
+    Scraping melhorado com checkpoint por página (journal append-only em CHECKPOINT_PATH).
+    usar_checkpoint=False começa do zero sem apagar o journal anterior (ele é
+    arquivado com carimbo de data/hora em CHECKPOINT_PATH).
+    modo="rede" usa o JSON interceptado de buscar_medicos em vez dos cards.
+    Com `sqlite`, cada página também é gravada (upsert por crm/uf) nesse banco.
+    formato="parquet" grava o arquivo final em Parquet em vez de CSV.
+    """
     logger.info(f"Iniciando scraping melhorado via Playwright para UF {uf}")
     
-    # Carrega checkpoint se solicitado
-    todos_medicos = []
-    pagina_inicial = 1
-    if usar_checkpoint:
-        todos_medicos, pagina_inicial = carregar_checkpoint(uf)
-        print(f"Continuando de: {len(todos_medicos)} médicos, página {pagina_inicial}")
+    # Retomada: só o índice do journal é lido, não os registros já coletados
+    journal = JournalCheckpoint(uf, CHECKPOINT_PATH)
+    if not usar_checkpoint:
+        journal.arquivar()
+    pagina_inicial = journal.ultima_pagina + 1
+    if journal.ultima_pagina:
+        print(f"Continuando de: {journal.total_registros} médicos, página {pagina_inicial}")
+    banco = DestinoSqlite(sqlite, uf=uf) if sqlite else None
+    # Intervalo entre páginas ajustado pela latência observada (parte de `delay`)
+    controle = ControladorAIMD(atraso_inicial=delay, nome=uf)
+    inicio_navegacao = None  # clique na página seguinte -> resultados carregados
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        context = browser.new_context()
+    with abrir_pool(pool, headless=False, args=[]) as pool_ativo, pool_ativo.contexto() as context:
         page = context.new_page()
+        captura = CapturaBuscarMedicos(page) if modo == "rede" else None
         
         print(f"Abrindo página de busca para UF {uf}...")
         page.goto("https://portal.cfm.org.br/busca-medicos")
@@ -85,31 +62,22 @@ def scrap_cfm_pure_playwright_improved(uf, delay=2.0, max_paginas=None, usar_che
         # Faz a busca inicial
         page.locator('select[name="uf"]').select_option(uf)
         sleep(1)
+        if controle.limitador is not None:  # a busca inicial também conta no limite global
+            controle.limitador.adquirir(1)
         page.locator('button.btn-buscar').click()
         print("Aguardando resultados carregarem...")
         page.wait_for_selector('div.busca-resultado > div[class^="resultado-item"]', timeout=120_000)
         print("Resultados carregados!")
         
-        # Se tem checkpoint, navega até a página correta
+        # Se tem checkpoint, salta direto para a página correta (custo independe de N)
+        pagina = pagina_inicial
         if pagina_inicial > 1:
             print(f"Navegando para página {pagina_inicial}...")
-            for i in range(2, pagina_inicial + 1):
-                try:
-                    next_button = page.locator(f'xpath=//*[@id="paginacao"]//a[text()="{i}"]')
-                    if next_button.count() > 0:
-                        next_button.click()
-                        sleep(delay)
-                    else:
-                        # Usa estratégia alternativa
-                        next_button_alt = page.locator('xpath=//*[@id="paginacao"]//a[contains(text(), "Próxima") or contains(text(), ">")]')
-                        if next_button_alt.count() > 0:
-                            next_button_alt.click()
-                            sleep(delay)
-                except Exception as e:
-                    print(f"Erro ao navegar para página {i}: {e}")
-                    break
-        
-        pagina = pagina_inicial
+            if not ir_para_pagina(page, pagina_inicial, limitador=controle.limitador):
+                pagina = pagina_ativa(page) or 1
+                print(f"Não foi possível saltar para a página {pagina_inicial}; continuando da página {pagina} "
+                      f"(páginas até {journal.ultima_pagina} já estão no journal e não serão regravadas).")
+            sleep(delay)
         
         while True:
             print(f"Processando página {pagina}...")
@@ -126,80 +94,29 @@ def scrap_cfm_pure_playwright_improved(uf, delay=2.0, max_paginas=None, usar_che
             # Extrai dados da página atual
             try:
                 # Aguarda os resultados carregarem
-                page.wait_for_selector('div.busca-resultado > div[class^="resultado-item"]', timeout=30000)
+                if captura is None:
+                    page.wait_for_selector('div.busca-resultado > div[class^="resultado-item"]', timeout=30000)
                 
-                # Extrai dados dos cards de médicos
-                medicos_pagina = page.evaluate("""
-                    () => {
-                        const cards = document.querySelectorAll('div.busca-resultado > div[class^="resultado-item"]');
-                        const medicos = [];
-                        
-                        cards.forEach(card => {
-                            const medico = {};
-                            const texto = card.textContent;
-                            
-                            // Extrai nome (primeira linha antes do CRM)
-                            const nomeMatch = texto.match(/^([^\\n]+?)\\s+CRM:/);
-                            if (nomeMatch) {
-                                medico.nome = nomeMatch[1].trim();
-                            }
-                            
-                            // Extrai CRM
-                            const crmMatch = texto.match(/CRM:\\s*([^\\s]+)/);
-                            if (crmMatch) {
-                                medico.crm = crmMatch[1].trim();
-                            }
-                            
-                            // Extrai data de inscrição (apenas a data, não o texto extra)
-                            const dataMatch = texto.match(/Data de Inscrição:\\s*([0-9]{2}\\/[0-9]{2}\\/[0-9]{4})/);
-                            if (dataMatch) {
-                                medico.data_inscricao = dataMatch[1].trim();
-                            }
-                            
-                            // Extrai situação (apenas a palavra, não o texto extra)
-                            const situacaoMatch = texto.match(/Situação:\\s*([^\\s]+)/);
-                            if (situacaoMatch) {
-                                medico.situacao = situacaoMatch[1].trim();
-                            }
-                            
-                            // Extrai especialidade (apenas a especialidade, não o texto extra)
-                            const espMatch = texto.match(/Especialidades\\/Áreas de Atuação:\\s*([^\\n]+?)(?=\\s+Endereço|$)/);
-                            if (espMatch) {
-                                medico.especialidade = espMatch[1].trim();
-                            }
-                            
-                            // Extrai instituição de graduação
-                            const instMatch = texto.match(/Instituição de Graduação:\\s*([^\\n]+)/);
-                            if (instMatch) {
-                                medico.instituicao_graduacao = instMatch[1].trim();
-                            }
-                            
-                            // Extrai ano de formatura
-                            const anoMatch = texto.match(/Ano de Formatura:\\s*([0-9]{4})/);
-                            if (anoMatch) {
-                                medico.ano_formatura = anoMatch[1].trim();
-                            }
-                            
-                            medicos.push(medico);
-                        });
-                        
-                        return medicos;
-                    }
-                """)
+                # Extrai dados da resposta JSON interceptada (modo "rede") ou dos cards (modo "dom")
+                medicos_pagina, fim_resultados = registros_da_pagina(page, pagina, captura)
+                latencia = perf_counter() - inicio_navegacao if inicio_navegacao else None
+                inicio_navegacao = None
+                if fim_resultados:
+                    print(f"Fim dos resultados na página {pagina} (resposta de buscar_medicos vazia).")
+                    break
                 
                 if not medicos_pagina or len(medicos_pagina) == 0:
                     print(f"Nenhum médico encontrado na página {pagina}. Encerrando.")
                     break
                 
                 print(f"Página {pagina}: {len(medicos_pagina)} médicos encontrados.")
-                todos_medicos.extend(medicos_pagina)
-                
-                # Salva checkpoint a cada 10 páginas
-                if pagina % 10 == 0:
-                    salvar_checkpoint(todos_medicos, pagina, uf)
+                registrar_pagina(context, pagina)
+                controle.registrar(OK, latencia, pagina)
                 
-                # Salva CSV a cada 100 páginas
-                salvar_csv_periodicamente(todos_medicos, uf, pagina)
+                # Confirma a página no journal (append + fsync + índice atômico);
+                # páginas já confirmadas (retomada que recuou) não são regravadas
+                if journal.registrar_pagina(pagina, medicos_pagina) and banco:
+                    banco.gravar(medicos_pagina)
                 
                 if max_paginas and pagina >= max_paginas:
                     print(f"Máximo de páginas {max_paginas} atingido.")
@@ -213,8 +130,9 @@ def scrap_cfm_pure_playwright_improved(uf, delay=2.0, max_paginas=None, usar_che
                     
                     if next_button.count() > 0:
                         print(f"Estratégia 1: Indo para página {next_page_number}...")
+                        controle.aguardar(next_page_number)
+                        inicio_navegacao = perf_counter()
                         next_button.click()
-                        sleep(delay)
                         pagina += 1
                         continue
                     
@@ -222,8 +140,9 @@ def scrap_cfm_pure_playwright_improved(uf, delay=2.0, max_paginas=None, usar_che
                     next_button_alt = page.locator('xpath=//*[@id="paginacao"]//a[contains(text(), "Próxima") or contains(text(), ">")]')
                     if next_button_alt.count() > 0:
                         print(f"Estratégia 2: Usando botão 'Próxima' para ir para página {next_page_number}...")
+                        controle.aguardar(next_page_number)
+                        inicio_navegacao = perf_counter()
                         next_button_alt.click()
-                        sleep(delay)
                         pagina += 1
                         continue
                     
@@ -231,8 +150,9 @@ def scrap_cfm_pure_playwright_improved(uf, delay=2.0, max_paginas=None, usar_che
                     next_button_alt2 = page.locator(f'xpath=//*[@id="paginacao"]//a[text()="{next_page_number + 1}" or text()="{next_page_number + 2}" or text()="{next_page_number + 3}"]')
                     if next_button_alt2.count() > 0:
                         print("Estratégia 3: Indo para próxima página disponível...")
+                        controle.aguardar(next_page_number)
+                        inicio_navegacao = perf_counter()
                         next_button_alt2.first.click()
-                        sleep(delay)
                         pagina += 1
                         continue
                     
@@ -248,21 +168,20 @@ def scrap_cfm_pure_playwright_improved(uf, delay=2.0, max_paginas=None, usar_che
                 print(f"Erro ao processar página {pagina}: {e}")
                 break
         
-        browser.close()
+        if banco:
+            banco.fechar()
         
-        # Salva os dados finais
-        if todos_medicos:
-            df = pd.DataFrame(todos_medicos)
+        # Salva os dados finais (lidos do journal em streaming)
+        if journal.total_registros:
             ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            arquivo_csv = CSV_PATH / f"medicos_{uf}_{ts}_final.csv"
-            df.to_csv(arquivo_csv, index=False, encoding="utf-8-sig")
-            logger.info(f"Dados finais salvos em {arquivo_csv}")
-            print(f"Total de médicos encontrados: {len(todos_medicos)}")
+            destino = destino_arquivo(CSV_PATH / f"medicos_{uf}_{ts}_final", formato)
+            total = journal.exportar(destino)
+            logger.info(f"Dados finais salvos em {destino.caminho}")
+            print(f"Total de médicos encontrados: {total}")
             
-            # Remove checkpoints antigos
-            for checkpoint_file in CHECKPOINT_PATH.glob(f"checkpoint_{uf}_*.pkl"):
-                checkpoint_file.unlink()
-            print("Checkpoints antigos removidos.")
+            # Remove o journal já exportado
+            journal.limpar()
+            print("Checkpoint removido.")
         else:
             logger.info("Nenhum médico encontrado.")
             print("Nenhum médico encontrado.")
@@ -0,0 +1,198 @@
+"""
+Journal de checkpoint append-only, com granularidade de página.
+
+Cada página coletada vira uma linha JSON (`{"pagina": N, "medicos": [...]}`)
+acrescentada a `journal_<UF>.jsonl`. Depois do `fsync` da linha, um índice
+minúsculo (`journal_<UF>.idx.json`: última página, offset e total de registros)
+é regravado atomicamente (arquivo temporário + `os.replace`). Só o que está
+antes do offset do índice conta como confirmado: uma linha parcial deixada por
+uma queda é truncada ao reabrir. Se o índice sumir ou estiver ilegível, ele é
+reconstruído varrendo o journal até o último registro válido — o journal
+nunca é truncado por falta de índice.
+
+Retomar custa a leitura do índice, não a do histórico inteiro; os registros só
+são lidos (em streaming) na exportação final.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_INDICE_VAZIO = {"pagina": 0, "offset": 0, "registros": 0}
+
+
+def _fsync_diretorio(diretorio: Path):
+    """Torna durável a troca de nomes feita por `os.replace` (sem efeito no Windows)."""
+    if os.name != "posix":
+        return
+    fd = os.open(diretorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JournalCheckpoint:
+    def __init__(self, uf: str, diretorio: Path):
+        diretorio.mkdir(parents=True, exist_ok=True)
+        self.uf = uf
+        self.caminho = diretorio / f"journal_{uf}.jsonl"
+        self.caminho_indice = diretorio / f"journal_{uf}.idx.json"
+        self.indice: Dict = dict(_INDICE_VAZIO)
+        self._reparar(self._ler_indice())
+
+    # ---------- índice ----------
+    def _ler_indice(self) -> Optional[Dict]:
+        """Índice gravado, ou None se ausente ou ilegível (o journal será varrido)."""
+        try:
+            with open(self.caminho_indice, encoding="utf-8") as f:
+                indice = json.load(f)
+            return {chave: int(indice[chave]) for chave in _INDICE_VAZIO}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Índice {self.caminho_indice.name} ilegível ({e}); varrendo o journal.")
+            return None
+
+    def _gravar_indice(self):
+        tmp = self.caminho_indice.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.indice, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.caminho_indice)
+        _fsync_diretorio(self.caminho_indice.parent)
+
+    def _varrer(self) -> Dict:
+        """Índice reconstruído a partir do journal: para no primeiro registro incompleto ou inválido."""
+        indice = dict(_INDICE_VAZIO)
+        offset = 0
+        with open(self.caminho, "rb") as f:
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break
+                try:
+                    entrada = json.loads(linha)
+                    pagina, medicos = int(entrada["pagina"]), entrada["medicos"]
+                except (ValueError, KeyError, TypeError):
+                    break
+                offset += len(linha)
+                indice = {"pagina": max(indice["pagina"], pagina), "offset": offset,
+                          "registros": indice["registros"] + len(medicos)}
+        return indice
+
+    def _reparar(self, indice: Optional[Dict]):
+        """
+        Descarta qualquer conteúdo do journal além do último commit. Sem índice
+        utilizável (ausente, ilegível ou apontando além do fim do arquivo), o
+        commit é o último registro válido encontrado na varredura.
+        """
+        if not self.caminho.exists():
+            self.indice = dict(_INDICE_VAZIO)
+            return
+        tamanho = self.caminho.stat().st_size
+        if indice is None or indice["offset"] > tamanho:
+            indice = self._varrer()
+            logger.info(
+                f"Journal {self.caminho.name}: índice reconstruído "
+                f"(página {indice['pagina']}, {indice['registros']} registros)"
+            )
+            self.indice = indice
+            self._gravar_indice()
+        else:
+            self.indice = indice
+        if tamanho > self.indice["offset"]:
+            logger.warning(
+                f"Journal {self.caminho.name}: descartando {tamanho - self.indice['offset']} bytes não confirmados"
+            )
+            with open(self.caminho, "r+b") as f:
+                f.truncate(self.indice["offset"])
+
+    # ---------- API ----------
+    @property
+    def ultima_pagina(self) -> int:
+        """Última página confirmada (0 se o journal está vazio)."""
+        return self.indice["pagina"]
+
+    @property
+    def total_registros(self) -> int:
+        return self.indice["registros"]
+
+    def registrar_pagina(self, pagina: int, medicos: List[Dict]) -> bool:
+        """
+        Acrescenta a página ao journal e confirma (fsync + índice atômico).
+        Páginas até a última confirmada já estão no journal e são ignoradas
+        (retorna False), de modo que uma retomada que recua não duplica registros.
+        """
+        if pagina <= self.indice["pagina"]:
+            logger.info(f"Página {pagina} já confirmada no journal {self.caminho.name}; ignorada.")
+            return False
+        linha = json.dumps({"pagina": pagina, "medicos": medicos}, ensure_ascii=False) + "\n"
+        with open(self.caminho, "ab") as f:
+            f.write(linha.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            offset = f.tell()
+        self.indice = {
+            "pagina": pagina,
+            "offset": offset,
+            "registros": self.indice["registros"] + len(medicos),
+        }
+        self._gravar_indice()
+        return True
+
+    def paginas(self) -> Iterator[Tuple[int, List[Dict]]]:
+        """Percorre, em streaming, as páginas confirmadas (cada página uma única vez)."""
+        if not self.caminho.exists():
+            return
+        restante = self.indice["offset"]
+        vistas = set()
+        with open(self.caminho, "rb") as f:
+            for linha in f:
+                if restante <= 0:
+                    break
+                restante -= len(linha)
+                entrada = json.loads(linha)
+                if entrada["pagina"] in vistas:
+                    continue
+                vistas.add(entrada["pagina"])
+                yield entrada["pagina"], entrada["medicos"]
+
+    def exportar(self, destino) -> int:
+        """Grava todos os registros confirmados no destino (ver `src.escrita`), página a página. Retorna o nº de registros."""
+        total = 0
+        for _, medicos in self.paginas():
+            if medicos:
+                destino.gravar(medicos)
+                total += len(medicos)
+        destino.fechar()
+        return total
+
+    def limpar(self):
+        """Remove journal e índice (ex.: após a exportação final)."""
+        for caminho in (self.caminho, self.caminho_indice):
+            caminho.unlink(missing_ok=True)
+        self.indice = dict(_INDICE_VAZIO)
+
+    def arquivar(self) -> Optional[Path]:
+        """
+        Começa um journal novo sem apagar o anterior: journal e índice são
+        renomeados com um carimbo de data/hora. Retorna o journal arquivado
+        (None se não havia nada a arquivar).
+        """
+        if not self.caminho.exists():
+            self.limpar()
+            return None
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        arquivado = self.caminho.with_name(f"{self.caminho.stem}_{ts}.jsonl")
+        os.replace(self.caminho, arquivado)
+        self.caminho_indice.unlink(missing_ok=True)
+        _fsync_diretorio(self.caminho.parent)
+        self.indice = dict(_INDICE_VAZIO)
+        logger.info(f"Journal anterior preservado em {arquivado.name}")
+        return arquivado
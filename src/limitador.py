@@ -0,0 +1,121 @@
+"""
+Limitador global de requisições (token bucket) compartilhado entre processos.
+
+Cada scraper já espaça as próprias páginas (`controle_taxa`), mas com vários
+processos ao mesmo tempo nada limitava a taxa somada contra o portal. Aqui o
+balde de fichas fica num arquivo pequeno (fichas disponíveis + instante da
+última atualização), protegido por lock de arquivo (`fcntl` no Linux/macOS,
+`msvcrt` no Windows): todo processo reserva uma ficha antes de cada
+requisição de página e espera até ela estar disponível.
+
+A taxa é configurada uma vez, em páginas por minuto, pela variável de
+ambiente `CFM_TAXA_GLOBAL` (herdada pelos workers); o orquestrador a define
+com `--taxa-global`. Sem ela, não há limite global.
+"""
+
+import logging
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ENV_TAXA = "CFM_TAXA_GLOBAL"        # páginas por minuto, somando todos os processos
+ENV_ARQUIVO = "CFM_LIMITADOR_ARQUIVO"
+CAMINHO_PADRAO = Path(__file__).resolve().parent.parent / "data" / "limitador.bin"
+
+_ESTADO = struct.Struct("<dd")  # fichas disponíveis, instante (time.time) da última atualização
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _travar(f):
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:  # LK_LOCK desiste após ~10s de espera
+                continue
+
+    def _destravar(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _travar(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _destravar(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class LimitadorGlobal:
+    """
+    Token bucket no arquivo `caminho`: `taxa_por_minuto` fichas por minuto, até
+    `capacidade` acumuladas (rajada máxima após um período ocioso).
+    """
+
+    def __init__(self, taxa_por_minuto: float, capacidade: float = 1.0, caminho: Path = CAMINHO_PADRAO):
+        if taxa_por_minuto <= 0:
+            raise ValueError("taxa_por_minuto deve ser > 0")
+        self.taxa = taxa_por_minuto / 60.0  # fichas por segundo
+        self.capacidade = max(1.0, capacidade)
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.espera_total = 0.0  # segundos que este processo passou esperando fichas
+
+    def _reservar(self) -> float:
+        """
+        Reserva a próxima ficha (o saldo pode ficar negativo: as reservas formam
+        uma fila) e devolve quantos segundos esperar até ela estar disponível.
+        """
+        fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+b") as f:
+            _travar(f)
+            try:
+                dados = f.read(_ESTADO.size)
+                agora = time.time()
+                if len(dados) == _ESTADO.size:
+                    fichas, instante = _ESTADO.unpack(dados)
+                    fichas = min(self.capacidade, fichas + max(0.0, agora - instante) * self.taxa)
+                else:  # arquivo novo: começa com o balde cheio
+                    fichas = self.capacidade
+                fichas -= 1.0
+                f.seek(0)
+                f.write(_ESTADO.pack(fichas, agora))
+                f.flush()
+            finally:
+                _destravar(f)
+        return max(0.0, -fichas) / self.taxa
+
+    def adquirir(self, pagina: Optional[int] = None) -> float:
+        """Bloqueia até a ficha reservada estar disponível. Devolve o tempo esperado (segundos)."""
+        espera = self._reservar()
+        if espera:
+            self.espera_total += espera
+            logger.info("limitador | pid=%d | pagina=%s espera=%.2f", os.getpid(), pagina, espera)
+            time.sleep(espera)
+        return espera
+
+
+def limitador_padrao() -> Optional[LimitadorGlobal]:
+    """Limitador configurado pelo ambiente (`CFM_TAXA_GLOBAL`), ou None se não houver limite global."""
+    taxa = os.environ.get(ENV_TAXA)
+    if not taxa:
+        return None
+    return LimitadorGlobal(float(taxa), caminho=Path(os.environ.get(ENV_ARQUIVO) or CAMINHO_PADRAO))
+
+
+def configurar(taxa_por_minuto: Optional[float], caminho: Optional[Path] = None):
+    """Define o limite global para este processo e para os que ele iniciar (via ambiente)."""
+    if not taxa_por_minuto:
+        os.environ.pop(ENV_TAXA, None)
+        return
+    os.environ[ENV_TAXA] = str(taxa_por_minuto)
+    if caminho:
+        os.environ[ENV_ARQUIVO] = str(caminho)
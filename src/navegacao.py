@@ -0,0 +1,116 @@
+"""
+Navegação direta para uma página arbitrária dos resultados.
+
+Retomar na página N não deve custar N cliques com pausas. A estratégia
+principal usa a própria paginação do portal (plugin jQuery paginationjs em
+`#paginacao`): `pagination('go', N)` dispara uma única requisição
+`buscar_medicos` para a página N. Se o plugin não estiver disponível, cai
+para saltos pelo maior número de página visível na barra de paginação, sem
+pausas entre os saltos.
+
+Cada salto dispara uma requisição `buscar_medicos`; com um `limitador`
+(`src.limitador`), uma ficha do limite global é tirada imediatamente antes de
+cada um.
+"""
+
+import logging
+from typing import List, Optional
+
+from src.parser_cards import SELETOR_CARDS
+
+logger = logging.getLogger(__name__)
+
+JS_PAGINA_ATIVA = """
+    () => {
+        const ativa = document.querySelector('#paginacao .active, #paginacao .paginationjs-page.active');
+        return ativa ? parseInt(ativa.textContent.trim()) : null;
+    }
+"""
+
+JS_PAGINAS_VISIVEIS = """
+    () => Array.from(document.querySelectorAll('#paginacao a'))
+        .map(a => parseInt(a.textContent.trim()))
+        .filter(n => !isNaN(n))
+"""
+
+JS_IR_PARA_PAGINA = """
+    (n) => {
+        const $ = window.jQuery;
+        if ($ && $.fn && $.fn.pagination) {
+            const paginacao = $('#paginacao');
+            if (paginacao.length) {
+                paginacao.pagination('go', n);
+                return true;
+            }
+        }
+        return false;
+    }
+"""
+
+JS_AGUARDA_PAGINA = f"""
+    (n) => {{
+        const ativa = document.querySelector('#paginacao .active, #paginacao .paginationjs-page.active');
+        return ativa && parseInt(ativa.textContent.trim()) === n
+            && document.querySelectorAll('{SELETOR_CARDS}').length > 0;
+    }}
+"""
+
+
+def pagina_ativa(page) -> Optional[int]:
+    """Número da página marcada como ativa na paginação (ou None)."""
+    return page.evaluate(JS_PAGINA_ATIVA)
+
+
+def _aguarda_pagina(page, n: int, timeout: int) -> bool:
+    try:
+        page.wait_for_function(JS_AGUARDA_PAGINA, arg=n, timeout=timeout)
+        return True
+    except Exception as e:
+        logger.warning(f"Página {n} não ficou ativa a tempo: {e}")
+        return False
+
+
+def _ficha(limitador, pagina: int):
+    """Tira uma ficha do limite global (se houver) antes de uma navegação que chega ao servidor."""
+    if limitador is not None:
+        limitador.adquirir(pagina)
+
+
+def _saltar_pelos_links(page, n: int, timeout: int, limitador=None) -> bool:
+    """Fallback: clica sempre no maior número visível <= n até chegar em n."""
+    atual = pagina_ativa(page) or 1
+    while atual != n:
+        visiveis: List[int] = page.evaluate(JS_PAGINAS_VISIVEIS)
+        candidatos = [p for p in visiveis if atual < p <= n]
+        if not candidatos:
+            logger.error(f"Não há link para avançar da página {atual} em direção à {n}")
+            return False
+        destino = max(candidatos)
+        _ficha(limitador, destino)
+        page.locator(f'#paginacao a:text-is("{destino}")').first.click()
+        if not _aguarda_pagina(page, destino, timeout):
+            return False
+        atual = destino
+    return True
+
+
+def ir_para_pagina(page, n: int, timeout: int = 60_000, limitador=None) -> bool:
+    """
+    Leva a página de resultados já carregada até a página `n`.
+    Com `limitador`, cada requisição disparada pelo salto passa pelo limite global.
+    Retorna True se a página `n` ficou ativa com resultados.
+    """
+    if n <= 1 or pagina_ativa(page) == n:
+        return True
+
+    logger.info(f"Saltando diretamente para a página {n}...")
+    _ficha(limitador, n)  # se o plugin faltar a ficha sobra: o limite erra para o lado seguro
+    if page.evaluate(JS_IR_PARA_PAGINA, n):
+        if _aguarda_pagina(page, n, timeout):
+            logger.info(f"Página {n} carregada via paginação do portal.")
+            return True
+        logger.warning("Salto direto não confirmou; tentando saltos pelos links visíveis.")
+    else:
+        logger.warning("Plugin de paginação indisponível; usando saltos pelos links visíveis.")
+
+    return _saltar_pelos_links(page, n, timeout, limitador)
@@ -0,0 +1,174 @@
+"""
+Orquestrador multi-UF: executa vários `CFMScraper` em paralelo num pool de processos.
+
+Cada processo trabalha uma UF por vez, com seu próprio navegador (lançado uma única
+vez e compartilhado entre as UFs do processo via `BrowserPool`), arquivo de log
+(`data/logs/scraping_pw_<UF>.log`) e arquivo de progresso (`data/progresso/<UF>.json`).
+
+Uso:
+    python -m src.orquestrador --ufs SP MG RJ --workers 3
+    python -m src.orquestrador --todas --workers 4 --headless
+    python -m src.orquestrador --todas --sqlite          # também grava em data/medicos.sqlite
+    python -m src.orquestrador --ufs SP --formato parquet
+    python -m src.orquestrador --todas --workers 6 --taxa-global 30   # no máximo 30 páginas/min somadas
+"""
+
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from src import limitador
+from src.escrita import FORMATOS
+from src.playwright import CFMScraper, DATA_DIR, LOG_PATH, configurar_logging
+from src.pool_navegador import BrowserPool
+
+logger = logging.getLogger(__name__)
+
+PROGRESSO_PATH = DATA_DIR / "progresso"
+SQLITE_PATH = DATA_DIR / "medicos.sqlite"
+
+UFS = [
+    "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO",
+    "MA", "MG", "MS", "MT", "PA", "PB", "PE", "PI", "PR",
+    "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO",
+]
+
+
+# Pool de navegador do processo worker: lançado uma vez e reutilizado por todas as UFs dele.
+_pool: Optional[BrowserPool] = None
+
+
+def _pool_do_processo(headless: bool) -> BrowserPool:
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool(headless=headless, args=['--disable-blink-features=AutomationControlled'])
+        _pool.iniciar()
+        # Os workers do ProcessPoolExecutor saem via os._exit (sem atexit); os finalizadores
+        # do multiprocessing rodam antes disso, no encerramento do processo.
+        Finalize(_pool, _pool.fechar, exitpriority=10)
+    return _pool
+
+
+def _salvar_progresso(uf: str, estado: Dict) -> Path:
+    """
+    Grava o estado de progresso da UF em um JSON próprio (um arquivo por worker/UF).
+    Regravado a cada página: temporário + `os.replace`, para quem lê nunca ver um arquivo pela metade.
+    """
+    PROGRESSO_PATH.mkdir(parents=True, exist_ok=True)
+    caminho = PROGRESSO_PATH / f"{uf}.json"
+    estado = {**estado, "uf": uf, "atualizado_em": datetime.now().isoformat()}
+    tmp = caminho.with_suffix(".tmp")
+    tmp.write_text(json.dumps(estado, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, caminho)
+    return caminho
+
+
+def executar_uf(
+    uf: str,
+    headless: bool = True,
+    max_paginas: Optional[int] = None,
+    modo: str = "dom",
+    sqlite: Optional[Path] = None,
+    formato: str = "csv",
+) -> Dict:
+    """Ponto de entrada do worker: configura log próprio e roda o scraper para uma UF."""
+    configurar_logging(LOG_PATH / f"scraping_pw_{uf}.log")
+    _salvar_progresso(uf, {"status": "executando"})
+    try:
+        with CFMScraper(headless=headless, pool=_pool_do_processo(headless), modo=modo) as scraper:
+            resumo = scraper.run(
+                uf=uf, max_paginas=max_paginas, sqlite=sqlite, formato=formato,
+                progresso=lambda estado: _salvar_progresso(uf, {"status": "executando", **estado}),
+            )
+    except Exception as e:
+        logging.getLogger(__name__).critical(f"Erro fatal no scraper da UF {uf}: {e}", exc_info=True)
+        resumo = {"uf": uf, "erro": str(e)}
+        _salvar_progresso(uf, {"status": "falhou", **resumo})
+        return resumo
+    _salvar_progresso(uf, {"status": "concluido", **resumo})
+    return resumo
+
+
+def orquestrar(
+    ufs: Optional[Sequence[str]] = None,
+    workers: int = 4,
+    headless: bool = True,
+    max_paginas: Optional[int] = None,
+    modo: str = "dom",
+    sqlite: Optional[Path] = None,
+    formato: str = "csv",
+    taxa_global: Optional[float] = None,
+) -> List[Dict]:
+    """
+    Distribui as UFs (todas, por padrão) entre `workers` processos e devolve os resumos.
+    Com `sqlite`, todos os workers gravam no mesmo banco (WAL, upsert por crm/uf).
+    Com `taxa_global` (páginas/min), os workers dividem um único limite de requisições.
+    """
+    ufs = [uf.upper() for uf in (ufs or UFS)]
+    invalidas = sorted(set(ufs) - set(UFS))
+    if invalidas:
+        raise ValueError(f"UF(s) inválida(s): {', '.join(invalidas)}")
+
+    if taxa_global:
+        limitador.configurar(taxa_global)  # antes de criar o pool: os workers herdam o ambiente
+        logger.info(f"Limite global: {taxa_global:g} páginas/min somando todos os workers")
+    logger.info(f"Orquestrando {len(ufs)} UF(s) com {workers} worker(s): {', '.join(ufs)}")
+    resumos: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(executar_uf, uf, headless, max_paginas, modo, sqlite, formato): uf for uf in ufs}
+        for futuro in as_completed(futuros):
+            uf = futuros[futuro]
+            try:
+                resumo = futuro.result()
+            except Exception as e:
+                resumo = {"uf": uf, "erro": str(e)}
+            resumos.append(resumo)
+            if resumo.get("erro"):
+                logger.error(f"[{uf}] falhou: {resumo['erro']}")
+            else:
+                logger.info(f"[{uf}] concluída: {resumo.get('registros', 0)} registros")
+    return resumos
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Scraping do CFM em várias UFs em paralelo.")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--ufs", nargs="+", help="UFs a coletar (ex.: SP MG RJ)")
+    grupo.add_argument("--todas", action="store_true", help="Coleta as 27 UFs")
+    parser.add_argument("--workers", type=int, default=4, help="Número de processos simultâneos")
+    parser.add_argument("--headless", action="store_true", help="Executa o Chromium sem janela")
+    parser.add_argument("--max-paginas", type=int, default=None)
+    parser.add_argument("--modo", choices=["dom", "rede"], default="dom",
+                        help="Extração pelos cards (dom) ou pelo JSON de buscar_medicos (rede)")
+    parser.add_argument("--sqlite", nargs="?", const=str(SQLITE_PATH), default=None, metavar="CAMINHO",
+                        help=f"Também grava os registros num banco SQLite (padrão: {SQLITE_PATH})")
+    parser.add_argument("--formato", choices=FORMATOS, default="csv",
+                        help="Formato do arquivo por UF (parquet requer pyarrow)")
+    parser.add_argument("--taxa-global", type=float, default=None, metavar="PAGINAS_POR_MIN",
+                        help="Limite de páginas por minuto somando todos os workers")
+    args = parser.parse_args(argv)
+
+    configurar_logging(LOG_PATH / "orquestrador.log")
+    resumos = orquestrar(
+        ufs=None if args.todas else args.ufs,
+        workers=args.workers,
+        headless=args.headless,
+        max_paginas=args.max_paginas,
+        modo=args.modo,
+        sqlite=Path(args.sqlite) if args.sqlite else None,
+        formato=args.formato,
+        taxa_global=args.taxa_global,
+    )
+    total = sum(r.get("registros", 0) for r in resumos)
+    falhas = [r["uf"] for r in resumos if r.get("erro")]
+    logger.info(f"=== PROCESSO FINALIZADO: {total} registros; falhas: {falhas or 'nenhuma'} ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Parser único dos cards de resultado do portal do CFM.
+
+Todos os scrapers (`get_scraper`, `get_scraper_improved` e `CFMScraper`) leem o
+texto dos cards com uma única chamada `page.evaluate` (`ler_textos_cards`) e o
+convertem em registros aqui, com as mesmas regex pré-compiladas.
+
+O corpus em `src/fixtures/cards_golden.json` fixa a saída esperada do parser
+e é verificado por `tests/test_parser_cards.py` (`python -m pytest`). Para
+conferir e medir o desempenho à mão:
+    python -m src.parser_cards
+    python -m src.parser_cards --benchmark 2000
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional
+
+SELETOR_CARDS = 'div.busca-resultado > div[class^="resultado-item"]'
+SEPARADOR_CARDS = "\x1e"  # Separador de registros (ASCII RS), ausente no texto dos cards
+MENSAGEM_FIM = "Nenhum resultado a mostrar"
+
+CORPUS_PATH = Path(__file__).resolve().parent / "fixtures" / "cards_golden.json"
+
+# Uma única chamada ao navegador: devolve o texto de todos os cards num só payload.
+JS_TEXTOS_CARDS = f"""
+    () => Array.from(
+        document.querySelectorAll('{SELETOR_CARDS}'),
+        card => card.textContent
+    ).join('\\u001e')
+"""
+
+# Rótulos conhecidos dos cards: o valor de um campo termina no próximo rótulo
+# (cards cujo textContent vem numa linha só) ou no fim da linha.
+_ROTULO = (r"(?:CRM|Data de Inscrição|Primeira inscrição na UF|Inscrição|Situação|"
+           r"Especialidades/Áreas de Atuação|Endereço|Telefone|Instituição de Graduação|Ano de Formatura)\s*:")
+_VALOR = rf"(?![ \t]*{_ROTULO})[ \t]*([^\n]+?)(?=\s+{_ROTULO}|[ \t]*(?:\n|$))"
+
+# Regex pré-compiladas para os campos dos cards, na ordem das colunas de saída.
+PADROES_CARD = {
+    'nome': re.compile(r"^([^\n]+?)\s+CRM:", re.IGNORECASE),
+    'crm': re.compile(r"CRM:\s*([^\s]+)", re.IGNORECASE),
+    'data_inscricao': re.compile(r"Data de Inscrição:\s*(\d{2}/\d{2}/\d{4})", re.IGNORECASE),
+    'situacao': re.compile(r"Situação:\s*([^\s]+)", re.IGNORECASE),
+    # Campos de texto livre: vazios quando o próximo rótulo vem logo em seguida
+    'especialidade': re.compile(rf"Especialidades/Áreas de Atuação:{_VALOR}", re.IGNORECASE),
+    'instituicao_graduacao': re.compile(rf"Instituição de Graduação:{_VALOR}", re.IGNORECASE),
+    'ano_formatura': re.compile(r"Ano de Formatura:\s*(\d{4})", re.IGNORECASE),
+}
+CAMPOS = list(PADROES_CARD)
+
+
+def parse_cards_colunar(textos: Iterable[str]) -> Dict[str, List[Optional[str]]]:
+    """
+    Extrai os campos de um lote de cards, coluna a coluna (uma regex por vez
+    sobre todo o lote). Cards de fim ("Nenhum resultado a mostrar") são ignorados.
+    """
+    textos = [t for t in textos if t and MENSAGEM_FIM not in t]
+    colunas: Dict[str, List[Optional[str]]] = {}
+    for campo, padrao in PADROES_CARD.items():
+        busca = padrao.search
+        colunas[campo] = [
+            m.group(1).strip() if (m := busca(texto)) else None
+            for texto in textos
+        ]
+    return colunas
+
+
+def parse_cards(textos: Iterable[str]) -> List[Dict[str, Optional[str]]]:
+    """Converte os textos dos cards em registros, descartando os que não têm nome nem CRM."""
+    colunas = parse_cards_colunar(textos)
+    registros = [dict(zip(CAMPOS, linha)) for linha in zip(*colunas.values())]
+    return [r for r in registros if r['nome'] or r['crm']]
+
+
+def ler_textos_cards(page) -> List[str]:
+    """Lê o texto de todos os cards da página com um único round trip ao navegador."""
+    payload = page.evaluate(JS_TEXTOS_CARDS)
+    return payload.split(SEPARADOR_CARDS) if payload else []
+
+
+def extrair_medicos(page) -> List[Dict[str, Optional[str]]]:
+    """Atalho usado pelos scrapers: lê os cards da página e devolve os registros."""
+    return parse_cards(ler_textos_cards(page))
+
+
+# --- Corpus de referência ---
+
+def carregar_corpus(caminho: Path = CORPUS_PATH) -> List[Dict]:
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verificar_corpus(caminho: Path = CORPUS_PATH) -> List[str]:
+    """
+    Compara a saída do parser com o corpus de referência.
+    Cada caso tem `texto` e `esperado` (o registro, ou null se o card deve ser descartado).
+    Retorna a lista de divergências (vazia quando tudo confere).
+    """
+    divergencias = []
+    for i, caso in enumerate(carregar_corpus(caminho)):
+        obtido = parse_cards([caso["texto"]])
+        esperado = [caso["esperado"]] if caso["esperado"] is not None else []
+        if obtido != esperado:
+            divergencias.append(f"caso {i} ({caso.get('descricao', '')}): esperado {esperado}, obtido {obtido}")
+    return divergencias
+
+
+def medir_desempenho(repeticoes: int = 1000, caminho: Path = CORPUS_PATH) -> float:
+    """Mede o tempo médio (µs) por card do parser sobre o corpus repetido."""
+    textos = [caso["texto"] for caso in carregar_corpus(caminho)] * repeticoes
+    inicio = perf_counter()
+    parse_cards(textos)
+    return (perf_counter() - inicio) / len(textos) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica o parser de cards contra o corpus de referência.")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Repete o corpus N vezes e mede o parser")
+    args = parser.parse_args()
+
+    falhas = verificar_corpus()
+    for falha in falhas:
+        print(f"❌ {falha}")
+    print(f"Corpus: {len(carregar_corpus())} casos, {len(falhas)} divergência(s).")
+    if args.benchmark:
+        print(f"Parser: {medir_desempenho(args.benchmark):.2f} µs por card")
+    sys.exit(1 if falhas else 0)
@@ -1,26 +1,27 @@
 # scraper_refactored.py
 
-import re
+import sys
 import logging
 import random
 from pathlib import Path
-from time import sleep
+from time import sleep, perf_counter
 from datetime import datetime
-from typing import Dict, List, Optional
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Optional
 
-import pandas as pd
 from playwright.sync_api import Browser, BrowserContext, Page, Playwright, sync_playwright
 
+from src.captura_rede import CapturaBuscarMedicos, registros_da_pagina
+from src.controle_taxa import BLOQUEIO, OK, VAZIA, ControladorAIMD, ControladorTaxa, sinal_http
+from src.deteccao import STATUS_BLOQUEIO, ClassificadorPagina
+from src.escrita import DestinoSqlite, EscritorStreaming, destino_arquivo
+from src.navegacao import ir_para_pagina, pagina_ativa
+from src.parser_cards import CAMPOS, ler_textos_cards, parse_cards
+from src.politica_recursos import registrar_pagina
+from src.pool_navegador import BrowserPool
+
 # --- Configurações Globais e Logging ---
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-    handlers=[
-        logging.StreamHandler(), # Envia logs para o console
-        logging.FileHandler("scraping_pw.log", mode="w", encoding="utf-8") # E para um arquivo
-    ]
-)
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://portal.cfm.org.br/busca-medicos"
@@ -31,6 +32,24 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 CSV_PATH.mkdir(parents=True, exist_ok=True)
 
+
+def configurar_logging(log_file: Optional[Path] = None):
+    """
+    Configura o logging para o console e para um arquivo.
+    Feito sob demanda (e não no import) para que cada processo/UF tenha seu próprio arquivo.
+    """
+    log_file = log_file or LOG_PATH / "scraping_pw.log"
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(message)s",
+        handlers=[
+            logging.StreamHandler(), # Envia logs para o console
+            logging.FileHandler(log_file, mode="w", encoding="utf-8") # E para um arquivo
+        ],
+        force=True,
+    )
+
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:122.0) Gecko/20110101 Firefox/122.0",
@@ -56,14 +75,31 @@ class CFMScraper:
     Um scraper robusto e "humanizado" para o portal do CFM,
     encapsulado em uma classe para melhor organização e gerenciamento de estado.
     """
-    def __init__(self, playwright: Playwright, headless: bool = False):
+    def __init__(
+        self,
+        playwright: Optional[Playwright] = None,
+        headless: bool = False,
+        pool: Optional[BrowserPool] = None,
+        modo: str = "dom",
+        controle: Optional[ControladorTaxa] = None,
+    ):
+        if modo not in ("dom", "rede"):
+            raise ValueError(f"Modo de extração inválido: {modo}")
         self.playwright = playwright
         self.headless = headless
+        self.pool = pool  # Pool compartilhado: evita lançar um Chromium por execução
+        self.modo = modo  # "dom": texto dos cards; "rede": JSON interceptado de buscar_medicos
+        self.captura: Optional[CapturaBuscarMedicos] = None
+        self._recursos = ExitStack()
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
+        self.classificador: Optional[ClassificadorPagina] = None
         self.consecutive_blocks = 0  # Contador de bloqueios consecutivos
         self.last_successful_page = 0  # Última página com sucesso
+        # Intervalo entre páginas ajustado pelos sinais observados (latência, bloqueios, páginas vazias)
+        self.controle = controle or ControladorAIMD()
+        self.latencia_ultima: Optional[float] = None  # clique -> resultados da última navegação
 
     def __enter__(self):
         """Inicializa o navegador ao entrar no bloco 'with'."""
@@ -71,27 +107,37 @@ class CFMScraper:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Garante que o navegador seja fechado ao sair do bloco 'with'."""
-        if self.browser:
-            logger.info("Encerrando o navegador...")
-            self.browser.close()
+        """Devolve o contexto ao pool (e fecha o navegador, se foi lançado aqui)."""
+        self._recursos.close()
+        self.page = None
+        self.context = None
+        self.classificador = None
+        self.captura = None
 
     def _setup_browser(self) -> Browser:
-        """Configura e lança uma instância do navegador com técnicas anti-detecção."""
-        logger.info("Inicializando navegador Chromium...")
-        browser = self.playwright.chromium.launch(
-            headless=self.headless,
-            args=['--disable-blink-features=AutomationControlled']
-        )
-        self.context = browser.new_context(
+        """
+        Obtém um contexto isolado com técnicas anti-detecção. Usa o pool compartilhado
+        quando fornecido; caso contrário, lança um navegador próprio para esta execução.
+        """
+        pool = self.pool
+        if pool is None:
+            pool = self._recursos.enter_context(BrowserPool(
+                self.playwright,
+                headless=self.headless,
+                args=['--disable-blink-features=AutomationControlled'],
+            ))
+        self.context = self._recursos.enter_context(pool.contexto(
+            ANTI_BOT_SCRIPT,
             user_agent=random.choice(USER_AGENTS),
             viewport={'width': 1366, 'height': 768},
             locale='pt-BR',
             timezone_id='America/Sao_Paulo',
-        )
-        self.context.add_init_script(ANTI_BOT_SCRIPT)
+        ))
         self.page = self.context.new_page()
-        return browser
+        self.classificador = ClassificadorPagina(self.page, BASE_URL)
+        if self.modo == "rede":
+            self.captura = CapturaBuscarMedicos(self.page)
+        return pool.browser
 
     # --- Métodos de "Humanização" ---
 
@@ -109,42 +155,6 @@ class CFMScraper:
                 self.page.mouse.move(x, y)
                 sleep(random.uniform(0.1, 0.3))
 
-    def delay_inteligente(self, page_number: int, base_delay: float = 2.0):
-        """
-        Aplica um delay que aumenta conforme o número de páginas avança,
-        uma técnica crucial para evitar bloqueios em longas sessões de scraping.
-        """
-        multiplicador = 1.0
-        
-        # Sistema de delays mais agressivo próximo ao ponto de bloqueio
-        if page_number > 90:  # Próximo ao ponto onde para (97)
-            multiplicador = 4.0
-            logger.warning(f"Zona crítica (p{page_number}) - delay x4")
-        elif page_number > 70:
-            multiplicador = 3.0
-        elif page_number > 50:
-            multiplicador = 2.5
-        elif 10 < page_number <= 50:
-            multiplicador = 1.5
-
-        # Multiplicador adicional se houver bloqueios consecutivos
-        if self.consecutive_blocks > 0:
-            block_multiplier = 1 + (self.consecutive_blocks * 0.5)
-            multiplicador *= block_multiplier
-            logger.warning(f"Bloqueios detectados - delay adicional x{block_multiplier:.1f}")
-
-        # Pausa extra a cada 25 páginas para simular um descanso.
-        if page_number % 25 == 0 and page_number > 0:
-            logger.info(f"Pausa estratégica na página {page_number}. Aguardando mais tempo...")
-            multiplicador *= 2.5
-            
-        # Pausa especial nas páginas críticas
-        if page_number in [95, 96, 97, 98, 99, 100]:
-            multiplicador *= 3.0
-            logger.warning(f"Página crítica {page_number} - delay máximo")
-
-        self.delay_aleatorio(base_delay * multiplicador, base_delay * multiplicador * 1.5)
-
     # --- Lógica Principal do Scraping ---
 
     def performa_busca(self, uf: str):
@@ -168,6 +178,8 @@ class CFMScraper:
         search_button = self.page.locator('button.btn-buscar')
         search_button.hover()
         self.delay_aleatorio(0.5, 1.0)
+        if self.controle.limitador is not None:  # a busca inicial também conta no limite global
+            self.controle.limitador.adquirir(1)
         search_button.click()
 
         # Otimização: Em vez de um sleep fixo, esperamos pelo seletor de resultados.
@@ -182,47 +194,19 @@ class CFMScraper:
     def detectar_bloqueio_ou_fim(self) -> tuple[bool, str]:
         """
         Detecta se a página foi bloqueada ou se chegamos ao fim natural dos resultados.
-        Retorna (is_blocked, reason)
+        Retorna (is_blocked, reason). Usa o classificador compartilhado, que sonda o DOM
+        uma única vez por navegação e reaproveita o resultado nas chamadas seguintes.
         """
-        if not self.page:
+        if not self.page or not self.classificador:
             return True, "Página não inicializada"
-            
-        try:
-            # Verifica se existe a mensagem "Nenhum resultado a mostrar"
-            no_results_selector = self.page.locator('text="Nenhum resultado a mostrar"')
-            if no_results_selector.count() > 0:
-                logger.info("Detectada mensagem oficial: 'Nenhum resultado a mostrar'")
-                return False, "Fim natural dos resultados"
-            
-            # Verifica outros indicadores de bloqueio
-            page_content = self.page.content().lower()
-            block_indicators = [
-                'blocked', 'captcha', 'verificação', 'bot detected',
-                'rate limit', 'too many requests', 'acesso negado',
-                'forbidden', 'erro 403', 'erro 429', 'suspeita'
-            ]
-            
-            for indicator in block_indicators:
-                if indicator in page_content:
-                    logger.warning(f"Indicador de bloqueio detectado: '{indicator}'")
-                    return True, f"Bloqueio detectado: {indicator}"
-            
-            # Verifica se a página foi redirecionada
-            current_url = self.page.url
-            if BASE_URL not in current_url:
-                logger.warning(f"Redirecionamento detectado: {current_url}")
-                return True, f"Redirecionado para: {current_url}"
-                
-            return False, "Página normal"
-            
-        except Exception as e:
-            logger.error(f"Erro ao detectar bloqueio: {e}")
-            return True, f"Erro na detecção: {e}"
+        resultado = self.classificador.classificar()
+        return resultado.bloqueado, resultado.motivo
     
     def scraping_pagina_atual(self) -> List[Dict[str, Optional[str]]]:
         """
         Extrai todos os dados dos médicos da página visível usando regex,
-        inspirado no snippet JS para máxima robustez.
+        inspirado no snippet JS para máxima robustez. Os textos de todos os cards
+        vêm numa única chamada `page.evaluate` (um round trip por página).
         """
         if not self.page:
             return []
@@ -235,9 +219,11 @@ class CFMScraper:
             return []
 
         logger.info("Extraindo dados dos médicos na página...")
-        cards_locators = self.page.locator('div.busca-resultado > div[class^="resultado-item"]').all()
+        inicio = perf_counter()
+        textos = ler_textos_cards(self.page)
+        fim_evaluate = perf_counter()
         
-        if not cards_locators:
+        if not textos:
             # Verifica novamente se é fim natural ou problema
             is_blocked, reason = self.detectar_bloqueio_ou_fim()
             if not is_blocked and "Nenhum resultado a mostrar" in reason:
@@ -248,37 +234,13 @@ class CFMScraper:
                 self.consecutive_blocks += 1
                 return []
 
-        medicos_data = []
-        for card in cards_locators:
-            texto = card.text_content()
-            
-            # Verifica se o card contém "Nenhum resultado a mostrar"
-            if "Nenhum resultado a mostrar" in texto:
-                logger.info("Card contém mensagem de fim - ignorando")
-                continue
-                
-            medico = {}
-
-            # Função auxiliar para aplicar regex e extrair o primeiro grupo
-            def extract(pattern, text):
-                match = re.search(pattern, text, re.IGNORECASE)
-                return match.group(1).strip() if match else None
-
-            # Aplica as mesmas regex do seu snippet, traduzidas para Python
-            medico['nome'] = extract(r"^([^\n]+?)\s+CRM:", texto)
-            medico['crm'] = extract(r"CRM:\s*([^\s]+)", texto)
-            medico['data_inscricao'] = extract(r"Data de Inscrição:\s*(\d{2}/\d{2}/\d{4})", texto)
-            medico['situacao'] = extract(r"Situação:\s*([^\s]+)", texto)
-            # Regex crucial para especialidades, que captura tudo até a próxima linha de "Endereço" ou fim
-            medico['especialidade'] = extract(r"Especialidades/Áreas de Atuação:\s*([^\n]+?)(?=\s+Endereço|$)", texto)
-            medico['instituicao_graduacao'] = extract(r"Instituição de Graduação:\s*([^\n]+)", texto)
-            medico['ano_formatura'] = extract(r"Ano de Formatura:\s*(\d{4})", texto)
-            
-            # Só adiciona se pelo menos nome ou CRM foram extraídos
-            if medico['nome'] or medico['crm']:
-                medicos_data.append(medico)
-            
-        logger.info(f"Extraídos {len(medicos_data)} registros desta página.")
+        medicos_data = parse_cards(textos)
+        fim_parse = perf_counter()
+        logger.info(
+            f"Extraídos {len(medicos_data)} registros de {len(textos)} cards em "
+            f"{(fim_parse - inicio) * 1000:.1f} ms "
+            f"(evaluate {(fim_evaluate - inicio) * 1000:.1f} ms, parse {(fim_parse - fim_evaluate) * 1000:.1f} ms)."
+        )
         
         # Reset consecutive blocks se extraiu dados com sucesso
         if medicos_data:
@@ -345,6 +307,10 @@ class CFMScraper:
             self.simula_movimento_do_mouse()
             next_button.hover()
             self.delay_aleatorio(0.5, 1.2)
+            # Intervalo do controlador de taxa (e ficha do limite global) logo antes do clique,
+            # que é o que dispara a requisição de buscar_medicos
+            self.controle.aguardar(proxima_pagina)
+            inicio = perf_counter()
             next_button.click()
             
             # Espera inteligente pela atualização dos resultados
@@ -354,9 +320,11 @@ class CFMScraper:
                     state='attached',
                     timeout=60000
                 )
+                self.latencia_ultima = perf_counter() - inicio
                 
-                # Verifica se a navegação realmente funcionou
+                # Verifica se a navegação realmente funcionou (força nova sondagem da página)
                 self.delay_aleatorio(1, 2)
+                self.classificador.invalidar()
                 is_blocked_after, reason_after = self.detectar_bloqueio_ou_fim()
                 
                 if is_blocked_after:
@@ -383,17 +351,63 @@ class CFMScraper:
                 logger.warning(f"Botão não encontrado - possível bloqueio: {reason_no_btn}")
             return False
 
-    def run(self, uf: str, max_paginas: Optional[int] = None):
+    def run(self, uf: str, max_paginas: Optional[int] = None, pagina_inicial: int = 1,
+            sqlite: Optional[Path] = None, formato: str = "csv",
+            progresso: Optional[Callable[[Dict], None]] = None) -> Dict:
         """
         Orquestra o processo completo de scraping para uma determinada UF.
+        Com `pagina_inicial` > 1, salta direto para essa página antes de começar.
+        Com `sqlite`, cada página também é gravada (upsert por crm/uf) nesse banco.
+        `formato` ("csv" ou "parquet") define o arquivo de saída.
+        `progresso`, se fornecido, é chamado após cada página gravada com
+        `{"pagina", "registros", "arquivo"}` (ex.: o arquivo de progresso do orquestrador).
+        Retorna um resumo do progresso (páginas, registros e arquivo gerado).
         """
         if not self.page:
             raise ConnectionError("O scraper não foi inicializado corretamente.")
             
+        self.controle.nome = uf
         self.performa_busca(uf)
 
-        all_medicos = []
         page_num = 1
+        if pagina_inicial > 1:
+            if ir_para_pagina(self.page, pagina_inicial, limitador=self.controle.limitador):
+                page_num = pagina_inicial
+            else:
+                page_num = pagina_ativa(self.page) or 1
+                logger.error(f"Não foi possível saltar para a página {pagina_inicial}; iniciando da {page_num}.")
+
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        destino = destino_arquivo(CSV_PATH / f"medicos_{uf}_{ts}_refatorado", formato,
+                                  colunas=CAMPOS)
+        output_path = destino.caminho
+        destinos = [destino]
+        if sqlite:
+            destinos.append(DestinoSqlite(sqlite, uf=uf))
+
+        # O bloco `with` garante que páginas pendentes sejam gravadas mesmo em
+        # KeyboardInterrupt ou erro no meio da coleta.
+        with EscritorStreaming(destinos) as escritor:
+            page_num = self._coletar_paginas(uf, page_num, max_paginas, escritor, progresso, output_path)
+
+        if escritor.registros:
+            logger.info(f"Scraping finalizado. Total de {escritor.registros} médicos encontrados para {uf}.")
+            logger.info(f"Dados salvos com sucesso em: {output_path}")
+        else:
+            logger.warning(f"Nenhum médico foi salvo para a UF {uf}.")
+
+        return {
+            "uf": uf,
+            "paginas": page_num,
+            "ultima_pagina_ok": self.last_successful_page,
+            "registros": escritor.registros,
+            "arquivo": str(output_path) if escritor.registros else None,
+        }
+
+    def _coletar_paginas(self, uf: str, page_num: int, max_paginas: Optional[int],
+                         escritor: EscritorStreaming, progresso: Optional[Callable[[Dict], None]] = None,
+                         output_path: Optional[Path] = None) -> int:
+        """Percorre as páginas a partir de `page_num`, enviando cada uma ao escritor. Retorna a última página."""
         paginas_vazias_consecutivas = 0
 
         while True:
@@ -403,16 +417,14 @@ class CFMScraper:
 
             logger.info(f"--- Processando Página {page_num} para {uf} ---")
             
-            # Delay inteligente antes de processar
-            self.delay_inteligente(page_num)
-            
-            # Simula atividade humana antes de extrair dados
-            if page_num > 90:
-                logger.info("Zona crítica - comportamento extra cauteloso")
-                self.simula_movimento_do_mouse()
-                self.delay_aleatorio(2, 4)
-            
-            medicos_on_page = self.scraping_pagina_atual()
+            if self.captura is not None:
+                medicos_on_page, fim = registros_da_pagina(self.page, page_num, self.captura)
+                if fim:
+                    logger.info("Fim natural dos resultados (resposta de buscar_medicos vazia).")
+                    break
+            else:
+                medicos_on_page = self.scraping_pagina_atual()
+            registrar_pagina(self.context, page_num)
             
             if not medicos_on_page:
                 # Verifica se é fim natural ou bloqueio
@@ -423,6 +435,9 @@ class CFMScraper:
                     break
                 elif is_blocked:
                     logger.error(f"Bloqueio detectado: {reason}")
+                    status = self.classificador.ultimo_status
+                    self.controle.registrar(sinal_http(status) if status in STATUS_BLOQUEIO else BLOQUEIO,
+                                            pagina=page_num)
                     # Tenta recuperação antes de desistir
                     if self.tentar_recuperacao(page_num):
                         logger.info("Recuperação bem-sucedida, continuando...")
@@ -432,6 +447,7 @@ class CFMScraper:
                         break
                 else:
                     paginas_vazias_consecutivas += 1
+                    self.controle.registrar(VAZIA, pagina=page_num)
                     logger.warning(f"Página {page_num} vazia. (Tentativa {paginas_vazias_consecutivas}/3)")
                     if paginas_vazias_consecutivas >= 3:
                         logger.error("Três páginas vazias consecutivas. Verificando se é bloqueio...")
@@ -440,49 +456,32 @@ class CFMScraper:
                         break
             else:
                 paginas_vazias_consecutivas = 0
-                all_medicos.extend(medicos_on_page)
-                
-                # Salva progresso periodicamente
-                if page_num % 20 == 0:
-                    self._salvar_progresso_temporario(all_medicos, uf, page_num)
+                self.controle.registrar(OK, self.latencia_ultima, page_num)
+                # Persiste a página imediatamente (thread de escrita em segundo plano)
+                escritor.escrever(medicos_on_page)
+                if progresso is not None:
+                    progresso({"pagina": page_num, "registros": escritor.registros,
+                               "arquivo": str(output_path) if output_path else None})
 
             if not self.navega_para_proxima_pagina(page_num):
                 break
             
             page_num += 1
 
-        if all_medicos:
-            logger.info(f"Scraping finalizado. Total de {len(all_medicos)} médicos encontrados para {uf}.")
-            df = pd.DataFrame(all_medicos)
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = CSV_PATH / f"medicos_{uf}_{ts}_refatorado.csv"
-            df.to_csv(output_path, index=False, encoding="utf-8-sig")
-            logger.info(f"Dados salvos com sucesso em: {output_path}")
-        else:
-            logger.warning(f"Nenhum médico foi salvo para a UF {uf}.")
-    
-    def _salvar_progresso_temporario(self, medicos: List[Dict], uf: str, pagina: int):
-        """Salva progresso temporariamente para evitar perda de dados."""
-        try:
-            if medicos:
-                df = pd.DataFrame(medicos)
-                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                temp_path = CSV_PATH / f"temp_medicos_{uf}_p{pagina}_{ts}.csv"
-                df.to_csv(temp_path, index=False, encoding="utf-8-sig")
-                logger.info(f"Progresso salvo: {len(medicos)} registros até página {pagina}")
-        except Exception as e:
-            logger.error(f"Erro ao salvar progresso: {e}")
+        return page_num
 
 # --- Ponto de Entrada do Script ---
 
 if __name__ == "__main__":
-    UF_PARA_SCRAPEAR = "RR"  # Altere aqui para a UF desejada
+    # UF via linha de comando (padrão RR). Para várias UFs, use src/orquestrador.py
+    UF_PARA_SCRAPEAR = sys.argv[1].upper() if len(sys.argv) > 1 else "RR"
+    configurar_logging(LOG_PATH / f"scraping_pw_{UF_PARA_SCRAPEAR}.log")
     
     logger.info("=== SCRAPER CFM COM DETECÇÃO AVANÇADA DE BLOQUEIOS ===")
     logger.info("🛡️  Melhorias implementadas:")
     logger.info("  ✅ Detecção da mensagem 'Nenhum resultado a mostrar'")
     logger.info("  ✅ Sistema de recuperação de bloqueios")
-    logger.info("  ✅ Delays adaptativos próximo à página 97")
+    logger.info("  ✅ Intervalo entre páginas adaptativo (AIMD)")
     logger.info("  ✅ Salvamento de progresso automático")
     logger.info("  ✅ Filtragem de cards inválidos")
     logger.info("")
@@ -0,0 +1,120 @@
+"""
+Política de recursos: roteamento que aborta imagens, fontes, folhas de estilo
+e analytics de terceiros em todos os contextos criados pelos scrapers.
+
+Domínios de analytics são sempre abortados e domínios da allow-list sempre
+passam. A allow-list de tipos de recurso só vale para o próprio portal
+(`dominios_primarios`): requisições de terceiros fora da allow-list de
+domínios — inclusive scripts e XHR de trackers desconhecidos — são abortadas
+(um CDN de que o portal dependa precisa entrar em `dominios_permitidos`; as
+requisições abortadas aparecem no log em nível DEBUG). Para cada contexto são contadas as requisições abortadas e
+uma estimativa dos bytes economizados (o corpo de uma requisição abortada
+nunca é baixado, então o tamanho vem de uma média configurável por tipo).
+"""
+
+import logging
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def _dominio_casa(host: str, dominios: Tuple[str, ...]) -> bool:
+    return any(host == d or host.endswith("." + d) for d in dominios)
+
+
+@dataclass(frozen=True)
+class PoliticaRecursos:
+    tipos_permitidos: FrozenSet[str] = frozenset({
+        "document", "script", "xhr", "fetch", "websocket", "eventsource", "manifest", "other",
+    })
+    # Primeira parte: os tipos acima só são permitidos nestes domínios (e em URLs sem host: data:, blob:).
+    dominios_primarios: Tuple[str, ...] = ("cfm.org.br",)
+    # Sempre permitidos, qualquer que seja o tipo (reCAPTCHA precisa de imagens e CSS).
+    dominios_permitidos: Tuple[str, ...] = ("google.com", "gstatic.com", "recaptcha.net")
+    # Sempre abortados, qualquer que seja o tipo.
+    dominios_bloqueados: Tuple[str, ...] = (
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+        "facebook.net", "facebook.com", "hotjar.com", "clarity.ms", "googlesyndication.com",
+    )
+    # Tamanho médio (bytes) por tipo, usado para estimar a economia.
+    tamanho_estimado: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({
+        "image": 40_000, "font": 60_000, "stylesheet": 30_000, "media": 200_000,
+        "script": 50_000, "other": 5_000,
+    }))
+
+    def permite(self, url: str, tipo: str) -> bool:
+        host = urlsplit(url).hostname or ""
+        if _dominio_casa(host, self.dominios_bloqueados):
+            return False
+        if _dominio_casa(host, self.dominios_permitidos):
+            return True
+        if host and not _dominio_casa(host, self.dominios_primarios):
+            return False  # terceiro fora da allow-list: nem scripts/XHR passam
+        return tipo in self.tipos_permitidos
+
+    def instalar(self, context) -> "EstatisticasRecursos":
+        """Instala o roteamento no contexto e devolve o contador de economia associado a ele."""
+        estatisticas = EstatisticasRecursos()
+        _estatisticas[context] = estatisticas
+
+        def rotear(route):
+            request = route.request
+            tipo = request.resource_type
+            if self.permite(request.url, tipo):
+                estatisticas.permitidas += 1
+                route.continue_()
+            else:
+                logger.debug(f"Abortada: {tipo} {request.url}")
+                estatisticas.abortadas[tipo] += 1
+                estatisticas.bytes_economizados += self.tamanho_estimado.get(tipo, 0)
+                route.abort()
+
+        context.route("**/*", rotear)
+        return estatisticas
+
+
+@dataclass
+class EstatisticasRecursos:
+    permitidas: int = 0
+    abortadas: Counter = field(default_factory=Counter)
+    bytes_economizados: int = 0
+    total_abortadas: int = 0
+    total_bytes_economizados: int = 0
+
+    def fechar_pagina(self) -> Dict:
+        """Retorna os contadores desde a última página e os zera (acumulando os totais)."""
+        abortadas = sum(self.abortadas.values())
+        resumo = {
+            "permitidas": self.permitidas,
+            "abortadas": abortadas,
+            "por_tipo": dict(self.abortadas),
+            "bytes_economizados": self.bytes_economizados,
+        }
+        self.total_abortadas += abortadas
+        self.total_bytes_economizados += self.bytes_economizados
+        self.permitidas = 0
+        self.abortadas = Counter()
+        self.bytes_economizados = 0
+        return resumo
+
+
+_estatisticas: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def registrar_pagina(context, pagina: int) -> Optional[Dict]:
+    """Registra no log a economia da página `pagina` para o contexto (se tiver política instalada)."""
+    estatisticas = _estatisticas.get(context)
+    if estatisticas is None:
+        return None
+    resumo = estatisticas.fechar_pagina()
+    logger.info(
+        f"Recursos página {pagina}: {resumo['abortadas']} requisições abortadas "
+        f"(~{resumo['bytes_economizados'] / 1024:.0f} KB economizados), {resumo['permitidas']} permitidas; "
+        f"total ~{estatisticas.total_bytes_economizados / 1024 / 1024:.1f} MB"
+    )
+    return resumo
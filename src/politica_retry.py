@@ -0,0 +1,163 @@
+"""
+Política de novas tentativas do loop da API (`scrap_cfm_api_hibrido`).
+
+No lugar das pausas fixas (5-10s, ou 30-60s para alguns textos de erro) e do
+abandono da UF após 3 falhas seguidas:
+
+- backoff exponencial com jitter por página (a n-ésima falha da página
+  espera entre metade e o total de `base * fator**(n-1)`, até `maximo`);
+- `Retry-After` (segundos ou data HTTP) respeitado como espera mínima;
+- orçamento de tentativas por classe de erro (rede, limite, servidor,
+  resposta, bloqueio), contado por página;
+- disjuntor: muitas falhas seguidas, ou um orçamento esgotado, abrem o
+  circuito e a UF fica pausada por `pausa_circuito` (dobrando a cada abertura
+  seguida, até `pausa_maxima`) em vez de ser abandonada. Só após
+  `max_aberturas` aberturas seguidas sem nenhuma página OK a coleta desiste.
+
+`estatisticas()` resume as tentativas por página para o relatório da execução.
+"""
+
+import logging
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+
+from src.deteccao import STATUS_BLOQUEIO
+
+logger = logging.getLogger(__name__)
+
+# Classes de erro (cada uma com seu orçamento de tentativas por página)
+REDE = "rede"          # timeout, conexão recusada/derrubada
+LIMITE = "limite"      # HTTP 429/403
+SERVIDOR = "servidor"  # HTTP 5xx
+RESPOSTA = "resposta"  # outros status, JSON inválido, resposta inesperada
+BLOQUEIO = "bloqueio"  # captcha / "blocked" / "rate limit" no corpo ou na mensagem
+
+TERMOS_BLOQUEIO = ("blocked", "captcha", "rate limit", "too many requests")
+
+
+def classificar_erro(erro: Exception) -> str:
+    """Classe de erro de uma exceção do loop da API."""
+    resposta = getattr(erro, "response", None)
+    status = getattr(resposta, "status_code", None)
+    if status in STATUS_BLOQUEIO:
+        return LIMITE
+    if status is not None and status >= 500:
+        return SERVIDOR
+    if isinstance(erro, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return REDE
+    if any(termo in str(erro).lower() for termo in TERMOS_BLOQUEIO):
+        return BLOQUEIO
+    return RESPOSTA
+
+
+def retry_after(resposta, agora: Optional[datetime] = None) -> Optional[float]:
+    """
+    Segundos pedidos pelo header `Retry-After` da resposta (None se ausente ou
+    inválido). Uma data HTTP é comparada com `agora` (padrão: o relógio, em UTC).
+    """
+    valor = getattr(resposta, "headers", {}).get("Retry-After") if resposta is not None else None
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return max(0.0, (data - (agora or datetime.now(timezone.utc))).total_seconds())
+
+
+@dataclass
+class PoliticaRetry:
+    base: float = 2.0
+    fator: float = 2.0
+    maximo: float = 300.0
+    # tentativas extras permitidas por página, por classe de erro
+    orcamentos: Dict[str, int] = field(default_factory=lambda: {
+        REDE: 6, LIMITE: 8, SERVIDOR: 6, RESPOSTA: 3, BLOQUEIO: 4,
+    })
+    falhas_para_abrir: int = 10  # falhas seguidas, somando as classes, que abrem o circuito
+    pausa_circuito: float = 300.0
+    pausa_maxima: float = 3600.0
+    max_aberturas: Optional[int] = 8  # aberturas seguidas sem página OK antes de desistir (None: nunca)
+
+    # estado
+    tentativas_por_pagina: Dict[int, int] = field(default_factory=dict, init=False)
+    falhas_por_classe: Counter = field(default_factory=Counter, init=False)
+    aberturas: int = field(default=0, init=False)
+    espera_total: float = field(default=0.0, init=False)
+    _falhas_pagina: Counter = field(default_factory=Counter, init=False)
+    _falhas_seguidas: int = field(default=0, init=False)
+    _aberturas_seguidas: int = field(default=0, init=False)
+
+    def _backoff(self, n: int) -> float:
+        teto = min(self.maximo, self.base * self.fator ** (n - 1))
+        return random.uniform(teto / 2, teto)
+
+    def _abrir_circuito(self, pagina: int, motivo: str, espera_minima: Optional[float]) -> Optional[float]:
+        self.aberturas += 1
+        self._aberturas_seguidas += 1
+        self._falhas_seguidas = 0
+        self._falhas_pagina.clear()
+        if self.max_aberturas is not None and self._aberturas_seguidas > self.max_aberturas:
+            logger.error(f"Circuito aberto {self._aberturas_seguidas} vezes seguidas sem sucesso "
+                         f"(página {pagina}, {motivo}). Encerrando a UF.")
+            return None
+        pausa = min(self.pausa_maxima, max(self.pausa_circuito * 2 ** (self._aberturas_seguidas - 1),
+                                           espera_minima or 0.0))
+        logger.warning(f"Circuito aberto na página {pagina} ({motivo}): UF pausada por {pausa:.0f}s "
+                       f"(abertura {self._aberturas_seguidas})")
+        return pausa
+
+    def falha(self, pagina: int, classe: str, espera_minima: Optional[float] = None) -> Optional[float]:
+        """
+        Registra uma falha na `pagina` e devolve quantos segundos esperar antes
+        de tentar de novo, ou None se a coleta deve desistir.
+        """
+        self.tentativas_por_pagina[pagina] = self.tentativas_por_pagina.get(pagina, 0) + 1
+        self.falhas_por_classe[classe] += 1
+        self._falhas_pagina[classe] += 1
+        self._falhas_seguidas += 1
+
+        n = self._falhas_pagina[classe]
+        if n > self.orcamentos.get(classe, 0):
+            espera = self._abrir_circuito(pagina, f"orçamento de '{classe}' esgotado", espera_minima)
+        elif self._falhas_seguidas >= self.falhas_para_abrir:
+            espera = self._abrir_circuito(pagina, f"{self._falhas_seguidas} falhas seguidas", espera_minima)
+        else:
+            espera = self._backoff(sum(self._falhas_pagina.values()))
+            if espera_minima is not None:
+                espera = max(espera, min(espera_minima, self.pausa_maxima))
+            logger.info(f"Página {pagina}: falha '{classe}' {n}/{self.orcamentos.get(classe, 0)}; "
+                        f"nova tentativa em {espera:.1f}s"
+                        + (f" (Retry-After {espera_minima:.0f}s)" if espera_minima is not None else ""))
+        if espera is not None:
+            self.espera_total += espera
+        return espera
+
+    def sucesso(self, pagina: int):
+        """Página obtida: zera as falhas seguidas, fecha o circuito e reinicia os orçamentos."""
+        if self._aberturas_seguidas:
+            logger.info(f"Circuito fechado na página {pagina}")
+        self._falhas_seguidas = 0
+        self._aberturas_seguidas = 0
+        self._falhas_pagina.clear()
+
+    def estatisticas(self) -> Dict:
+        return {
+            "tentativas_extras": sum(self.tentativas_por_pagina.values()),
+            "paginas_com_retry": len(self.tentativas_por_pagina),
+            "tentativas_por_pagina": dict(sorted(self.tentativas_por_pagina.items())),
+            "falhas_por_classe": dict(self.falhas_por_classe),
+            "aberturas_circuito": self.aberturas,
+            "espera_total_s": round(self.espera_total, 1),
+        }
@@ -0,0 +1,217 @@
+"""
+Pool de navegador compartilhado.
+
+Lança o Chromium uma única vez e empresta `BrowserContext`s isolados aos jobs.
+Contextos devolvidos são limpos (abas, cookies, permissões, localStorage e
+sessionStorage) e reaproveitados por jobs seguintes com as mesmas opções
+estáveis, já com o script de inicialização instalado; após `max_usos`
+empréstimos (ou acima de `max_ociosos` contextos parados) o contexto é
+descartado e recriado.
+
+As opções sorteadas a cada job (`OPCOES_POR_PAGINA`: user agent, viewport e
+headers extras) não entram na chave de reuso: são aplicadas a cada página
+aberta no contexto durante o empréstimo.
+
+A API síncrona do Playwright não é thread-safe: use um pool por processo/thread.
+"""
+
+import json
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from playwright.sync_api import Browser, BrowserContext, Playwright, sync_playwright
+
+from src.politica_recursos import PoliticaRecursos
+
+logger = logging.getLogger(__name__)
+
+# Opções de `new_context` aplicadas por página (variam entre jobs e não impedem o reuso do contexto).
+OPCOES_POR_PAGINA = ("user_agent", "viewport", "extra_http_headers")
+
+JS_USER_AGENT = "Object.defineProperty(navigator, 'userAgent', { get: () => %s });"
+
+JS_LIMPAR_STORAGE = """
+    () => {
+        try { window.localStorage.clear(); } catch (e) {}
+        try { window.sessionStorage.clear(); } catch (e) {}
+    }
+"""
+
+
+def _aplicar_opcoes(page, opcoes: Dict):
+    """Aplica à página as opções por página do empréstimo (UA também no `navigator`)."""
+    headers = dict(opcoes.get("extra_http_headers") or {})
+    user_agent = opcoes.get("user_agent")
+    if user_agent:
+        headers["User-Agent"] = user_agent
+        page.add_init_script(JS_USER_AGENT % json.dumps(user_agent))
+    if headers:
+        page.set_extra_http_headers(headers)
+    if opcoes.get("viewport"):
+        page.set_viewport_size(opcoes["viewport"])
+
+# Argumentos de lançamento usados pelos scrapers para reduzir sinais de automação.
+CHROMIUM_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-extensions-file-access-check',
+    '--disable-extensions',
+    '--disable-plugins-discovery',
+    '--disable-default-apps',
+]
+
+
+class BrowserPool:
+    """Um processo Chromium compartilhado que empresta contextos isolados e reutilizáveis."""
+
+    def __init__(
+        self,
+        playwright: Optional[Playwright] = None,
+        headless: bool = False,
+        args: Optional[List[str]] = None,
+        max_usos: int = 20,
+        max_ociosos: int = 4,
+        politica: Optional[PoliticaRecursos] = None,
+        bloquear_recursos: bool = True,
+    ):
+        self._playwright = playwright
+        self._playwright_proprio = None
+        self.headless = headless
+        self.args = list(args) if args is not None else list(CHROMIUM_ARGS)
+        self.max_usos = max_usos
+        self.max_ociosos = max_ociosos
+        # bloquear_recursos=False desativa o roteamento; sem `politica`, usa a padrão
+        self.politica = (politica or PoliticaRecursos()) if bloquear_recursos else None
+        self.browser: Optional[Browser] = None
+        # chave das opções -> contextos ociosos (já com init script instalado)
+        self._ociosos: Dict[str, List[BrowserContext]] = {}
+        self._usos: Dict[int, int] = {}
+
+    def __enter__(self) -> "BrowserPool":
+        self.iniciar()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.fechar()
+
+    def iniciar(self) -> Browser:
+        """Lança o Chromium (apenas na primeira chamada)."""
+        if self.browser is None:
+            if self._playwright is None:
+                self._playwright_proprio = sync_playwright().start()
+                self._playwright = self._playwright_proprio
+            logger.info("Inicializando navegador Chromium compartilhado...")
+            self.browser = self._playwright.chromium.launch(headless=self.headless, args=self.args)
+        return self.browser
+
+    def fechar(self):
+        """Fecha todos os contextos, o navegador e o Playwright (se foi iniciado aqui)."""
+        for contextos in self._ociosos.values():
+            for context in contextos:
+                self._descartar(context)
+        self._ociosos.clear()
+        if self.browser is not None:
+            logger.info("Encerrando o navegador compartilhado...")
+            self.browser.close()
+            self.browser = None
+        if self._playwright_proprio is not None:
+            self._playwright_proprio.stop()
+            self._playwright_proprio = None
+            self._playwright = None
+
+    @staticmethod
+    def _chave(init_script: Optional[str], context_kwargs: Dict) -> str:
+        return json.dumps({"init": init_script, "opcoes": context_kwargs}, sort_keys=True, default=str)
+
+    def _descartar(self, context: BrowserContext):
+        self._usos.pop(id(context), None)
+        try:
+            context.close()
+        except Exception as e:
+            logger.debug(f"Erro ao fechar contexto: {e}")
+
+    @staticmethod
+    def _limpar_storage(context: BrowserContext) -> bool:
+        """
+        Esvazia localStorage/sessionStorage nas abas abertas e confere, pelo
+        `storage_state`, que nenhuma origem ficou com dados. False se sobrou algo.
+        """
+        for page in context.pages:
+            for frame in page.frames:
+                try:
+                    frame.evaluate(JS_LIMPAR_STORAGE)
+                except Exception as e:
+                    logger.debug(f"Falha ao limpar storage de {frame.url}: {e}")
+        return not any(origem.get("localStorage") for origem in context.storage_state().get("origins", []))
+
+    def _reciclar(self, chave: str, context: BrowserContext):
+        """Limpa o estado do contexto e o devolve ao pool (ou descarta se gasto ou não limpável)."""
+        total_ociosos = sum(len(c) for c in self._ociosos.values())
+        if self._usos.get(id(context), 0) >= self.max_usos or total_ociosos >= self.max_ociosos:
+            self._descartar(context)
+            return
+        try:
+            # localStorage de origens sem aba aberta não tem como ser limpo: nesse caso, recria
+            limpo = self._limpar_storage(context)
+            for page in list(context.pages):
+                page.close()
+            context.clear_cookies()
+            context.clear_permissions()
+            context.unroute_all()
+        except Exception as e:
+            logger.warning(f"Falha ao reciclar contexto, descartando: {e}")
+            self._descartar(context)
+            return
+        if not limpo:
+            logger.debug("localStorage residual no contexto devolvido; descartando.")
+            self._descartar(context)
+            return
+        self._ociosos.setdefault(chave, []).append(context)
+
+    @contextmanager
+    def contexto(self, init_script: Optional[str] = None, **context_kwargs) -> Iterator[BrowserContext]:
+        """
+        Empresta um `BrowserContext` com as opções dadas (`browser.new_context(**kwargs)`)
+        e o `init_script` já instalado, além da política de recursos do pool.
+        As opções em `OPCOES_POR_PAGINA` são aplicadas a cada página aberta no
+        empréstimo; só as demais identificam o contexto para reuso.
+        Ao fim do bloco o contexto é reciclado.
+        """
+        browser = self.iniciar()
+        por_pagina = {k: context_kwargs.pop(k) for k in OPCOES_POR_PAGINA if k in context_kwargs}
+        chave = self._chave(init_script, context_kwargs)
+        ociosos = self._ociosos.get(chave)
+        if ociosos:
+            context = ociosos.pop()
+        else:
+            context = browser.new_context(**context_kwargs)
+            if init_script:
+                context.add_init_script(init_script)
+        # A reciclagem remove as rotas do job anterior; a política é (re)instalada a cada empréstimo.
+        if self.politica is not None:
+            self.politica.instalar(context)
+
+        def ao_abrir_pagina(page):
+            _aplicar_opcoes(page, por_pagina)
+
+        if por_pagina:
+            context.on("page", ao_abrir_pagina)
+        self._usos[id(context)] = self._usos.get(id(context), 0) + 1
+        try:
+            yield context
+        finally:
+            if por_pagina:
+                context.remove_listener("page", ao_abrir_pagina)
+            self._reciclar(chave, context)
+
+
+@contextmanager
+def abrir_pool(pool: Optional[BrowserPool] = None, **pool_kwargs) -> Iterator[BrowserPool]:
+    """Usa o pool recebido (sem fechá-lo) ou cria um temporário para uma execução avulsa."""
+    if pool is not None:
+        yield pool
+        return
+    with BrowserPool(**pool_kwargs) as novo:
+        yield novo
@@ -0,0 +1,96 @@
+import pytest
+
+from src import controle_taxa
+from src.controle_taxa import (BLOQUEIO, ERRO, LIMITE, OK, VAZIA, ControladorAIMD, ControladorFixo,
+                               ControladorTaxa, sinal_http)
+from src.limitador import ENV_TAXA
+
+
+@pytest.fixture(autouse=True)
+def sem_limite_global(monkeypatch):
+    monkeypatch.delenv(ENV_TAXA, raising=False)
+
+
+def _aimd(**opcoes):
+    return ControladorAIMD(**{"atraso_inicial": 2.0, "jitter": 0.0, **opcoes})
+
+
+@pytest.mark.parametrize("status, sinal", [
+    (429, LIMITE), (403, LIMITE), (503, LIMITE), (500, ERRO), (502, ERRO), (404, ERRO), (None, ERRO),
+])
+def test_sinal_http(status, sinal):
+    assert sinal_http(status) == sinal
+
+
+def test_ok_reduz_o_intervalo_aditivamente():
+    controle = _aimd(decremento=0.1)
+    for _ in range(5):
+        controle.registrar(OK)
+    assert controle.atraso_atual == pytest.approx(1.5)
+
+
+@pytest.mark.parametrize("sinal, fator", [(BLOQUEIO, 2.0), (LIMITE, 2.0), (ERRO, 1.5), (VAZIA, 1.5)])
+def test_pressao_multiplica_o_intervalo(sinal, fator):
+    controle = _aimd()
+    controle.registrar(sinal)
+    assert controle.atraso_atual == pytest.approx(2.0 * fator)
+
+
+def test_limites_minimo_e_maximo():
+    controle = _aimd(minimo=0.5, maximo=10.0)
+    for _ in range(100):
+        controle.registrar(OK)
+    assert controle.atraso_atual == 0.5
+    for _ in range(10):
+        controle.registrar(LIMITE)
+    assert controle.atraso_atual == 10.0
+
+
+def test_resposta_lenta_conta_como_pressao_leve():
+    controle = _aimd(decremento=0.1, fator_lenta=1.25, limiar_latencia=2.0, suavizacao=0.2)
+    controle.registrar(OK, latencia=1.0)  # primeira medida: só inicia a média
+    assert controle.atraso_atual == pytest.approx(1.9)
+    controle.registrar(OK, latencia=1.5)  # abaixo de 2x a média
+    assert controle.atraso_atual == pytest.approx(1.8)
+    controle.registrar(OK, latencia=5.0)  # acima de 2x a média (1.1)
+    assert controle.atraso_atual == pytest.approx(1.8 * 1.25)
+
+
+def test_sinal_desconhecido():
+    with pytest.raises(ValueError):
+        _aimd().registrar("timeout")
+
+
+def test_fixo_nao_reage():
+    controle = ControladorFixo(atraso_inicial=3.0, jitter=0.0)
+    for sinal in (OK, LIMITE, ERRO):
+        controle.registrar(sinal)
+    assert controle.atraso_atual == 3.0
+
+
+def test_base_abstrata():
+    with pytest.raises(TypeError):
+        ControladorTaxa()
+
+
+def test_jitter_fica_na_faixa(monkeypatch):
+    controle = _aimd(jitter=0.25)
+    monkeypatch.setattr(controle_taxa.random, "uniform", lambda a, b: a)
+    assert controle.atraso() == pytest.approx(1.5)
+    monkeypatch.setattr(controle_taxa.random, "uniform", lambda a, b: b)
+    assert controle.atraso() == pytest.approx(2.5)
+
+
+def test_aguardar_dorme_o_intervalo_e_tira_ficha(monkeypatch):
+    dormidas, fichas = [], []
+
+    class Limitador:
+        def adquirir(self, pagina=None):
+            fichas.append(pagina)
+            return 0.75
+
+    monkeypatch.setattr(controle_taxa, "sleep", dormidas.append)
+    controle = _aimd(limitador=Limitador())
+    assert controle.aguardar(7) == pytest.approx(2.75)
+    assert dormidas == [pytest.approx(2.0)]
+    assert fichas == [7]
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from src.escrita import DestinoSqlite
+
+
+def _linhas(caminho, colunas="crm, uf, nome"):
+    with sqlite3.connect(caminho) as conn:
+        return conn.execute(f"SELECT {colunas} FROM medicos ORDER BY uf, crm").fetchall()
+
+
+@pytest.mark.parametrize("crm, uf, esperado", [
+    ("2702/AC", None, ("2702", "AC")),
+    ("2702-AC", None, ("2702", "AC")),
+    (" 2702 ", "ac", ("2702", "AC")),
+    ("CRM-AC 2702", None, ("2702", "AC")),
+    ("02702", "AC", ("2702", "AC")),
+    ("2702-AC", "SP", ("2702", "SP")),  # a UF informada prevalece sobre o sufixo
+    ("2702", None, None),
+])
+def test_chave(crm, uf, esperado):
+    assert DestinoSqlite.chave(crm, uf) == esperado
+
+
+def test_mesmo_medico_em_formatos_diferentes_vira_uma_linha(tmp_path):
+    banco = DestinoSqlite(tmp_path / "medicos.db")
+    banco.gravar([{"nome": "ANA", "crm": "2702/AC"}])
+    banco.gravar([{"nome": "ANA SILVA", "crm": "2702-AC"}])
+    banco.gravar([{"nome": "ANA S.", "crm": " 2702 ", "uf": "AC"}])
+    banco.gravar([{"NM_MEDICO": "ANA", "NU_CRM": "2702", "SG_UF": "AC"}])
+    banco.gravar([{"nome": "OUTRA", "crm": "2702-SP"}])
+    banco.fechar()
+    assert _linhas(tmp_path / "medicos.db") == [("2702", "AC", "ANA S."), ("2702", "SP", "OUTRA")]
+
+
+def test_uf_do_destino_prevalece_sobre_a_do_registro(tmp_path):
+    banco = DestinoSqlite(tmp_path / "medicos.db", uf="AC")
+    banco.gravar([{"nome": "ANA", "crm": "2702-SP"}, {"nome": "ANA", "crm": "2702", "uf": "RR"}])
+    banco.fechar()
+    assert _linhas(tmp_path / "medicos.db") == [("2702", "AC", "ANA")]
+
+
+def test_registros_sem_crm_ou_uf_sao_ignorados(tmp_path):
+    banco = DestinoSqlite(tmp_path / "medicos.db")
+    banco.gravar([{"nome": "SEM CRM"}, {"nome": "SEM UF", "crm": "10"}, {"nome": "OK", "crm": "10-RR"}])
+    banco.fechar()
+    assert _linhas(tmp_path / "medicos.db") == [("10", "RR", "OK")]
+
+
+def test_coluna_nova_e_criada(tmp_path):
+    banco = DestinoSqlite(tmp_path / "medicos.db")
+    banco.gravar([{"nome": "ANA", "crm": "2702-AC"}])
+    banco.gravar([{"nome": "ANA", "crm": "2702-AC", "telefone": "(68) 1111-1111"}])
+    banco.fechar()
+    assert _linhas(tmp_path / "medicos.db", "crm, uf, nome, telefone") == [("2702", "AC", "ANA", "(68) 1111-1111")]
+
+
+def test_coluna_criada_por_outro_processo(tmp_path):
+    caminho = tmp_path / "medicos.db"
+    a, b = DestinoSqlite(caminho), DestinoSqlite(caminho)
+    a.gravar([{"nome": "ANA", "crm": "2702-AC"}])  # `a` já leu o esquema
+    b.gravar([{"nome": "BIA", "crm": "15-SP", "telefone": "1"}])  # `b` cria a coluna
+    a.gravar([{"nome": "ANA", "crm": "2702-AC", "telefone": "2"}])  # ADD COLUMN duplicado é tolerado
+    a.fechar()
+    b.fechar()
+    assert _linhas(caminho, "crm, uf, telefone") == [("2702", "AC", "2"), ("15", "SP", "1")]
@@ -0,0 +1,64 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from notebooks.indice_crm import ConstrutorIndiceCrm, IndiceCrm, caminho_indice, construir
+
+MEDICOS = pd.DataFrame({
+    "nome": ["ANA", "BRUNO", "CARLA", "DANIEL", "EVA"],
+    "crm": ["2702/AC", "15-SP", "2710", "900", "123456"],
+    "uf": ["AC", "SP", "AC", "AC", "SP"],
+    "data_inscricao": ["01/02/2003", None, "15/06/2010", "31/12/1999", "05/05/2005"],
+})
+
+
+def _salva_csv(pasta):
+    origem = pasta / "medicos.csv"
+    MEDICOS.to_csv(origem, index=False, encoding="utf-8-sig")
+    return origem
+
+
+def _salva_parquet(pasta):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    df = MEDICOS.assign(data_inscricao=pd.to_datetime(MEDICOS["data_inscricao"], format="%d/%m/%Y"))
+    esquema = pa.schema([("nome", pa.string()), ("crm", pa.string()),
+                         ("uf", pa.dictionary(pa.int32(), pa.string())), ("data_inscricao", pa.date32())])
+    origem = pasta / "medicos.parquet"
+    pq.write_table(pa.Table.from_pandas(df.astype({"uf": "category"}), schema=esquema, preserve_index=False), origem)
+    return origem
+
+
+@pytest.mark.parametrize("salva", [_salva_csv, _salva_parquet], ids=["csv", "parquet"])
+def test_construir_e_consultar(tmp_path, salva):
+    origem = salva(tmp_path)
+    caminho = construir(origem, chunk_rows=2)  # vários blocos
+    assert caminho == caminho_indice(origem)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([origem.name, caminho.name])
+
+    with IndiceCrm(caminho) as indice:
+        assert len(indice) == 5
+        [ana] = indice.busca("ac", 2702)
+        assert ana["nome"] == "ANA"
+        if origem.suffix == ".parquet":
+            assert ana["data_inscricao"] == datetime.date(2003, 2, 1).isoformat()
+        else:
+            assert ana["data_inscricao"] == "01/02/2003"
+        assert indice.busca("SP", 2702) == []
+        assert [m["nome"] for m in indice.faixa("AC", 900, 2710)] == ["DANIEL", "ANA", "CARLA"]
+        assert [m["nome"] for m in indice.faixa("SP")] == ["BRUNO", "EVA"]
+        with pytest.raises(ValueError):
+            indice.busca("S2", 15)
+
+
+def test_falha_na_construcao_remove_temporarios(tmp_path, monkeypatch):
+    origem = _salva_csv(tmp_path)
+
+    def falha(self, df):
+        raise RuntimeError("falha simulada")
+
+    monkeypatch.setattr(ConstrutorIndiceCrm, "adiciona", falha)
+    with pytest.raises(RuntimeError):
+        construir(origem)
+    assert [p.name for p in tmp_path.iterdir()] == [origem.name]
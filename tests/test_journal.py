@@ -0,0 +1,118 @@
+import json
+
+from src.journal import JournalCheckpoint
+
+
+def _medicos(pagina, n=2):
+    return [{"nome": f"MEDICO {pagina}.{i}", "crm": f"{pagina}{i}-RR"} for i in range(n)]
+
+
+def _journal_com_paginas(diretorio, paginas=(1, 2, 3)):
+    journal = JournalCheckpoint("RR", diretorio)
+    for pagina in paginas:
+        assert journal.registrar_pagina(pagina, _medicos(pagina))
+    return journal
+
+
+def test_retomada_le_so_o_indice(tmp_path):
+    _journal_com_paginas(tmp_path)
+    journal = JournalCheckpoint("RR", tmp_path)
+    assert (journal.ultima_pagina, journal.total_registros) == (3, 6)
+    assert [p for p, _ in journal.paginas()] == [1, 2, 3]
+
+
+def test_registro_parcial_no_fim_e_truncado(tmp_path):
+    journal = _journal_com_paginas(tmp_path)
+    tamanho = journal.caminho.stat().st_size
+    with open(journal.caminho, "ab") as f:  # queda no meio do append da página 4
+        f.write(b'{"pagina": 4, "medicos": [{"nome": "MEDI')
+
+    journal = JournalCheckpoint("RR", tmp_path)
+    assert journal.caminho.stat().st_size == tamanho
+    assert (journal.ultima_pagina, journal.total_registros) == (3, 6)
+    assert journal.registrar_pagina(4, _medicos(4))
+    assert [p for p, _ in journal.paginas()] == [1, 2, 3, 4]
+
+
+def test_linha_completa_apos_o_indice_e_descartada(tmp_path):
+    journal = _journal_com_paginas(tmp_path)
+    with open(journal.caminho, "ab") as f:  # fsync da linha feito, índice não regravado
+        f.write((json.dumps({"pagina": 4, "medicos": _medicos(4)}) + "\n").encode())
+
+    journal = JournalCheckpoint("RR", tmp_path)
+    assert journal.ultima_pagina == 3
+    assert [p for p, _ in journal.paginas()] == [1, 2, 3]
+
+
+def test_indice_ausente_e_reconstruido_pela_varredura(tmp_path):
+    journal = _journal_com_paginas(tmp_path)
+    journal.caminho_indice.unlink()
+    with open(journal.caminho, "ab") as f:
+        f.write(b'{"pagina": 4, "med')
+
+    journal = JournalCheckpoint("RR", tmp_path)
+    assert (journal.ultima_pagina, journal.total_registros) == (3, 6)
+    assert journal.caminho_indice.exists()
+    assert [p for p, _ in journal.paginas()] == [1, 2, 3]
+
+
+def test_indice_corrompido_e_reconstruido_pela_varredura(tmp_path):
+    journal = _journal_com_paginas(tmp_path)
+    journal.caminho_indice.write_text("{nao e json", encoding="utf-8")
+
+    journal = JournalCheckpoint("RR", tmp_path)
+    assert (journal.ultima_pagina, journal.total_registros) == (3, 6)
+
+
+def test_indice_alem_do_fim_do_arquivo_e_reconstruido(tmp_path):
+    journal = _journal_com_paginas(tmp_path)
+    indice = json.loads(journal.caminho_indice.read_text(encoding="utf-8"))
+    journal.caminho_indice.write_text(json.dumps({**indice, "offset": indice["offset"] * 10}), encoding="utf-8")
+
+    journal = JournalCheckpoint("RR", tmp_path)
+    assert journal.ultima_pagina == 3
+    assert journal.indice["offset"] == journal.caminho.stat().st_size
+
+
+def test_paginas_ja_confirmadas_sao_ignoradas(tmp_path):
+    journal = _journal_com_paginas(tmp_path)
+    assert not journal.registrar_pagina(2, _medicos(2, n=5))  # retomada que recuou
+    assert not journal.registrar_pagina(3, _medicos(3))
+    assert journal.registrar_pagina(4, _medicos(4))
+    assert (journal.ultima_pagina, journal.total_registros) == (4, 8)
+    assert [p for p, _ in journal.paginas()] == [1, 2, 3, 4]
+
+
+def test_arquivar_preserva_o_journal_anterior(tmp_path):
+    journal = _journal_com_paginas(tmp_path)
+    conteudo = journal.caminho.read_bytes()
+
+    arquivado = journal.arquivar()
+    assert arquivado is not None and arquivado.read_bytes() == conteudo
+    assert not journal.caminho.exists() and not journal.caminho_indice.exists()
+    assert journal.ultima_pagina == 0
+
+    novo = JournalCheckpoint("RR", tmp_path)
+    assert (novo.ultima_pagina, novo.total_registros) == (0, 0)
+    assert novo.registrar_pagina(1, _medicos(1))
+    assert arquivado.read_bytes() == conteudo
+
+
+def test_exportar_grava_cada_pagina_uma_vez(tmp_path):
+    journal = _journal_com_paginas(tmp_path)
+    journal.registrar_pagina(2, _medicos(2))
+
+    class Destino:
+        def __init__(self):
+            self.registros, self.fechado = [], False
+
+        def gravar(self, medicos):
+            self.registros.extend(medicos)
+
+        def fechar(self):
+            self.fechado = True
+
+    destino = Destino()
+    assert journal.exportar(destino) == 6
+    assert destino.fechado
+    assert [m["crm"] for m in destino.registros] == [m["crm"] for p in (1, 2, 3) for m in _medicos(p)]
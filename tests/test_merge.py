@@ -0,0 +1,108 @@
+import math
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from notebooks.juntar_dados_coletados import CsvMergeConfig, CsvMerger, build_default_config
+
+ARQUIVOS = {
+    "ac/medicos_AC_1.csv": ("utf-8-sig", ",", [
+        "Nome,CRM,UF,Situação,Especialidade",
+        "ANA  MARIA,2702,AC,Regular,PEDIATRIA",
+        "BRUNO,2710,AC,Regular,",
+        "CARLA,900,AC,Cancelado,CARDIOLOGIA",
+        "DANIEL,15,AC,Regular,CLÍNICA MÉDICA",
+    ]),
+    "ac/medicos_AC_2.csv": ("latin1", ";", [
+        "nome;crm;uf;situacao;especialidade",
+        "ANA M.;2702;AC;Regular;PEDIATRIA",  # duplicata (crm, uf): vale a primeira
+        "ÉRICA;3000;AC;Regular;ORTOPEDIA",
+        "DANIEL;15;AC;Regular;",
+    ]),
+    "sp/medicos_SP.csv": ("utf-8", ",", [
+        "Nome Completo,CRM,UF,Situacao,Especialidades",
+        "FABIO,2702,SP,Regular,DERMATOLOGIA",
+        "GABI,  77 ,SP,Regular,  NEUROLOGIA   INFANTIL ",
+        "HELIO,78,SP,Regular,",
+        "FABIO DUPLICADO,2702,SP,Regular,",
+        "IARA,79,SP,Inativo,PSIQUIATRIA",
+    ]),
+}
+
+
+@pytest.fixture
+def csvs(tmp_path):
+    pasta = tmp_path / "dados_csv"
+    for nome, (encoding, _, linhas) in ARQUIVOS.items():
+        caminho = pasta / nome
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        caminho.write_text("\n".join(linhas) + "\n", encoding=encoding)
+    return pasta
+
+
+def _merge(csvs, saida, **opcoes):
+    cfg = CsvMergeConfig(csv_dir=csvs, output_path=saida, max_workers=1, build_specialties=False, **opcoes)
+    return CsvMerger(cfg)
+
+
+def _ordenado(df):
+    return df.sort_values(list(df.columns), na_position="first").reset_index(drop=True)
+
+
+def test_merge_em_blocos_igual_ao_merge_em_memoria(csvs, tmp_path):
+    em_memoria = pd.read_csv(_merge(csvs, tmp_path / "memoria.csv").merge(), dtype=str, encoding="utf-8-sig")
+
+    merger = _merge(csvs, tmp_path / "blocos.csv", chunked=True, chunk_rows=2, memory_limit_mb=1,
+                    spill_dir=tmp_path)
+    total = sum(p.stat().st_size for p in csvs.rglob("*.csv"))
+    merger._EXPANSAO_MEMORIA = math.ceil(4 * 2**20 / total)  # força várias partições
+    em_blocos = pd.read_csv(merger.merge(), dtype=str, encoding="utf-8-sig")
+
+    assert list(em_blocos.columns) == list(em_memoria.columns)
+    assert len(em_memoria) == 9
+    pd.testing.assert_frame_equal(_ordenado(em_blocos), _ordenado(em_memoria))
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith("merge_")]  # partições removidas
+
+
+def test_dedup_mantem_a_primeira_ocorrencia(csvs, tmp_path):
+    for opcoes in ({}, {"chunked": True, "chunk_rows": 2}):
+        df = pd.read_csv(_merge(csvs, tmp_path / "saida.csv", **opcoes).merge(), dtype=str, encoding="utf-8-sig")
+        nomes = dict(zip(zip(df["crm"], df["uf"]), df["nome"]))
+        assert nomes[("2702", "AC")] == "ANA MARIA"
+        assert nomes[("2702", "SP")] == "FABIO"
+        assert nomes[("77", "SP")] == "GABI"
+
+
+def test_configuracao_padrao_nao_usa_cache(tmp_path):
+    assert build_default_config(tmp_path).cache_dir is None
+    assert build_default_config(tmp_path, incremental=True).cache_dir == tmp_path / "data" / "cache_merge"
+
+
+def test_merge_incremental_relê_so_o_arquivo_alterado(csvs, tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    saida = tmp_path / "saida.csv"
+    lidos = []
+    ingere = CsvMerger.ingere_arquivos
+
+    def espia(self, files):
+        lidos.append(sorted(f.name for f in files))
+        return ingere(self, files)
+
+    monkeypatch.setattr(CsvMerger, "ingere_arquivos", espia)
+
+    _merge(csvs, saida, cache_dir=cache).merge()
+    assert lidos == [sorted(Path(n).name for n in ARQUIVOS)]
+    pickles = {p.name for p in cache.glob("*.pkl")}
+    assert len(pickles) == 3
+
+    _merge(csvs, saida, cache_dir=cache).merge()  # nada mudou: nada é relido
+    assert len(lidos) == 1
+
+    alterado = csvs / "sp" / "medicos_SP.csv"
+    alterado.write_text(alterado.read_text(encoding="utf-8").replace("HELIO", "HÉLIO"), encoding="utf-8")
+    df = pd.read_csv(_merge(csvs, saida, cache_dir=cache).merge(), dtype=str, encoding="utf-8-sig")
+    assert lidos[1:] == [["medicos_SP.csv"]]
+    assert "HÉLIO" in set(df["nome"]) and "HELIO" not in set(df["nome"])
+    novos = {p.name for p in cache.glob("*.pkl")}
+    assert len(novos) == 3 and len(novos - pickles) == 1  # o frame antigo do arquivo alterado foi removido
@@ -0,0 +1,69 @@
+from src.navegacao import JS_IR_PARA_PAGINA, JS_PAGINA_ATIVA, JS_PAGINAS_VISIVEIS, ir_para_pagina
+
+
+class Limitador:
+    def __init__(self, eventos):
+        self.eventos = eventos
+
+    def adquirir(self, pagina=None):
+        self.eventos.append(("ficha", pagina))
+        return 0.0
+
+
+class Pagina:
+    """Página falsa: a paginação avança para o link clicado; o plugin jQuery pode faltar."""
+
+    def __init__(self, eventos, plugin=True, visiveis=5):
+        self.eventos, self.plugin, self.visiveis, self.ativa = eventos, plugin, visiveis, 1
+
+    def evaluate(self, js, arg=None):
+        if js == JS_PAGINA_ATIVA:
+            return self.ativa
+        if js == JS_PAGINAS_VISIVEIS:
+            return list(range(max(1, self.ativa - 2), self.ativa + self.visiveis))
+        if js == JS_IR_PARA_PAGINA:
+            if self.plugin:
+                self.eventos.append(("requisicao", arg))
+                self.ativa = arg
+            return self.plugin
+        raise AssertionError(js)
+
+    def wait_for_function(self, js, arg=None, timeout=None):
+        assert self.ativa == arg
+
+    def locator(self, seletor):
+        pagina = self
+
+        class Link:
+            first = property(lambda link: link)
+
+            def click(link):
+                destino = int(seletor.split('"')[1])
+                pagina.eventos.append(("requisicao", destino))
+                pagina.ativa = destino
+
+        return Link()
+
+
+def test_salto_direto_tira_ficha_antes_da_requisicao():
+    eventos = []
+    assert ir_para_pagina(Pagina(eventos), 40, limitador=Limitador(eventos))
+    assert eventos == [("ficha", 40), ("requisicao", 40)]
+
+
+def test_saltos_pelos_links_tiram_uma_ficha_por_clique():
+    eventos = []
+    assert ir_para_pagina(Pagina(eventos, plugin=False), 12, limitador=Limitador(eventos))
+    requisicoes = [p for tipo, p in eventos if tipo == "requisicao"]
+    assert requisicoes == [5, 9, 12]
+    for i, (tipo, pagina) in enumerate(eventos):
+        if tipo == "requisicao":
+            assert eventos[i - 1] == ("ficha", pagina)
+
+
+def test_sem_limitador_e_na_pagina_atual():
+    eventos = []
+    assert ir_para_pagina(Pagina(eventos), 1, limitador=Limitador(eventos))
+    assert eventos == []
+    assert ir_para_pagina(Pagina(eventos), 3)
+    assert eventos == [("requisicao", 3)]
@@ -0,0 +1,24 @@
+import pytest
+
+from src.parser_cards import CAMPOS, carregar_corpus, parse_cards, verificar_corpus
+
+CORPUS = carregar_corpus()
+
+
+@pytest.mark.parametrize("caso", CORPUS, ids=[caso["descricao"] for caso in CORPUS])
+def test_corpus(caso):
+    esperado = [caso["esperado"]] if caso["esperado"] is not None else []
+    assert parse_cards([caso["texto"]]) == esperado
+
+
+def test_verificar_corpus_sem_divergencias():
+    assert verificar_corpus() == []
+
+
+def test_valores_param_no_proximo_rotulo():
+    texto = ("ANA CRM: 1-SP Situação: Regular Especialidades/Áreas de Atuação: PEDIATRIA "
+             "Telefone: (11) 1111-1111 Instituição de Graduação: USP Ano de Formatura: 2000")
+    [registro] = parse_cards([texto])
+    assert registro["especialidade"] == "PEDIATRIA"
+    assert registro["instituicao_graduacao"] == "USP"
+    assert list(registro) == CAMPOS
@@ -0,0 +1,155 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from src import politica_retry
+from src.politica_retry import (BLOQUEIO, LIMITE, REDE, RESPOSTA, SERVIDOR, PoliticaRetry, classificar_erro,
+                                retry_after)
+
+AGORA = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def backoff_no_teto(monkeypatch):
+    """Jitter determinístico: o backoff devolve sempre o teto da faixa."""
+    monkeypatch.setattr(politica_retry.random, "uniform", lambda a, b: b)
+
+
+def _erro_http(status):
+    resposta = requests.Response()
+    resposta.status_code = status
+    return requests.exceptions.HTTPError(f"{status} Error", response=resposta)
+
+
+@pytest.mark.parametrize("erro, classe", [
+    (_erro_http(429), LIMITE),
+    (_erro_http(403), LIMITE),
+    (_erro_http(500), SERVIDOR),
+    (_erro_http(503), SERVIDOR),
+    (_erro_http(404), RESPOSTA),
+    (requests.exceptions.Timeout("timeout"), REDE),
+    (requests.exceptions.ConnectionError("reset"), REDE),
+    (Exception("Captcha exigido"), BLOQUEIO),
+    (ValueError("JSON inválido"), RESPOSTA),
+])
+def test_classificar_erro(erro, classe):
+    assert classificar_erro(erro) == classe
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("120", 120.0),
+    (" 5 ", 5.0),
+    ("Thu, 01 Jan 2026 12:01:30 GMT", 90.0),
+    ("Thu, 01 Jan 2026 11:00:00 GMT", 0.0),  # data no passado
+    ("amanhã", None),
+    (None, None),
+])
+def test_retry_after(valor, esperado):
+    resposta = SimpleNamespace(headers={"Retry-After": valor} if valor is not None else {})
+    assert retry_after(resposta, agora=AGORA) == esperado
+
+
+def test_retry_after_sem_resposta():
+    assert retry_after(None) is None
+
+
+def test_backoff_exponencial_com_teto():
+    politica = PoliticaRetry(base=2.0, fator=2.0, maximo=10.0)
+    assert [politica.falha(1, REDE) for _ in range(5)] == [2.0, 4.0, 8.0, 10.0, 10.0]
+
+
+def test_backoff_com_jitter_fica_entre_metade_e_o_teto(monkeypatch):
+    monkeypatch.setattr(politica_retry.random, "uniform", lambda a, b: a)
+    politica = PoliticaRetry(base=2.0, fator=2.0)
+    assert [politica.falha(1, REDE) for _ in range(3)] == [1.0, 2.0, 4.0]
+
+
+def test_retry_after_e_espera_minima():
+    politica = PoliticaRetry(base=2.0, pausa_maxima=3600.0)
+    assert politica.falha(1, LIMITE, espera_minima=45.0) == 45.0
+    assert politica.falha(1, LIMITE, espera_minima=1.0) == 4.0  # o backoff já é maior
+    assert politica.falha(1, LIMITE, espera_minima=10_000.0) == 3600.0  # limitado a pausa_maxima
+
+
+def test_orcamento_por_classe_abre_o_circuito():
+    politica = PoliticaRetry(pausa_circuito=300.0)
+    esperas = [politica.falha(1, RESPOSTA) for _ in range(4)]  # orçamento de RESPOSTA: 3
+    assert esperas[:3] == [2.0, 4.0, 8.0]
+    assert esperas[3] == 300.0
+    assert politica.aberturas == 1
+    # o circuito zera os orçamentos: a próxima falha volta ao início do backoff
+    assert politica.falha(1, RESPOSTA) == 2.0
+
+
+def test_orcamentos_sao_independentes_por_classe():
+    politica = PoliticaRetry(maximo=1000.0)
+    for _ in range(3):
+        politica.falha(1, RESPOSTA)
+    assert politica.falha(1, REDE) == 16.0  # 4ª falha da página, mas REDE ainda tem orçamento
+    assert politica.aberturas == 0
+
+
+def test_dez_falhas_seguidas_abrem_o_circuito():
+    politica = PoliticaRetry(maximo=1000.0)
+    for _ in range(6):  # orçamento de REDE: 6
+        politica.falha(7, REDE)
+    for _ in range(3):
+        politica.falha(7, SERVIDOR)
+    assert politica.aberturas == 0
+    assert politica.falha(7, SERVIDOR) == 300.0  # 10ª falha seguida: pausa do circuito, não o backoff
+    assert politica.aberturas == 1
+
+
+def test_sucesso_zera_as_falhas_seguidas():
+    politica = PoliticaRetry(maximo=1000.0)
+    for p in range(1, 10):
+        politica.falha(p, SERVIDOR if p > 5 else REDE)
+    politica.sucesso(9)
+    assert politica.falha(10, REDE) == 2.0
+    assert politica.aberturas == 0
+
+
+def test_pausa_dobra_ate_o_maximo_e_desiste_apos_8_aberturas():
+    politica = PoliticaRetry(pausa_circuito=300.0, pausa_maxima=3600.0, max_aberturas=8)
+    pausas = []
+    for _ in range(9):
+        for _ in range(politica.orcamentos[RESPOSTA]):
+            politica.falha(1, RESPOSTA)
+        pausas.append(politica.falha(1, RESPOSTA))
+    assert pausas == [300.0, 600.0, 1200.0, 2400.0, 3600.0, 3600.0, 3600.0, 3600.0, None]
+    assert politica.aberturas == 9
+
+
+def test_sucesso_fecha_o_circuito_e_reinicia_a_pausa():
+    politica = PoliticaRetry(pausa_circuito=300.0)
+    for _ in range(2):
+        for _ in range(4):
+            espera = politica.falha(1, RESPOSTA)
+    assert espera == 600.0
+    politica.sucesso(1)
+    for _ in range(4):
+        espera = politica.falha(2, RESPOSTA)
+    assert espera == 300.0
+
+
+def test_sem_limite_de_aberturas():
+    politica = PoliticaRetry(max_aberturas=None, orcamentos={RESPOSTA: 0})
+    assert all(politica.falha(1, RESPOSTA) is not None for _ in range(20))
+    assert politica.falha(1, RESPOSTA) == 3600.0
+
+
+def test_estatisticas():
+    politica = PoliticaRetry()
+    politica.falha(3, REDE)
+    politica.falha(3, REDE)
+    politica.falha(5, LIMITE, espera_minima=10.0)
+    assert politica.estatisticas() == {
+        "tentativas_extras": 3,
+        "paginas_com_retry": 2,
+        "tentativas_por_pagina": {3: 2, 5: 1},
+        "falhas_por_classe": {REDE: 2, LIMITE: 1},
+        "aberturas_circuito": 0,
+        "espera_total_s": 2.0 + 4.0 + 10.0,
+    }